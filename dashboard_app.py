@@ -1,27 +1,91 @@
 #!/usr/bin/env python3
 import glob
 import json
+import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-
-st.set_page_config(page_title="Election69 Dashboard", layout="wide")
-
-
-@st.cache_data(show_spinner=False)
-def load_data(base_dir: str = "."):
-    base = Path(base_dir)
-
+# the cache builder owns the fingerprint, so the app and the cache can never disagree on it
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from build_dashboard_cache import CACHE_VERSION, source_fingerprint  # noqa: E402
+
+ALL_PROVINCES = "ทั้งหมด"
+CACHE_DIR = "data/dashboard_cache.cols"
+# low-cardinality labels; stored as dictionary codes in the cache and loaded as pd.Categorical
+CATEGORICAL = {
+    "areaCode",
+    "areaName",
+    "provinceCode",
+    "provinceName",
+    "partyCode",
+    "partyName",
+    "partyColor",
+    "candidatePartyCode",
+    "candidatePartyName",
+}
+
+
+def as_categories(df: pd.DataFrame) -> pd.DataFrame:
+    for col in CATEGORICAL & set(df.columns):
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        # sort_values on a categorical follows category order, so keep it lexical
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def read_cached_table(root: Path, table: str, spec: dict) -> pd.DataFrame:
+    tdir = root / table
+    data = {}
+    for name, col in spec["columns"].items():
+        kind = col["kind"]
+        if kind == "str":
+            codes = np.load(tdir / f"{name}.codes.npy", mmap_mode="r")
+            categories = json.loads((tdir / f"{name}.dict.json").read_text(encoding="utf-8"))
+            if name in CATEGORICAL:
+                values = pd.Categorical.from_codes(np.asarray(codes), categories=categories)
+            else:
+                values = np.asarray(categories + [None], dtype=object)[np.asarray(codes)]
+        elif kind == "json":
+            values = json.loads((tdir / f"{name}.json").read_text(encoding="utf-8"))
+        else:
+            values = np.load(tdir / f"{name}.npy", mmap_mode="r")
+            if col.get("mask"):
+                valid = np.load(tdir / f"{name}.valid.npy", mmap_mode="r").astype(bool)
+                values = np.where(valid, values, np.nan)
+            else:
+                values = np.array(values, dtype=bool if kind == "bool" else values.dtype)
+        data[name] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(spec["row_count"]))
+
+
+def load_cached_frames(base: Path):
+    """(votes, cand, party_df, area_meta) from the prebuilt cache, or None if missing or stale."""
+    root = base / CACHE_DIR
+    schema_path = root / "_schema.json"
+    if not schema_path.exists():
+        return None
+    schema = json.loads(schema_path.read_text(encoding="utf-8"))
+    meta = schema.get("meta", {})
+    if meta.get("cache_version") != CACHE_VERSION or meta.get("source_fingerprint") != source_fingerprint(base):
+        return None
+    tables = schema["tables"]
+    votes = read_cached_table(root, "votes", tables["votes"])
+    cand = read_cached_table(root, "candidates", tables["candidates"])
+    party_df = read_cached_table(root, "parties", tables["parties"])
+    area_meta = read_cached_table(root, "areas", tables["areas"])
+    return as_categories(votes), as_categories(cand), as_categories(party_df), as_categories(area_meta)
+
+
+def load_raw_frames(base: Path):
     common = json.loads((base / "common-data.json").read_text(encoding="utf-8"))
     parties = json.loads((base / "party-data.json").read_text(encoding="utf-8"))["parties"]
     candidates = json.loads((base / "candidate-data.json").read_text(encoding="utf-8"))["candidates"]
 
-    summary_path = base / "summary.json"
-    summary = json.loads(summary_path.read_text(encoding="utf-8")) if summary_path.exists() else None
-
     area_meta = pd.DataFrame(common["areas"])[["code", "name", "number", "provinceCode"]].rename(
         columns={"code": "areaCode", "name": "areaName", "number": "areaNo"}
     )
@@ -74,7 +138,19 @@ def load_data(base_dir: str = "."):
         + cand["lastName"].fillna("")
     ).str.strip()
 
-    return votes, cand, party_df, area_meta, summary
+    return as_categories(votes), as_categories(cand), as_categories(party_df), as_categories(area_meta)
+
+
+@st.cache_data(show_spinner=False)
+def load_data(base_dir: str = "."):
+    base = Path(base_dir)
+
+    summary_path = base / "summary.json"
+    summary = json.loads(summary_path.read_text(encoding="utf-8")) if summary_path.exists() else None
+
+    # prebuilt by scripts/build_dashboard_cache.py; fall back to the raw JSON when missing or stale
+    frames = load_cached_frames(base) or load_raw_frames(base)
+    return (*frames, summary)
 
 
 def build_alignment(votes: pd.DataFrame, cand: pd.DataFrame, min_no: int, max_no: int, base_party_nos: list[int]):
@@ -103,144 +179,201 @@ def build_alignment(votes: pd.DataFrame, cand: pd.DataFrame, min_no: int, max_no
     return aligned
 
 
-votes, cand, party_df, area_meta, summary = load_data()
+@st.cache_data(show_spinner=False)
+def alignment_index(base_dir: str = "."):
+    """Alignment join over every party number, done once per data load.
+
+    Rows are sorted by small-party number so a party range is a contiguous slice, and each
+    province keeps the (sorted) row positions it owns.
+    """
+    votes, cand, party_df, *_ = load_data(base_dir)
+    party_nos = party_df["partyNo"].dropna()
+    aligned = build_alignment(votes, cand, int(party_nos.min()), int(party_nos.max()), [])
+    aligned = aligned.sort_values("smallPartyNo", kind="stable").reset_index(drop=True)
+    provinces = aligned["provinceName"].astype(object).to_numpy()
+    by_province = {name: np.flatnonzero(provinces == name) for name in pd.unique(provinces) if isinstance(name, str)}
+    return aligned, by_province
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def alignment_view(base_dir: str, province: str | None, min_no: int, max_no: int, base_party_nos: tuple[int, ...]):
+    """(aligned rows, per-matched-party totals) for one normalized parameter set; see alignment_params."""
+    aligned, by_province = alignment_index(base_dir)
+    nos = aligned["smallPartyNo"].to_numpy()
+    lo, hi = np.searchsorted(nos, min_no, side="left"), np.searchsorted(nos, max_no, side="right")
+    if province is None:
+        rows = np.arange(lo, hi)
+    else:
+        rows = by_province.get(province, np.empty(0, dtype=np.int64))
+        rows = rows[(rows >= lo) & (rows < hi)]
+    view = aligned.iloc[rows]
+    if base_party_nos:
+        view = view[view["candidatePartyNo"].isin(base_party_nos)]
+    view = view.reset_index(drop=True)
 
-st.title("Election 69 Interactive Dashboard")
-st.caption("Data source in workspace: area-candidates + common/party/candidate/summary JSON")
+    by_matched_party = (
+        view.groupby(["candidatePartyCode", "candidatePartyNo", "candidatePartyName"], dropna=False, observed=True, as_index=False)
+        .agg(totalProxyVotes=("smallPartyVotes", "sum"), districts=("areaCode", "nunique"), rows=("areaCode", "count"))
+        .sort_values("totalProxyVotes", ascending=False)
+    )
+    by_matched_party["share"] = by_matched_party["totalProxyVotes"] / by_matched_party["totalProxyVotes"].sum()
+    return view, by_matched_party
 
-with st.sidebar:
-    st.header("Filters")
-    provinces = ["ทั้งหมด"] + sorted(votes["provinceName"].dropna().unique().tolist())
-    selected_province = st.selectbox("จังหวัด", provinces, index=0)
 
-    min_party_no = int(party_df["partyNo"].min())
-    max_party_no = int(party_df["partyNo"].max())
-    party_range = st.slider("ช่วงหมายเลขพรรคที่ใช้วิเคราะห์ alignment", min_value=min_party_no, max_value=max_party_no, value=(1, 9))
+def alignment_params(selected_province: str, party_range: tuple[int, int], selected_base: list[int]):
+    """Canonical cache key: "all provinces" -> None, ordered range, sorted unique base parties."""
+    lo, hi = sorted(int(x) for x in party_range)
+    province = None if selected_province == ALL_PROVINCES else selected_province
+    return province, lo, hi, tuple(sorted({int(x) for x in selected_base}))
 
-    default_base = [7, 9, 22, 26, 29, 31, 37]
-    available = sorted(party_df["partyNo"].dropna().astype(int).unique().tolist())
-    default_base = [x for x in default_base if x in available]
-    selected_base = st.multiselect("พรรคฐาน (พรรคที่ต้องการดูว่าเลขไปชนผู้สมัครของพรรคนี้ไหม)", options=available, default=default_base)
 
+@st.cache_data(show_spinner=False)
+def area_totals(base_dir: str = "."):
+    """One row per area with its ballot totals, for the metrics and the province table."""
+    votes = load_data(base_dir)[0]
+    cols = ["areaCode", "provinceName", "totalVotes", "goodVotes", "badVotes", "noVotes"]
+    return votes[cols].drop_duplicates("areaCode").reset_index(drop=True)
 
-filtered_votes = votes.copy()
-if selected_province != "ทั้งหมด":
-    filtered_votes = filtered_votes[filtered_votes["provinceName"] == selected_province]
 
-area_count = filtered_votes["areaCode"].nunique()
-party_count = filtered_votes["partyCode"].nunique()
+def main() -> None:
+    st.set_page_config(page_title="Election69 Dashboard", layout="wide")
 
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("เขตที่อยู่ในตัวกรอง", f"{area_count:,}")
-col2.metric("จำนวนพรรค", f"{party_count:,}")
-col3.metric("คะแนนรวม (party-list)", f"{int(filtered_votes[['areaCode','totalVotes']].drop_duplicates()['totalVotes'].sum()):,}")
-col4.metric("คะแนนดีรวม", f"{int(filtered_votes[['areaCode','goodVotes']].drop_duplicates()['goodVotes'].sum()):,}")
+    votes, cand, party_df, area_meta, summary = load_data()
 
-if summary is not None:
-    with st.expander("Summary check"):
-        st.write(
-            {
-                "lastUpdatedAt": summary.get("lastUpdatedAt"),
-                "voteProgressPercent": summary.get("voteProgressPercent"),
-                "statisticsPartyList": summary.get("statisticsPartyList", {}),
-            }
-        )
+    st.title("Election 69 Interactive Dashboard")
+    st.caption("Data source in workspace: area-candidates + common/party/candidate/summary JSON")
 
+    with st.sidebar:
+        st.header("Filters")
+        provinces = [ALL_PROVINCES] + sorted(votes["provinceName"].dropna().unique().tolist())
+        selected_province = st.selectbox("จังหวัด", provinces, index=0)
 
-tab1, tab2, tab3 = st.tabs(["ภาพรวมประเทศ/จังหวัด", "เจาะรายเขต", "วิเคราะห์เลขชน (alignment)"])
+        min_party_no = int(party_df["partyNo"].min())
+        max_party_no = int(party_df["partyNo"].max())
+        party_range = st.slider("ช่วงหมายเลขพรรคที่ใช้วิเคราะห์ alignment", min_value=min_party_no, max_value=max_party_no, value=(1, 9))
 
-with tab1:
-    top_n = st.slider("Top N พรรค", 5, 30, 15)
-    party_agg = (
-        filtered_votes.groupby(["partyCode", "partyNo", "partyName"], as_index=False)["voteTotal"].sum().sort_values("voteTotal", ascending=False)
-    )
-    party_agg["share"] = party_agg["voteTotal"] / party_agg["voteTotal"].sum()
-
-    fig_top = px.bar(
-        party_agg.head(top_n),
-        x="partyName",
-        y="voteTotal",
-        color="partyName",
-        text="voteTotal",
-        title=f"Top {top_n} พรรคตามคะแนนรวม",
-    )
-    fig_top.update_layout(showlegend=False, xaxis_title="พรรค", yaxis_title="คะแนน")
-    st.plotly_chart(fig_top, use_container_width=True)
-
-    province_agg = (
-        filtered_votes[["provinceName", "areaCode", "totalVotes", "goodVotes", "badVotes", "noVotes"]]
-        .drop_duplicates()
-        .groupby("provinceName", as_index=False)
-        .sum(numeric_only=True)
-        .sort_values("totalVotes", ascending=False)
-    )
-    st.dataframe(province_agg, use_container_width=True, hide_index=True)
-
-with tab2:
-    area_list_df = filtered_votes[["areaCode", "areaName", "provinceName"]].drop_duplicates().sort_values(["provinceName", "areaCode"])
-    area_label_map = {f"{r.provinceName} | {r.areaName} ({r.areaCode})": r.areaCode for r in area_list_df.itertuples()}
-    selected_area_label = st.selectbox("เลือกเขต", options=list(area_label_map.keys()))
-    selected_area = area_label_map[selected_area_label]
-
-    area_party = (
-        filtered_votes[filtered_votes["areaCode"] == selected_area][["partyNo", "partyName", "voteTotal", "votePercent", "rank"]]
-        .sort_values("rank")
-        .reset_index(drop=True)
-    )
+        default_base = [7, 9, 22, 26, 29, 31, 37]
+        available = sorted(party_df["partyNo"].dropna().astype(int).unique().tolist())
+        default_base = [x for x in default_base if x in available]
+        selected_base = st.multiselect("พรรคฐาน (พรรคที่ต้องการดูว่าเลขไปชนผู้สมัครของพรรคนี้ไหม)", options=available, default=default_base)
 
-    fig_area = px.bar(area_party.head(20), x="partyName", y="voteTotal", color="partyName", title="ผลคะแนนรายพรรคในเขต (Top 20)")
-    fig_area.update_layout(showlegend=False, xaxis_title="พรรค", yaxis_title="คะแนน")
-    st.plotly_chart(fig_area, use_container_width=True)
 
-    st.dataframe(area_party, use_container_width=True, hide_index=True)
+    filtered_votes = votes
+    filtered_areas = area_totals()
+    if selected_province != ALL_PROVINCES:
+        filtered_votes = votes[votes["provinceName"] == selected_province]
+        filtered_areas = filtered_areas[filtered_areas["provinceName"] == selected_province]
 
-    area_cand = (
-        cand[cand["areaCode"] == selected_area][["candidateNo", "candidatePartyNo", "candidatePartyName", "candidateName"]]
-        .sort_values("candidateNo")
-        .reset_index(drop=True)
-    )
-    st.write("ผู้สมัครในเขต")
-    st.dataframe(area_cand, use_container_width=True, hide_index=True)
+    area_count = filtered_votes["areaCode"].nunique()
+    party_count = filtered_votes["partyCode"].nunique()
 
-with tab3:
-    aligned = build_alignment(filtered_votes, cand, party_range[0], party_range[1], selected_base)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("เขตที่อยู่ในตัวกรอง", f"{area_count:,}")
+    col2.metric("จำนวนพรรค", f"{party_count:,}")
+    col3.metric("คะแนนรวม (party-list)", f"{int(filtered_areas['totalVotes'].sum()):,}")
+    col4.metric("คะแนนดีรวม", f"{int(filtered_areas['goodVotes'].sum()):,}")
 
-    st.caption(
-        "แต่ละแถว = คะแนนพรรคในช่วงหมายเลขที่เลือก (small-party proxy) ต่อ 1 เขต แล้วดูว่าเบอร์นั้นไปตรงกับผู้สมัครพรรคไหน"
-    )
+    if summary is not None:
+        with st.expander("Summary check"):
+            st.write(
+                {
+                    "lastUpdatedAt": summary.get("lastUpdatedAt"),
+                    "voteProgressPercent": summary.get("voteProgressPercent"),
+                    "statisticsPartyList": summary.get("statisticsPartyList", {}),
+                }
+            )
 
-    c1, c2, c3 = st.columns(3)
-    c1.metric("จำนวนแถวที่วิเคราะห์", f"{len(aligned):,}")
-    c2.metric("match rate", f"{aligned['isMatched'].mean() * 100:.2f}%")
-    c3.metric("คะแนน proxy รวม", f"{int(aligned['smallPartyVotes'].sum()):,}")
 
-    by_matched_party = (
-        aligned.groupby(["candidatePartyCode", "candidatePartyNo", "candidatePartyName"], dropna=False, as_index=False)
-        .agg(totalProxyVotes=("smallPartyVotes", "sum"), districts=("areaCode", "nunique"), rows=("areaCode", "count"))
-        .sort_values("totalProxyVotes", ascending=False)
-    )
-    by_matched_party["share"] = by_matched_party["totalProxyVotes"] / by_matched_party["totalProxyVotes"].sum()
+    tab1, tab2, tab3 = st.tabs(["ภาพรวมประเทศ/จังหวัด", "เจาะรายเขต", "วิเคราะห์เลขชน (alignment)"])
 
-    fig_align = px.bar(
-        by_matched_party.head(20),
-        x="candidatePartyName",
-        y="totalProxyVotes",
-        color="candidatePartyName",
-        title="คะแนน proxy ที่ map ไปยังพรรคของผู้สมัคร (Top 20)",
-        text="totalProxyVotes",
-    )
-    fig_align.update_layout(showlegend=False, xaxis_title="พรรคที่เลขชน", yaxis_title="คะแนน proxy")
-    st.plotly_chart(fig_align, use_container_width=True)
+    with tab1:
+        top_n = st.slider("Top N พรรค", 5, 30, 15)
+        party_agg = (
+            filtered_votes.groupby(["partyCode", "partyNo", "partyName"], observed=True, as_index=False)["voteTotal"].sum().sort_values("voteTotal", ascending=False)
+        )
+        party_agg["share"] = party_agg["voteTotal"] / party_agg["voteTotal"].sum()
+
+        fig_top = px.bar(
+            party_agg.head(top_n),
+            x="partyName",
+            y="voteTotal",
+            color="partyName",
+            text="voteTotal",
+            title=f"Top {top_n} พรรคตามคะแนนรวม",
+        )
+        fig_top.update_layout(showlegend=False, xaxis_title="พรรค", yaxis_title="คะแนน")
+        st.plotly_chart(fig_top, use_container_width=True)
+
+        province_agg = (
+            filtered_areas.drop(columns="areaCode")
+            .groupby("provinceName", observed=True, as_index=False)
+            .sum(numeric_only=True)
+            .sort_values("totalVotes", ascending=False)
+        )
+        st.dataframe(province_agg, use_container_width=True, hide_index=True)
+
+    with tab2:
+        area_list_df = filtered_votes[["areaCode", "areaName", "provinceName"]].drop_duplicates().sort_values(["provinceName", "areaCode"])
+        area_label_map = {f"{r.provinceName} | {r.areaName} ({r.areaCode})": r.areaCode for r in area_list_df.itertuples()}
+        selected_area_label = st.selectbox("เลือกเขต", options=list(area_label_map.keys()))
+        selected_area = area_label_map[selected_area_label]
+
+        area_party = (
+            filtered_votes[filtered_votes["areaCode"] == selected_area][["partyNo", "partyName", "voteTotal", "votePercent", "rank"]]
+            .sort_values("rank")
+            .reset_index(drop=True)
+        )
 
-    st.dataframe(by_matched_party, use_container_width=True, hide_index=True)
+        fig_area = px.bar(area_party.head(20), x="partyName", y="voteTotal", color="partyName", title="ผลคะแนนรายพรรคในเขต (Top 20)")
+        fig_area.update_layout(showlegend=False, xaxis_title="พรรค", yaxis_title="คะแนน")
+        st.plotly_chart(fig_area, use_container_width=True)
+
+        st.dataframe(area_party, use_container_width=True, hide_index=True)
+
+        area_cand = (
+            cand[cand["areaCode"] == selected_area][["candidateNo", "candidatePartyNo", "candidatePartyName", "candidateName"]]
+            .sort_values("candidateNo")
+            .reset_index(drop=True)
+        )
+        st.write("ผู้สมัครในเขต")
+        st.dataframe(area_cand, use_container_width=True, hide_index=True)
+
+    with tab3:
+        aligned, by_matched_party = alignment_view(".", *alignment_params(selected_province, party_range, selected_base))
+
+        st.caption(
+            "แต่ละแถว = คะแนนพรรคในช่วงหมายเลขที่เลือก (small-party proxy) ต่อ 1 เขต แล้วดูว่าเบอร์นั้นไปตรงกับผู้สมัครพรรคไหน"
+        )
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("จำนวนแถวที่วิเคราะห์", f"{len(aligned):,}")
+        c2.metric("match rate", f"{aligned['isMatched'].mean() * 100:.2f}%")
+        c3.metric("คะแนน proxy รวม", f"{int(aligned['smallPartyVotes'].sum()):,}")
+
+        fig_align = px.bar(
+            by_matched_party.head(20),
+            x="candidatePartyName",
+            y="totalProxyVotes",
+            color="candidatePartyName",
+            title="คะแนน proxy ที่ map ไปยังพรรคของผู้สมัคร (Top 20)",
+            text="totalProxyVotes",
+        )
+        fig_align.update_layout(showlegend=False, xaxis_title="พรรคที่เลขชน", yaxis_title="คะแนน proxy")
+        st.plotly_chart(fig_align, use_container_width=True)
+
+        st.dataframe(by_matched_party, use_container_width=True, hide_index=True)
+
+        st.write("Top outlier เขตที่มีคะแนน proxy สูง")
+        outlier = (
+            aligned[["provinceName", "areaName", "areaCode", "smallPartyNo", "smallPartyName", "smallPartyVotes", "candidatePartyName", "candidateNo"]]
+            .sort_values("smallPartyVotes", ascending=False)
+            .head(200)
+        )
+        st.dataframe(outlier, use_container_width=True, hide_index=True)
+
+    st.markdown("---")
+    st.caption("Run: streamlit run dashboard_app.py")
 
-    st.write("Top outlier เขตที่มีคะแนน proxy สูง")
-    outlier = (
-        aligned[["provinceName", "areaName", "areaCode", "smallPartyNo", "smallPartyName", "smallPartyVotes", "candidatePartyName", "candidateNo"]]
-        .sort_values("smallPartyVotes", ascending=False)
-        .head(200)
-    )
-    st.dataframe(outlier, use_container_width=True, hide_index=True)
 
-st.markdown("---")
-st.caption("Run: streamlit run dashboard_app.py")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Sweep the alignment analysis over many ``small_party_range`` / ``base_party_numbers`` settings.
+
+``build_dashboard_data.py`` matches party-list party number N in an area to the
+constituency candidate numbered N there. It then keeps the pairs whose party number is in
+``small_party_range`` and whose candidate belongs to a base party. The same
+(area, party number) -> candidate party collisions are the input to every setting, so they
+are loaded once into a ``CollisionTable``.
+
+The table keeps cumulative sums over party number for each candidate party, so the totals
+for any range [lo, hi] are ``cum[hi] - cum[lo - 1]``. A base-party set is a bitmask over
+candidate parties. Distinct-area counts cannot be differenced, so ranges sharing ``lo`` are
+walked by increasing ``hi`` with a running OR of per-number area bitmasks. One pass
+produces every (range, base set) row of the sweep table.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+from array import array
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+
+SWEEP_COLUMNS = ["range", "baseSet", "rows", "matchedRows", "baseFilteredRows", "baseFilteredProxyVotes", "baseAreaCount"]
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class CollisionTable:
+    """One row per party-list vote row with an integer party number, as flat columns.
+
+    ``cand`` is the candidate-party slot of the candidate with the same number in that area:
+    0 when there is none, else 1 + index into ``cand_parties``. ``area_candidates`` lists each
+    area's ``(candidate number, slot)`` pairs.
+    """
+
+    def __init__(
+        self,
+        area_codes: list[str],
+        cand_parties: list[dict],
+        area: array,
+        party_no: array,
+        cand: array,
+        votes: array,
+        area_candidates: list[list[tuple[int, int]]] | None = None,
+    ):
+        self.area_codes = area_codes
+        self.cand_parties = cand_parties
+        self.area_candidates = area_candidates or [[] for _ in area_codes]
+        self.area = area
+        self.party_no = party_no
+        self.cand = cand
+        self.votes = votes
+        self.max_no = max(party_no, default=0)
+        self.n_slots = len(cand_parties) + 1
+        self._prefix()
+
+    def _prefix(self) -> None:
+        """Per-slot cumulative rows / votes over party number, and per-(slot, number) area bitmasks."""
+        width = self.max_no + 1
+        rows = [array("q", [0]) * width for _ in range(self.n_slots)]
+        votes = [array("q", [0]) * width for _ in range(self.n_slots)]
+        self.area_masks = [[0] * width for _ in range(self.n_slots)]
+        for a, p, s, v in zip(self.area, self.party_no, self.cand, self.votes):
+            rows[s][p] += 1
+            votes[s][p] += v
+            self.area_masks[s][p] |= 1 << a
+        for s in range(self.n_slots):
+            for p in range(1, width):
+                rows[s][p] += rows[s][p - 1]
+                votes[s][p] += votes[s][p - 1]
+        self.cum_rows = rows
+        self.cum_votes = votes
+
+    def slot_mask(self, party_numbers) -> int:
+        """Bitmask of the candidate-party slots whose party number is in ``party_numbers``."""
+        wanted = set(party_numbers)
+        return sum(1 << (i + 1) for i, p in enumerate(self.cand_parties) if p["no"] in wanted)
+
+    def range_totals(self, lo: int, hi: int) -> tuple[list[int], list[int]]:
+        """(rows, votes) per slot for party numbers in [lo, hi]."""
+        lo, hi = max(lo, 1), min(hi, self.max_no)
+        if lo > hi:
+            return [0] * self.n_slots, [0] * self.n_slots
+        return (
+            [c[hi] - c[lo - 1] for c in self.cum_rows],
+            [c[hi] - c[lo - 1] for c in self.cum_votes],
+        )
+
+    def sweep(self, ranges: list[tuple[int, int]], base_sets: list[list[int]]) -> list[list]:
+        """One row per (range, base set), laid out as ``SWEEP_COLUMNS`` (indexes into the inputs)."""
+        masks = [self.slot_mask(b) for b in base_sets]
+        slots = [[s for s in range(self.n_slots) if m >> s & 1] for m in masks]
+        # areas with a base match at each party number, per base set
+        set_areas = [[0] * (self.max_no + 1) for _ in base_sets]
+        for b, members in enumerate(slots):
+            for s in members:
+                for p, bits in enumerate(self.area_masks[s]):
+                    set_areas[b][p] |= bits
+        by_lo: dict[int, list[int]] = {}
+        for r, (lo, _) in enumerate(ranges):
+            by_lo.setdefault(lo, []).append(r)
+        out: list[list | None] = [None] * (len(ranges) * len(base_sets))
+        for lo, members in by_lo.items():
+            members.sort(key=lambda r: ranges[r][1])
+            running = [0] * len(base_sets)
+            reached = max(lo, 1) - 1
+            for r in members:
+                lo_r, hi = ranges[r]
+                rows, votes = self.range_totals(lo_r, hi)
+                for b in range(len(base_sets)):
+                    for p in range(reached + 1, min(hi, self.max_no) + 1):
+                        running[b] |= set_areas[b][p]
+                    out[r * len(base_sets) + b] = [
+                        r,
+                        b,
+                        sum(rows),
+                        sum(rows) - rows[0],
+                        sum(rows[s] for s in slots[b]),
+                        sum(votes[s] for s in slots[b]),
+                        running[b].bit_count(),
+                    ]
+                reached = max(reached, min(hi, self.max_no))
+        return out
+
+    def range_breakdown(self, ranges: list[tuple[int, int]]) -> list[list[list[int]]]:
+        """Per range, the non-zero ``[cand party index, rows, votes]`` so any base set can be recombined."""
+        out = []
+        for lo, hi in ranges:
+            rows, votes = self.range_totals(lo, hi)
+            out.append([[s - 1, rows[s], votes[s]] for s in range(1, self.n_slots) if rows[s]])
+        return out
+
+
+def load_collisions(input_dir: Path) -> CollisionTable:
+    """Collision table from the same inputs and matching rules as ``build_dashboard_data.py``."""
+    parties_by_code = {p["code"]: p for p in load_json(input_dir / "party-data.json")["parties"]}
+    cand_index: dict[str, int] = {}
+    cand_parties: list[dict] = []
+    candidate_slot: dict[str, dict[int, int]] = {}
+    for c in load_json(input_dir / "candidate-data.json")["candidates"]:
+        no = c.get("number")
+        if not isinstance(no, int):
+            continue
+        code = c.get("partyCode")
+        if code not in cand_index:
+            cand_index[code] = len(cand_parties)
+            party = parties_by_code.get(code, {})
+            cand_parties.append({"code": code, "no": party.get("number"), "name": party.get("name")})
+        candidate_slot.setdefault(c["areaCode"], {})[no] = cand_index[code] + 1
+
+    area_codes: list[str] = []
+    area_candidates: list[list[tuple[int, int]]] = []
+    area, party_no, cand, votes = array("i"), array("i"), array("i"), array("q")
+    for fp in sorted(glob.glob(str(input_dir / "area-candidates" / "AREA-*.json"))):
+        payload = load_json(Path(fp))
+        area_code = payload["areaCode"]
+        a = len(area_codes)
+        area_codes.append(area_code)
+        slots = candidate_slot.get(area_code, {})
+        area_candidates.append(sorted(slots.items()))
+        for e in payload.get("entries", []):
+            no = parties_by_code.get(e["partyCode"], {}).get("number")
+            if not isinstance(no, int) or no < 1:
+                continue
+            area.append(a)
+            party_no.append(no)
+            cand.append(slots.get(no, 0))
+            votes.append(e.get("voteTotal", 0) or 0)
+    return CollisionTable(area_codes, cand_parties, area, party_no, cand, votes, area_candidates)
+
+
+def parse_range(text: str) -> tuple[int, int]:
+    lo, _, hi = text.partition("-")
+    return int(lo), int(hi or lo)
+
+
+def parse_base_set(text: str) -> tuple[str, list[int]]:
+    """``name=7,9,22`` or ``7,9,22`` (named after its numbers)."""
+    name, _, numbers = text.rpartition("=")
+    parsed = [int(x) for x in numbers.split(",") if x.strip()]
+    return name or ",".join(map(str, parsed)), parsed
+
+
+def default_base_sets(config_numbers: list[int]) -> list[tuple[str, list[int]]]:
+    """The configured set, each leave-one-out subset, and each party on its own."""
+    sets = [("config", list(config_numbers))]
+    if len(config_numbers) > 1:
+        sets += [(f"config-minus-{n}", [x for x in config_numbers if x != n]) for n in config_numbers]
+    sets += [(f"only-{n}", [n]) for n in config_numbers]
+    return sets
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Sweep alignment totals over party-number ranges and base-party sets")
+    ap.add_argument("--config", default="config/analysis-config.json")
+    ap.add_argument("--input-dir", default=".")
+    ap.add_argument("--ranges", nargs="+", type=parse_range, default=None, help="lo-hi ranges; default every range within 1..--range-max")
+    ap.add_argument("--range-max", type=int, default=20)
+    ap.add_argument(
+        "--base-set",
+        action="append",
+        type=parse_base_set,
+        default=None,
+        help="[name=]7,9,22 (repeatable); default: the configured set, its leave-one-out subsets and single parties",
+    )
+    ap.add_argument("--out", default="docs/data/alignment-sweep.json")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    cfg = load_json(Path(args.config))
+    table = load_collisions(Path(args.input_dir))
+    ranges = args.ranges or [(lo, hi) for lo in range(1, args.range_max + 1) for hi in range(lo, args.range_max + 1)]
+    config_range = tuple(cfg["small_party_range"])
+    if config_range not in ranges:
+        ranges.append(config_range)
+    base_sets = args.base_set or default_base_sets(cfg["base_party_numbers"])
+
+    inst.phase("sweep")
+    rows = table.sweep(ranges, [numbers for _, numbers in base_sets])
+    breakdown = table.range_breakdown(ranges)
+    inst.stop()
+
+    out = {
+        "meta": {
+            "collisionRows": len(table.votes),
+            "areas": len(table.area_codes),
+            "maxPartyNo": table.max_no,
+            "configRange": ranges.index(config_range),
+        },
+        "ranges": [list(r) for r in ranges],
+        "baseSets": [{"name": name, "partyNos": numbers} for name, numbers in base_sets],
+        "candidateParties": table.cand_parties,
+        "columns": SWEEP_COLUMNS,
+        "rows": rows,
+        "byCandidateParty": {"columns": ["candidateParty", "rows", "votes"], "byRange": breakdown},
+    }
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(out, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    inst.write_sidecar(out_path)
+    print(f"wrote {out_path}: {len(ranges)} ranges x {len(base_sets)} base sets from {len(table.votes)} collision rows")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
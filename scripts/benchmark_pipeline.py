@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Benchmark pipeline stages on synthetic inputs at several scales (fully offline)."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from make_synthetic_data import generate
+from run_pipeline import SCRIPTS_DIR, STAGES, resolve_deps
+
+REPO_DIR = SCRIPTS_DIR.parent
+
+# Runs dashboard_app.load_data outside of a Streamlit session; the cache is cleared first so
+# the measurement is a cold load.
+DASHBOARD_LOAD_SNIPPET = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import dashboard_app
+fn = dashboard_app.load_data
+if hasattr(fn, "clear"):
+    fn.clear()
+votes, cand, party_df, area_meta, summary = fn(sys.argv[2])
+print(f"votes={len(votes)} candidates={len(cand)}")
+"""
+
+
+def timed_subprocess(cmd: list[str], cwd: Path) -> dict:
+    """Run cmd and return wall time plus the child's own peak RSS (via wait4 where available)."""
+    with tempfile.TemporaryFile("w+") as out, tempfile.TemporaryFile("w+") as err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=out, stderr=err, text=True)
+        max_rss = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        else:
+            proc.wait()
+        seconds = time.perf_counter() - t0
+        out.seek(0)
+        err.seek(0)
+        stdout, stderr = out.read(), err.read()
+    return {
+        "returncode": proc.returncode,
+        "seconds": seconds,
+        "maxRssBytes": max_rss,
+        "stderr": stderr.strip().splitlines()[-10:],
+        "stdout": stdout.strip().splitlines()[-3:],
+    }
+
+
+def dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def with_prerequisites(stage_names: list[str]) -> list[str]:
+    resolve_deps(STAGES)
+    by_name = {s.name: s for s in STAGES}
+    needed = set()
+    todo = [n for n in stage_names if n in by_name]
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(by_name[name].deps)
+    return [s.name for s in STAGES if s.name in needed]
+
+
+def best_of(cmd: list[str], cwd: Path, repeat: int) -> dict:
+    runs = [timed_subprocess(cmd, cwd) for _ in range(max(repeat, 1))]
+    failed = [r for r in runs if r["returncode"] != 0]
+    return failed[0] if failed else min(runs, key=lambda r: r["seconds"])
+
+
+def run_scale(work: Path, areas: int, parties: int, snapshots: int, stage_names: list[str], seed: int, repeat: int = 1) -> dict:
+    t0 = time.perf_counter()
+    info = generate(work, areas=areas, parties=parties, snapshots=snapshots, seed=seed)
+    gen_seconds = time.perf_counter() - t0
+    result = {**info, "generateSeconds": gen_seconds, "inputBytes": dir_bytes(work), "stages": []}
+
+    # upstream stages that were not asked for still run once (untimed) so later stages have inputs
+    by_name = {s.name: s for s in STAGES}
+    for name in with_prerequisites(stage_names):
+        stage = by_name[name]
+        cmd = [sys.executable, str(SCRIPTS_DIR / stage.script), *stage.args]
+        if name not in stage_names:
+            print(f"  [{areas}] {name} (setup) ...", flush=True)
+            timed_subprocess(cmd, work)
+            continue
+        print(f"  [{areas}] {name} ...", flush=True)
+        result["stages"].append(_stage_row(name, best_of(cmd, work, repeat), areas))
+
+    if "dashboard_load" in stage_names:
+        print(f"  [{areas}] dashboard_load ...", flush=True)
+        res = best_of([sys.executable, "-c", DASHBOARD_LOAD_SNIPPET, str(REPO_DIR), str(work)], work, repeat)
+        if res["returncode"] != 0 and any("ModuleNotFoundError" in line for line in res["stderr"]):
+            result["stages"].append({"name": "dashboard_load", "status": "skipped", "reason": res["stderr"][-1]})
+        else:
+            result["stages"].append(_stage_row("dashboard_load", res, areas))
+    return result
+
+
+def _stage_row(name: str, res: dict, areas: int) -> dict:
+    ok = res["returncode"] == 0
+    row = {
+        "name": name,
+        "status": "ok" if ok else "failed",
+        "seconds": res["seconds"],
+        "maxRssBytes": res["maxRssBytes"],
+        "areasPerSecond": areas / res["seconds"] if ok and res["seconds"] > 0 else None,
+    }
+    if not ok:
+        row["stderr"] = res["stderr"]
+    return row
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    base_index = {
+        (scale["areas"], scale["parties"], st["name"]): st
+        for scale in baseline.get("scales", [])
+        for st in scale.get("stages", [])
+        if st.get("status") == "ok"
+    }
+    rows = []
+    for scale in results["scales"]:
+        for st in scale["stages"]:
+            b = base_index.get((scale["areas"], scale["parties"], st["name"]))
+            if not b or st.get("status") != "ok":
+                continue
+            ratio = st["seconds"] / b["seconds"] if b["seconds"] else None
+            rows.append(
+                {
+                    "areas": scale["areas"],
+                    "stage": st["name"],
+                    "baselineSeconds": b["seconds"],
+                    "seconds": st["seconds"],
+                    "ratio": ratio,
+                    "regression": ratio is not None and ratio > 1.0 + tolerance,
+                }
+            )
+    return rows
+
+
+def main() -> int:
+    all_stages = [s.name for s in STAGES] + ["dashboard_load"]
+    ap = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data")
+    ap.add_argument("--areas", type=int, nargs="+", default=[400], help="Area counts to benchmark, e.g. 400 4000 40000")
+    ap.add_argument("--parties", type=int, default=60)
+    ap.add_argument("--snapshots", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=69)
+    ap.add_argument("--stages", nargs="+", default=all_stages, choices=all_stages)
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is recorded")
+    ap.add_argument("--work-dir", default=None, help="Where to generate inputs (default: a temp dir per scale)")
+    ap.add_argument("--out", default="bench/results.json")
+    ap.add_argument("--baseline", default="bench/baseline.json")
+    ap.add_argument("--save-baseline", action="store_true", help="Also write the results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline before flagging")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    results = {
+        "generatedAt": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scales": [],
+    }
+    for areas in args.areas:
+        print(f"scale areas={areas} parties={args.parties} snapshots={args.snapshots}", flush=True)
+        if args.work_dir:
+            work = Path(args.work_dir) / f"areas-{areas}"
+            results["scales"].append(run_scale(work, areas, args.parties, args.snapshots, args.stages, args.seed, args.repeat))
+        else:
+            with tempfile.TemporaryDirectory(prefix=f"bench-{areas}-") as tmp:
+                results["scales"].append(run_scale(Path(tmp), areas, args.parties, args.snapshots, args.stages, args.seed, args.repeat))
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists():
+        results["comparison"] = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+        regressions = [r for r in results["comparison"] if r["regression"]]
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for scale in results["scales"]:
+        for st in scale["stages"]:
+            secs = f"{st['seconds']:.2f}s" if "seconds" in st else "-"
+            print(f"{scale['areas']:>7} {st['name']:<16} {st['status']:<8} {secs}")
+    for r in results.get("comparison", []):
+        flag = " REGRESSION" if r["regression"] else ""
+        print(f"{r['areas']:>7} {r['stage']:<16} x{r['ratio']:.2f} vs baseline{flag}")
+    print(f"wrote {out_path}")
+    return 1 if (args.fail_on_regression and regressions) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
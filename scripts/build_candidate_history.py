@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Candidate-level cross-year history: year-69 candidates joined to their year-66 candidacy.
+
+``candidate-data.json`` flags each year-69 candidate with ``is66Winner``, ``party66RefCode``
+(the year-66 ballot number of their party then) and ``switchedParty``. The year-66
+candidacy is found in the ECT database written by ``ingest_ectreport66.py``. The first
+match is by exact full name. Failing that, the year-66 candidate of the ``party66RefCode``
+party in the same district is taken if the names are a fuzzy match (``district_party``),
+or, unverified, if both are flagged as the year-66 winner (``district_party_unverified``).
+Every lookup is a dict, so the incumbent,
+party-switcher and retained-seat tables come out of one pass over the candidates. The
+output keeps the candidate-keyed records and the area index, so any candidate's history
+is one key lookup away.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+from normalize_election66 import normalize_province
+from party_name_index import clusters, similarity
+
+CANDIDATES66_SQL = """
+SELECT
+    cc.mp_app_id, cc.mp_app_name, cc.mp_app_no,
+    rc.cons_id, c.cons_no, p.province,
+    o.party_no, o.name AS party_name,
+    rc.mp_app_vote, rc.mp_app_rank, rc.mp_app_vote_percent
+FROM Candidate_Constituency cc
+LEFT JOIN result_constituencies_Candidate rc ON rc.mp_app_id = cc.mp_app_id
+LEFT JOIN constituency c ON c.cons_id = rc.cons_id
+LEFT JOIN info_province p ON p.prov_id = c.prov_id
+LEFT JOIN info_party_overview o ON o.id = cc.mp_app_party_id
+"""
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def name_key(*parts: str | None) -> str:
+    return re.sub(r"\s+", "", "".join(p or "" for p in parts))
+
+
+def name_similarity(name69: str, name66: str) -> float:
+    """How well a year-69 first + last name matches the end of a year-66 full name, which carries the title."""
+    a = clusters(name69.replace("เเ", "แ"))
+    b = clusters(name66.replace("เเ", "แ"))
+    # titles differ between years (ร.ต.ต. vs ร้อยตำรวจตรี), so only the tail of the 66 name is compared
+    return max((similarity(a, b[-k:]) for k in range(max(len(a) - 2, 1), len(a) + 3)), default=0.0)
+
+
+def load_candidates66(db_path: Path, aliases: dict[str, str]) -> list[dict]:
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    con.row_factory = sqlite3.Row
+    try:
+        out = []
+        for r in con.execute(CANDIDATES66_SQL):
+            province = normalize_province(r["province"] or "", aliases)
+            out.append(
+                {
+                    "mp_app_id": r["mp_app_id"],
+                    "name": r["mp_app_name"],
+                    "district_key": f"{province}__{r['cons_no']}" if province and r["cons_no"] is not None else None,
+                    "cons_id": r["cons_id"],
+                    "candidate_no": r["mp_app_no"],
+                    "party_no": r["party_no"],
+                    "party_name": r["party_name"],
+                    "votes": r["mp_app_vote"],
+                    "rank": r["mp_app_rank"],
+                    "vote_percent": r["mp_app_vote_percent"],
+                }
+            )
+        return out
+    finally:
+        con.close()
+
+
+def build_history(
+    candidates: list[dict],
+    areas: dict[str, dict],
+    parties69: dict[str, dict],
+    results69: dict[str, dict],
+    candidates66: list[dict],
+    name_threshold: float = 0.85,
+):
+    """One pass over the year-69 candidates; returns (records by code, tables, area index)."""
+    by_name66: dict[str, list[dict]] = {}
+    by_district_party66: dict[tuple[str, int], dict] = {}
+    party66_name: dict[int, str] = {}
+    for c in candidates66:
+        by_name66.setdefault(name_key(c["name"]), []).append(c)
+        if c["district_key"] and c["party_no"] is not None:
+            by_district_party66[(c["district_key"], c["party_no"])] = c
+            party66_name[c["party_no"]] = c["party_name"]
+
+    records: dict[str, dict] = {}
+    by_area: dict[str, list[str]] = {}
+    winner69_by_area: dict[str, dict] = {}
+    incumbents, switchers = [], []
+    for cand in candidates:
+        code = cand["code"]
+        area = areas.get(cand.get("areaCode"), {})
+        party69 = parties69.get(cand.get("partyCode"), {})
+        result = results69.get(code)
+        ref = cand.get("party66RefCode")
+        ref_no = int(ref) if ref is not None and str(ref).isdigit() else None
+
+        key = name_key(cand.get("prefix"), cand.get("specialPrefix"), cand.get("firstName"), cand.get("lastName"))
+        hits = by_name66.get(key, [])
+        c66, match = (hits[0], "name") if len(hits) == 1 else (None, None)
+        if c66 is None and ref_no is not None:
+            # same district and party is only someone else's candidacy unless the name or the win agrees
+            hit = by_district_party66.get((area.get("district_key"), ref_no))
+            if hit and name_similarity(name_key(cand.get("firstName"), cand.get("lastName")), name_key(hit["name"])) >= name_threshold:
+                c66, match = hit, "district_party"
+            elif hit and cand.get("is66Winner") and hit.get("rank") == 1:
+                c66, match = hit, "district_party_unverified"
+
+        won69 = bool(result and result.get("rank") == 1)
+        rec = {
+            "candidate_code": code,
+            "name": f"{cand.get('prefix') or ''}{cand.get('specialPrefix') or ''}{cand.get('firstName') or ''} {cand.get('lastName') or ''}".strip(),
+            "area_code": cand.get("areaCode"),
+            "district_key_69": area.get("district_key"),
+            "candidate_no": cand.get("number"),
+            "party_code_69": cand.get("partyCode"),
+            "party_name_69": party69.get("name"),
+            "is_66_winner": bool(cand.get("is66Winner")),
+            "party_66_no": ref_no,
+            "party_66_name": party66_name.get(ref_no) if ref_no is not None else None,
+            "switched_party": cand.get("switchedParty"),
+            "rank_69": result.get("rank") if result else None,
+            "votes_69": result.get("voteTotal") if result else None,
+            "won_69": won69,
+            "match_66": match,
+            "candidacy_66": c66,
+            "same_district": (c66["district_key"] == area.get("district_key")) if c66 else None,
+        }
+        records[code] = rec
+        by_area.setdefault(rec["area_code"], []).append(code)
+        if won69:
+            winner69_by_area[rec["area_code"]] = rec
+        if rec["is_66_winner"]:
+            incumbents.append(rec)
+        if rec["switched_party"]:
+            switchers.append(rec)
+
+    retained = []
+    for area_code, area in areas.items():
+        w = winner69_by_area.get(area_code)
+        held_by = area.get("win66PartyCode")
+        retained.append(
+            {
+                "area_code": area_code,
+                "district_key_69": area.get("district_key"),
+                "party_code_66_winner": held_by,
+                "party_code_69_winner": w["party_code_69"] if w else None,
+                "winner_69": w["candidate_code"] if w else None,
+                "seat_retained": bool(w and held_by and w["party_code_69"] == held_by),
+                "winner_is_66_winner": bool(w and w["is_66_winner"]),
+                "winner_switched_party": bool(w and w["switched_party"]),
+            }
+        )
+
+    tables = {
+        "incumbents": [incumbent_row(r) for r in incumbents],
+        "party_switchers": [switcher_row(r) for r in switchers],
+        "retained_seats": retained,
+    }
+    return records, tables, by_area
+
+
+def incumbent_row(r: dict) -> dict:
+    c66 = r["candidacy_66"] or {}
+    return {
+        "candidate_code": r["candidate_code"],
+        "name": r["name"],
+        "area_code": r["area_code"],
+        "district_key_69": r["district_key_69"],
+        "district_key_66": c66.get("district_key"),
+        "same_district": r["same_district"],
+        "party_name_66": r["party_66_name"],
+        "party_name_69": r["party_name_69"],
+        "switched_party": r["switched_party"],
+        "votes_66": c66.get("votes"),
+        "votes_69": r["votes_69"],
+        "rank_69": r["rank_69"],
+        "re_elected": r["won_69"],
+    }
+
+
+def switcher_row(r: dict) -> dict:
+    c66 = r["candidacy_66"] or {}
+    return {
+        "candidate_code": r["candidate_code"],
+        "name": r["name"],
+        "area_code": r["area_code"],
+        "party_name_66": r["party_66_name"],
+        "party_name_69": r["party_name_69"],
+        "was_66_winner": r["is_66_winner"],
+        "rank_66": c66.get("rank"),
+        "rank_69": r["rank_69"],
+        "won_69": r["won_69"],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Join year-69 candidates to their year-66 candidacy and party")
+    ap.add_argument("--candidates", default="candidate-data.json")
+    ap.add_argument("--common", default="common-data.json")
+    ap.add_argument("--parties", default="party-data.json")
+    ap.add_argument("--const-dir", default="area-constituency")
+    ap.add_argument("--ect-db", default="data/ect66.sqlite", help="Output of scripts/ingest_ectreport66.py")
+    ap.add_argument("--province-aliases", default="config/province-aliases.json")
+    ap.add_argument("--name-threshold", type=float, default=0.85, help="Name similarity needed to accept a district + party match")
+    ap.add_argument("--out", default="data/research/candidate_history.json")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    aliases_path = Path(args.province_aliases)
+    aliases = load_json(aliases_path) if aliases_path.exists() else {}
+    common = load_json(Path(args.common))
+    provinces = {p["code"]: p.get("name", "") for p in common["provinces"]}
+    areas = {}
+    for a in common["areas"]:
+        province = normalize_province(provinces.get(a.get("provinceCode"), ""), aliases)
+        areas[a["code"]] = {**a, "district_key": f"{province}__{a.get('number')}" if province and a.get("number") is not None else None}
+    parties69 = {p["code"]: p for p in load_json(Path(args.parties))["parties"]}
+    candidates = load_json(Path(args.candidates))["candidates"]
+    results69 = {}
+    for fp in sorted(glob.glob(f"{args.const_dir}/AREA-*.json")):
+        for e in load_json(Path(fp)).get("entries", []):
+            if e.get("candidateCode"):
+                results69[e["candidateCode"]] = e
+    candidates66 = load_candidates66(Path(args.ect_db), aliases)
+
+    inst.phase("join")
+    records, tables, by_area = build_history(candidates, areas, parties69, results69, candidates66, args.name_threshold)
+
+    inst.phase("serialization")
+    incumbents = tables["incumbents"]
+    switchers = tables["party_switchers"]
+    retained = tables["retained_seats"]
+    summary = {
+        "candidates_69": len(records),
+        "matched_66": dict(Counter(r["match_66"] or "unmatched" for r in records.values())),
+        "flagged_66_party_unmatched": sum(1 for r in records.values() if r["party_66_no"] is not None and r["match_66"] is None),
+        "incumbents_running": len(incumbents),
+        "incumbents_re_elected": sum(1 for r in incumbents if r["re_elected"]),
+        "incumbents_changed_district": sum(1 for r in incumbents if r["same_district"] is False),
+        "party_switchers": len(switchers),
+        "party_switchers_won": sum(1 for r in switchers if r["won_69"]),
+        "seats": len(retained),
+        "seats_retained_by_66_party": sum(1 for r in retained if r["seat_retained"]),
+        "seats_won_by_66_winner": sum(1 for r in retained if r["winner_is_66_winner"]),
+    }
+    inst.stop()
+    out = {
+        "meta": {"source_66": str(args.ect_db), "summary": summary},
+        "candidates": records,
+        "index": {"by_area": by_area},
+        **tables,
+    }
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(out, ensure_ascii=False), encoding="utf-8")
+    inst.write_sidecar(out_path)
+
+    print(f"wrote {out_path}")
+    print(" ".join(f"{k}={v}" for k, v in summary.items() if not isinstance(v, dict)))
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,10 +6,18 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import math
 import re
-from collections import Counter, defaultdict
+from collections import Counter
 from pathlib import Path
 
+from columnar import export_columnar
+from crossyear_panel import Panel, build_panel, save_panel, to_float
+from district_overlap import OverlapMatrix, overlap_with_identity, read_overlap
+from instrumentation import Instrumentation, add_instrumentation_args
+from party_name_index import PartyNameIndex
+from row_stream import RowWriter, load_document
+
 
 def load_json(path: Path):
     return json.loads(path.read_text(encoding="utf-8"))
@@ -45,6 +53,126 @@ def read_crosswalk(path: Path):
     return rows
 
 
+def opt(x: float):
+    """Panel NaN back to the JSON null the row dicts carried."""
+    return None if math.isnan(x) else x
+
+
+def panel_margins(panel: Panel, rows66: list[dict]) -> dict:
+    """district_key -> year-66 rank-1 share minus rank-2 share, from the dense rank column.
+
+    Rows in ``panel.extra66`` compete too. Missing ranks sort last and ties keep year-66 row
+    order, matching a stable sort by rank.
+    """
+    rank = panel.col("constituency_rank_66")
+    share = panel.col("constituency_share_66")
+    ords = panel.col("row66")
+    width = panel.n_parties
+    extra: dict[int, list[tuple[tuple[float, int], float]]] = {}
+    for o, c in panel.extra66:
+        r = rows66[o]
+        k = to_float(r.get("constituency_rank"))
+        extra.setdefault(c // width, []).append(((9999 if math.isnan(k) else k, o), to_float(r.get("constituency_share"))))
+    margins = {}
+    for i, d in enumerate(panel.districts):
+        best = second = None
+        cands = [((9999 if math.isnan(rank[c]) else rank[c], ords[c]), share[c]) for c in range(i * width, (i + 1) * width) if ords[c] >= 0]
+        for k, v in cands + extra.get(i, []):
+            if best is None or k < best[0]:
+                best, second = (k, v), best
+            elif second is None or k < second[0]:
+                second = (k, v)
+        if best is not None and second is not None and not math.isnan(best[1]) and not math.isnan(second[1]):
+            margins[d["key"]] = best[1] - second[1]
+    return margins
+
+
+def reallocate_rows66(rows66: list[dict], overlap: OverlapMatrix, district_meta69: dict) -> tuple[list[dict], list[dict]]:
+    """Move year-66 rows of re-drawn districts onto year-69 boundaries.
+
+    Each party's votes over the source districts form one vector, reallocated with a single
+    sparse mat-vec per vote type; turnout totals go through the same matrix so shares stay
+    consistent. Returns (untouched rows, reallocated rows) with ranks recomputed per target.
+    """
+    src_id = overlap.source_id
+    n_src = len(overlap.sources)
+    kept = [r for r in rows66 if r.get("district_key") not in src_id]
+
+    votes: dict[str, tuple[list[float], list[float]]] = {}
+    base: dict[str, dict] = {}
+    totals = ([0.0] * n_src, [0.0] * n_src)
+    for r in rows66:
+        j = src_id.get(r.get("district_key"))
+        if j is None:
+            continue
+        name = normalize_text(r.get("party_name_norm") or r.get("party_name_raw"))
+        cv, pv = votes.setdefault(name, ([0.0] * n_src, [0.0] * n_src))
+        base.setdefault(name, r)
+        cv[j] += r.get("constituency_votes") or 0
+        pv[j] += r.get("partylist_votes") or 0
+        # totals are per district and repeated on every row of it
+        totals[0][j] = r.get("constituency_total_votes") or 0
+        totals[1][j] = r.get("partylist_total_votes") or 0
+
+    c_tot = overlap.matvec(totals[0])
+    p_tot = overlap.matvec(totals[1])
+    sources_by_target = [
+        [overlap.sources[overlap.indices[k]] for k in range(overlap.indptr[i], overlap.indptr[i + 1])]
+        for i in range(len(overlap.targets))
+    ]
+
+    by_target: list[list[dict]] = [[] for _ in overlap.targets]
+    for name, (cv, pv) in votes.items():
+        cy = overlap.matvec(cv)
+        py = overlap.matvec(pv)
+        b = base[name]
+        for i, dk in enumerate(overlap.targets):
+            if not cy[i] and not py[i]:
+                continue
+            meta = district_meta69.get(dk, {})
+            c_share = cy[i] / c_tot[i] if c_tot[i] else None
+            p_share = py[i] / p_tot[i] if p_tot[i] else None
+            by_target[i].append(
+                {
+                    "election_year": b.get("election_year"),
+                    "source_sheet": b.get("source_sheet"),
+                    "province_name_raw": meta.get("province_name_norm"),
+                    "province_name_norm": meta.get("province_name_norm"),
+                    "district_no": meta.get("district_no"),
+                    "district_key": dk,
+                    "cons_id_raw": None,
+                    "party_name_raw": b.get("party_name_raw"),
+                    "party_name_norm": b.get("party_name_norm"),
+                    "party_no_raw": b.get("party_no_raw"),
+                    "party_id_raw": b.get("party_id_raw"),
+                    "candidate_no": None,
+                    "candidate_id_raw": None,
+                    "constituency_votes": cy[i],
+                    "partylist_votes": py[i],
+                    "constituency_rank": None,
+                    "partylist_rank": None,
+                    "constituency_total_votes": c_tot[i],
+                    "partylist_total_votes": p_tot[i],
+                    "constituency_share": c_share,
+                    "partylist_share": p_share,
+                    "gap_raw": (c_share - p_share) if c_share is not None and p_share is not None else None,
+                    "gap_rank_shift": None,
+                    "reallocated_from": sources_by_target[i],
+                }
+            )
+
+    reallocated = []
+    for rows in by_target:
+        for rank, r in enumerate(sorted(rows, key=lambda x: -x["partylist_votes"]), start=1):
+            r["partylist_rank"] = rank
+        rows.sort(key=lambda x: -x["constituency_votes"])
+        for rank, r in enumerate(rows, start=1):
+            r["constituency_rank"] = rank
+            r["gap_rank_shift"] = rank - r["partylist_rank"]
+        reallocated.extend(rows)
+    return kept, reallocated
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Build cross-year mapped dataset")
     ap.add_argument("--in66", default="data/normalized/election66_normalized.json")
@@ -52,13 +180,20 @@ def main() -> int:
     ap.add_argument("--parties", default="party-data.json")
     ap.add_argument("--crosswalk", default="config/party-crosswalk-66-69.csv")
     ap.add_argument("--settings", default="config/research-settings.json")
-    ap.add_argument("--out-features", default="data/research/crossyear_features.json")
+    ap.add_argument("--district-overlap", default="config/district-overlap-66-69.csv", help="district66_key,district69_key,weight for re-drawn districts")
+    ap.add_argument("--out-features", default="data/research/crossyear_features.json", help="A .jsonl path writes JSON Lines")
     ap.add_argument("--out-summary", default="data/research/crossyear_summary.json")
     ap.add_argument("--out-quality", default="data/research/mapping_quality_report.json")
+    ap.add_argument("--out-columnar", default=None, help="Also write a columnar copy: a .npy column directory, or Arrow IPC if the path ends in .arrow")
+    ap.add_argument("--out-panel", default="data/research/crossyear_panel", help="Stem for <stem>.json header + <stem>.bin columns")
+    add_instrumentation_args(ap)
     args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+    inst.phase("loading")
 
-    n66 = load_json(Path(args.in66))
-    n69 = load_json(Path(args.in69))
+    # inputs may be streamed JSON or JSON Lines
+    n66 = load_document(Path(args.in66))
+    n69 = load_document(Path(args.in69))
     settings = load_json(Path(args.settings))
     parties69 = load_json(Path(args.parties))["parties"]
     crosswalk = read_crosswalk(Path(args.crosswalk))
@@ -72,18 +207,36 @@ def main() -> int:
         if key:
             crosswalk_by_name[key] = r
 
+    fuzzy_threshold = float(settings.get("fuzzy_party_match_threshold", 0.85))
+    party69_index = PartyNameIndex([(p["code"], p.get("name")) for p in parties69 if p.get("name")])
+    # each distinct 66 name is looked up once, not once per row
+    fuzzy_cache: dict[str, list[dict]] = {}
+
     rows66 = n66["rows"]
     rows69 = n69["rows"]
 
     district66 = {r["district_key"] for r in rows66 if r.get("district_key")}
     district69 = {r["district_key"] for r in rows69 if r.get("district_key")}
 
+    # re-drawn year-66 districts are reallocated onto year-69 boundaries before any matching
+    inst.phase("district_reallocation")
+    overlap = overlap_with_identity(read_overlap(Path(args.district_overlap)))
+    reallocated66: list[dict] = []
+    if overlap.nnz:
+        district_meta69 = {}
+        for r in rows69:
+            district_meta69.setdefault(r.get("district_key"), r)
+        rows66, reallocated66 = reallocate_rows66(rows66, overlap, district_meta69)
+        rows66 = rows66 + reallocated66
+    district66_aligned = {r["district_key"] for r in rows66 if r.get("district_key")}
+
+    inst.phase("party_mapping")
     mapped66 = []
     party_match_counts = Counter()
     unmapped_party_counter = Counter()
 
+    # rows are freshly parsed and owned here, so annotate them in place instead of copying
     for r in rows66:
-        rr = dict(r)
         pnorm = normalize_text(r.get("party_name_norm") or r.get("party_name_raw"))
 
         party_key_69 = None
@@ -103,38 +256,63 @@ def main() -> int:
                 party_match_conf = "manual"
                 mapping_notes = m.get("notes") or m.get("mapping_type") or "crosswalk"
 
+        if party_key_69 is None and pnorm:
+            if pnorm not in fuzzy_cache:
+                fuzzy_cache[pnorm] = party69_index.candidates(pnorm, limit=5)
+            top = fuzzy_cache[pnorm]
+            if top and top[0]["score"] >= fuzzy_threshold:
+                party_key_69 = top[0]["key"]
+                party_match_conf = "fuzzy"
+                mapping_notes = f"fuzzy:{top[0]['score']:.3f}"
+
         if party_key_69 is None:
             unmapped_party_counter[r.get("party_name_raw") or ""] += 1
 
-        district_conf = "high" if rr.get("district_key") in district69 else "low"
+        if r.get("reallocated_from") is not None:
+            district_conf = "reallocated" if r.get("district_key") in district69 else "low"
+        else:
+            district_conf = "high" if r.get("district_key") in district69 else "low"
 
-        rr["party_key_69"] = party_key_69
-        rr["party_match_confidence"] = party_match_conf
-        rr["district_match_confidence"] = district_conf
-        rr["mapping_notes"] = mapping_notes
-        mapped66.append(rr)
+        r["party_key_69"] = party_key_69
+        r["party_match_confidence"] = party_match_conf
+        r["district_match_confidence"] = district_conf
+        r["mapping_notes"] = mapping_notes
+        mapped66.append(r)
         party_match_counts[party_match_conf] += 1
 
-    rows69_mapped = []
     for r in rows69:
-        rr = dict(r)
-        rr["party_match_confidence"] = "exact"
-        rr["district_match_confidence"] = "high" if rr.get("district_key") in district66 else "medium"
-        rows69_mapped.append(rr)
-
-    # index year69 by district+party
-    idx69 = {(r.get("district_key"), r.get("party_key_69")): r for r in rows69_mapped if r.get("district_key") and r.get("party_key_69")}
+        r["party_match_confidence"] = "exact"
+        r["district_match_confidence"] = "high" if r.get("district_key") in district66_aligned else "medium"
+
+    # dense district x party panel; joins, winners and margins below read its columns
+    inst.phase("panel")
+    panel, panel_collisions = build_panel(mapped66, rows69, parties69)
+    width = panel.n_parties
+    row66 = panel.col("row66")
+    row69 = panel.col("row69")
+    gap66 = panel.col("gap_raw_66")
+    gap69 = panel.col("gap_raw_69")
+    cs66, cs69 = panel.col("constituency_share_66"), panel.col("constituency_share_69")
+    ps66, ps69 = panel.col("partylist_share_66"), panel.col("partylist_share_69")
+
+    inst.phase("comparative_rows")
+    # a year-66 row is comparable when its cell also has a year-69 row; a year-69 row implies
+    # the district maps (high confidence) and a shared column implies the year-66 party is
+    # mapped. Rows in panel.extra66 share a cell with an earlier row and read their own values.
+    comp = []
+    for o, c in panel.rows66():
+        if row69[c] < 0:
+            continue
+        if o == row66[c]:
+            comp.append((o, c, gap66[c], cs66[c], ps66[c]))
+        else:
+            r = mapped66[o]
+            comp.append((o, c, to_float(r.get("gap_raw")), to_float(r.get("constituency_share")), to_float(r.get("partylist_share"))))
 
     comparative_rows = []
-    for r in mapped66:
-        if r.get("district_match_confidence") == "low":
-            continue
-        if r.get("party_match_confidence") == "unmapped":
-            continue
-        key = (r.get("district_key"), r.get("party_key_69"))
-        r69 = idx69.get(key)
-        if not r69:
-            continue
+    for o, c, g66, c_share66, p_share66 in comp:
+        r = mapped66[o]
+        r69 = rows69[row69[c]]
         comparative_rows.append(
             {
                 "district_key": r.get("district_key"),
@@ -143,38 +321,34 @@ def main() -> int:
                 "party_key_69": r.get("party_key_69"),
                 "party_name_66": r.get("party_name_raw"),
                 "party_name_69": r69.get("party_name_raw"),
-                "gap_raw_66": r.get("gap_raw"),
-                "gap_raw_69": r69.get("gap_raw"),
-                "delta_gap_raw": (r69.get("gap_raw") or 0) - (r.get("gap_raw") or 0),
-                "constituency_share_66": r.get("constituency_share"),
-                "constituency_share_69": r69.get("constituency_share"),
-                "partylist_share_66": r.get("partylist_share"),
-                "partylist_share_69": r69.get("partylist_share"),
+                "gap_raw_66": opt(g66),
+                "gap_raw_69": opt(gap69[c]),
+                "delta_gap_raw": (0.0 if math.isnan(gap69[c]) else gap69[c]) - (0.0 if math.isnan(g66) else g66),
+                "constituency_share_66": opt(c_share66),
+                "constituency_share_69": opt(cs69[c]),
+                "partylist_share_66": opt(p_share66),
+                "partylist_share_69": opt(ps69[c]),
             }
         )
 
     # Winner rows for targeting blocks
-    winners66 = [r for r in mapped66 if r.get("constituency_rank") == 1]
-    winners69 = [r for r in rows69_mapped if r.get("constituency_rank") == 1]
-
-    # close-seat proxy from year66 margins
-    rows66_by_d = defaultdict(list)
-    for r in mapped66:
-        dk = r.get("district_key")
-        if dk:
-            rows66_by_d[dk].append(r)
-
-    close_margin = {}
-    for dk, rs in rows66_by_d.items():
-        ordered = sorted(rs, key=lambda x: (x.get("constituency_rank") if x.get("constituency_rank") is not None else 9999))
-        if len(ordered) >= 2 and ordered[0].get("constituency_share") is not None and ordered[1].get("constituency_share") is not None:
-            close_margin[dk] = (ordered[0]["constituency_share"] - ordered[1]["constituency_share"])
+    inst.phase("winner_rows")
+    rank66 = panel.col("constituency_rank_66")
+    rank69 = panel.col("constituency_rank_69")
+    winner69_cells = [c for c in panel.present(69) if rank69[c] == 1]
+    win66_cells = {c for c in panel.present(66) if rank66[c] == 1}
+    win66_cells.update(c for o, c in panel.extra66 if mapped66[o].get("constituency_rank") == 1)
+
+    # close-seat proxy from year66 margins (margins by district)
+    close_margin = panel_margins(panel, mapped66)
 
     margins = list(close_margin.values())
     close_thr = quantile(margins, 0.3) if margins else 0.0
 
     winner69_gap = []
-    for w in winners69:
+    for c in winner69_cells:
+        w = rows69[row69[c]]
+        margin = close_margin.get(w.get("district_key"))
         winner69_gap.append(
             {
                 "district_key": w.get("district_key"),
@@ -183,24 +357,34 @@ def main() -> int:
                 "winner_party_69": w.get("party_name_raw"),
                 "winner_party_69_code": w.get("party_key_69"),
                 "winner_gap_69": w.get("gap_raw"),
-                "was_win66_same_party": any(
-                    x.get("district_key") == w.get("district_key") and x.get("party_key_69") == w.get("party_key_69") and x.get("constituency_rank") == 1
-                    for x in winners66
-                ),
-                "close_margin_66": close_margin.get(w.get("district_key")),
-                "is_close_seat_66": (close_margin.get(w.get("district_key")) is not None and close_margin.get(w.get("district_key")) <= close_thr),
+                # same (district, party) cell won in 66
+                "was_win66_same_party": c in win66_cells,
+                "close_margin_66": margin,
+                "is_close_seat_66": margin is not None and margin <= close_thr,
             }
         )
 
-    # party comparative summary
-    by_party = defaultdict(lambda: {"party_key_69": None, "party_name_69": None, "rows": 0, "gap66_sum": 0.0, "gap69_sum": 0.0})
-    for r in comparative_rows:
-        d = by_party[r["party_key_69"]]
-        d["party_key_69"] = r["party_key_69"]
-        d["party_name_69"] = r["party_name_69"]
-        d["rows"] += 1
-        d["gap66_sum"] += r["gap_raw_66"] or 0.0
-        d["gap69_sum"] += r["gap_raw_69"] or 0.0
+    # party comparative summary: scatter-add comparable cells into per-party columns
+    inst.phase("party_summary")
+    n_rows = [0] * width
+    gap66_sum = [0.0] * width
+    gap69_sum = [0.0] * width
+    first_seen = {}
+    for _, c, g66, _, _ in comp:
+        j = c % width
+        first_seen.setdefault(j, c)
+        n_rows[j] += 1
+        gap66_sum[j] += 0.0 if math.isnan(g66) else g66
+        gap69_sum[j] += 0.0 if math.isnan(gap69[c]) else gap69[c]
+    by_party = {}
+    for j, c in first_seen.items():
+        by_party[j] = {
+            "party_key_69": panel.parties[j]["key"],
+            "party_name_69": rows69[row69[c]].get("party_name_raw"),
+            "rows": n_rows[j],
+            "gap66_sum": gap66_sum[j],
+            "gap69_sum": gap69_sum[j],
+        }
 
     party_comp = []
     for d in by_party.values():
@@ -219,25 +403,20 @@ def main() -> int:
         )
     party_comp.sort(key=lambda x: x["delta_gap"], reverse=True)
 
-    features = {
-        "rows_66": mapped66,
-        "rows_69": rows69_mapped,
-        "comparative_rows": comparative_rows,
-        "winner_rows_69": winner69_gap,
-    }
-
     summary = {
         "coverage": {
             "district_66_count": len(district66),
             "district_69_count": len(district69),
             "district_overlap_count": len(district66 & district69),
             "district_overlap_ratio_vs69": (len(district66 & district69) / len(district69)) if district69 else 0.0,
+            "district_reallocated_66_count": len(overlap.redrawn_sources()),
+            "district_aligned_overlap_count": len(district66_aligned & district69),
             "party_match_counts_66": dict(party_match_counts),
             "party_match_ratio_66": {k: (v / len(mapped66)) if mapped66 else 0.0 for k, v in party_match_counts.items()},
         },
         "counts": {
             "rows66": len(mapped66),
-            "rows69": len(rows69_mapped),
+            "rows69": len(rows69),
             "comparative_rows": len(comparative_rows),
             "winner_rows_69": len(winner69_gap),
         },
@@ -249,33 +428,68 @@ def main() -> int:
         "winner_gap_watchlist_69": sorted(winner69_gap, key=lambda x: (x.get("winner_gap_69") or 0.0), reverse=True)[: settings.get("top_watchlist_limit", 200)],
     }
 
+    fuzzy_proposals = []
+    for name66, cands in sorted(fuzzy_cache.items()):
+        if not cands:
+            continue
+        fuzzy_proposals.append(
+            {
+                "party_name_66_norm": name66,
+                "accepted": cands[0]["score"] >= fuzzy_threshold,
+                "candidates": [{"party69_code": c["key"], "party69_name": c["name"], "score": c["score"]} for c in cands],
+            }
+        )
+
+    low_conf_rows = sum(1 for r in mapped66 if r.get("district_match_confidence") == "low")
     quality = {
         "unmapped_party66_top": [{"party_name_66": k, "rows": v} for k, v in unmapped_party_counter.most_common(200)],
-        "district_low_confidence_rows_66": sum(1 for r in mapped66 if r.get("district_match_confidence") == "low"),
-        "district_low_confidence_ratio_66": (
-            sum(1 for r in mapped66 if r.get("district_match_confidence") == "low") / len(mapped66)
-            if mapped66
-            else 0.0
-        ),
+        "district_low_confidence_rows_66": low_conf_rows,
+        "district_low_confidence_ratio_66": (low_conf_rows / len(mapped66)) if mapped66 else 0.0,
+        "panel_duplicate_cells_66": panel_collisions,
+        "district_overlap": {
+            "source": args.district_overlap,
+            "nnz": overlap.nnz,
+            "reallocated_rows_66": len(reallocated66),
+            # a re-drawn district's weights should sum to ~1 unless part of it left the country map
+            "source_weight_sums": {k: v for k, v in overlap.source_weight_sums().items() if abs(v - 1.0) > 1e-6},
+        },
+        "fuzzy_party_match_threshold": fuzzy_threshold,
+        "fuzzy_party_proposals_66": fuzzy_proposals,
         "notes": [
-            "district mapping uses province_name_norm + district_no",
-            "party mapping priority: exact name -> crosswalk -> unmapped",
+            "district mapping uses province_name_norm + district_no; re-drawn districts are reallocated via the overlap weights table",
+            "party mapping priority: exact name -> crosswalk -> fuzzy (n-gram + edit distance >= threshold) -> unmapped",
             "comparative rows include only mapped district+party",
+            "panel_duplicate_cells_66 counts year-66 rows sharing a district+party cell with an earlier row; each still gets its own comparative row",
         ],
     }
 
-    Path(args.out_features).parent.mkdir(parents=True, exist_ok=True)
+    inst.stop()
+    inst.write_sidecar(Path(args.out_summary))
+
     Path(args.out_summary).parent.mkdir(parents=True, exist_ok=True)
     Path(args.out_quality).parent.mkdir(parents=True, exist_ok=True)
 
-    Path(args.out_features).write_text(json.dumps(features, ensure_ascii=False), encoding="utf-8")
+    # stream the feature arrays row by row instead of building one output string
+    with RowWriter(Path(args.out_features)) as writer:
+        writer.write_all("rows_66", mapped66)
+        writer.write_all("rows_69", rows69)
+        writer.write_all("comparative_rows", comparative_rows)
+        writer.write_all("winner_rows_69", winner69_gap)
+        writer.close()
     Path(args.out_summary).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
     Path(args.out_quality).write_text(json.dumps(quality, ensure_ascii=False, indent=2), encoding="utf-8")
+    panel_header, panel_bin = save_panel(panel, Path(args.out_panel))
 
     print(f"wrote {args.out_features}")
+    if args.out_columnar:
+        tables = {"rows_66": mapped66, "rows_69": rows69, "comparative_rows": comparative_rows, "winner_rows_69": winner69_gap}
+        for p in export_columnar(Path(args.out_columnar), tables):
+            print(f"wrote {p}")
     print(f"wrote {args.out_summary}")
     print(f"wrote {args.out_quality}")
+    print(f"wrote {panel_header} {panel_bin} shape={panel.n_districts}x{panel.n_parties}")
     print(f"comparative_rows={len(comparative_rows)} district_overlap={len(district66 & district69)}")
+    inst.print_summary()
     return 0
 
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Prebuild the frames ``dashboard_app.load_data`` needs as a columnar cache.
+
+The app otherwise globs and parses every ``area-candidates/AREA-*.json`` and merges three
+DataFrames on each cold start. Here the same joins are done once and written with
+``columnar.write_columnar``: numeric columns as ``.npy`` and string columns as dictionary
+codes, which the app turns into ``pd.Categorical`` without re-encoding. ``meta`` carries a
+stat fingerprint of the source files so the app can tell when the cache is stale.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+from pathlib import Path
+
+from columnar import write_columnar
+from instrumentation import Instrumentation, add_instrumentation_args
+
+CACHE_VERSION = 1
+SOURCE_FILES = ["common-data.json", "party-data.json", "candidate-data.json"]
+SOURCE_GLOBS = ["area-candidates/AREA-*.json"]
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def source_fingerprint(base: Path) -> str:
+    """sha256 over (relative path, size, mtime_ns) of every input; stat only, no reads.
+
+    ``dashboard_app`` imports this to check the cache it loads.
+    """
+    paths = [base / p for p in SOURCE_FILES]
+    for pattern in SOURCE_GLOBS:
+        paths.extend(Path(p) for p in sorted(glob.glob(str(base / pattern))))
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode("utf-8"))
+    for p in paths:
+        try:
+            st = p.stat()
+            h.update(f"{p.relative_to(base).as_posix()}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+        except FileNotFoundError:
+            h.update(f"{p.relative_to(base).as_posix()}:missing\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def build_tables(base: Path) -> dict[str, list[dict]]:
+    common = load_json(base / "common-data.json")
+    parties = load_json(base / "party-data.json")["parties"]
+    candidates = load_json(base / "candidate-data.json")["candidates"]
+
+    province_name = {p["code"]: p.get("name") for p in common["provinces"]}
+    areas = [
+        {
+            "areaCode": a["code"],
+            "areaName": a.get("name"),
+            "areaNo": a.get("number"),
+            "provinceCode": a.get("provinceCode"),
+            "provinceName": province_name.get(a.get("provinceCode")),
+        }
+        for a in common["areas"]
+    ]
+    area_by_code = {a["areaCode"]: a for a in areas}
+
+    party_rows = [
+        {"partyCode": p["code"], "partyNo": p.get("number"), "partyName": p.get("name"), "partyColor": p.get("colorPrimary")}
+        for p in parties
+    ]
+    party_by_code = {p["partyCode"]: p for p in party_rows}
+    no_party = {"partyNo": None, "partyName": None, "partyColor": None}
+    no_area = {"areaName": None, "areaNo": None, "provinceCode": None, "provinceName": None}
+
+    votes = []
+    for fp in sorted(glob.glob(str(base / "area-candidates" / "AREA-*.json"))):
+        d = load_json(Path(fp))
+        area = area_by_code.get(d.get("areaCode"), no_area)
+        for e in d.get("entries", []):
+            party = party_by_code.get(e.get("partyCode"), no_party)
+            votes.append(
+                {
+                    "areaCode": d.get("areaCode"),
+                    "partyCode": e.get("partyCode"),
+                    "voteTotal": e.get("voteTotal") or 0,
+                    "votePercent": float(e.get("votePercent") or 0),
+                    "rank": e.get("rank"),
+                    "totalVotes": d.get("totalVotes") or 0,
+                    "goodVotes": d.get("goodVotes") or 0,
+                    "badVotes": d.get("badVotes") or 0,
+                    "noVotes": d.get("noVotes") or 0,
+                    "voteProgressPercent": d.get("voteProgressPercent"),
+                    "partyNo": party["partyNo"],
+                    "partyName": party["partyName"],
+                    "partyColor": party["partyColor"],
+                    "areaName": area["areaName"],
+                    "areaNo": area["areaNo"],
+                    "provinceCode": area["provinceCode"],
+                    "provinceName": area["provinceName"],
+                }
+            )
+
+    cand = []
+    for c in candidates:
+        party = party_by_code.get(c.get("partyCode"), no_party)
+        name = (c.get("prefix") or "") + (c.get("specialPrefix") or "") + (c.get("firstName") or "") + " " + (c.get("lastName") or "")
+        cand.append(
+            {
+                "areaCode": c.get("areaCode"),
+                "candidatePartyCode": c.get("partyCode"),
+                "candidateNo": c.get("number"),
+                "prefix": c.get("prefix"),
+                "specialPrefix": c.get("specialPrefix"),
+                "firstName": c.get("firstName"),
+                "lastName": c.get("lastName"),
+                "candidatePartyNo": party["partyNo"],
+                "candidatePartyName": party["partyName"],
+                "candidateName": name.strip(),
+            }
+        )
+
+    return {"votes": votes, "candidates": cand, "parties": party_rows, "areas": areas}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Prebuild the Streamlit dashboard frames as a columnar cache")
+    ap.add_argument("--input-dir", default=".")
+    ap.add_argument("--out", default="data/dashboard_cache.cols")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    base = Path(args.input_dir)
+    inst.phase("fingerprint")
+    # taken before reading, so an input edited mid-build leaves the cache stale rather than wrong
+    fingerprint = source_fingerprint(base)
+
+    inst.phase("loading")
+    tables = build_tables(base)
+
+    inst.phase("serialization")
+    meta = {"cache_version": CACHE_VERSION, "source_fingerprint": fingerprint}
+    out = write_columnar(Path(args.out), tables, meta)
+    inst.stop()
+
+    print(f"wrote {out}")
+    print(" ".join(f"{k}={len(v)}" for k, v in tables.items()))
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
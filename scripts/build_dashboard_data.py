@@ -14,6 +14,9 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
+from instrumentation import Instrumentation, add_instrumentation_args
+from overview_aggregates import OverviewAggregates, area_contributions
+
 
 def read_json(path: Path) -> Any:
     return json.loads(path.read_text(encoding="utf-8"))
@@ -78,6 +81,42 @@ def solve_linear_system(matrix: list[list[float]], vector: list[float]) -> list[
     return [aug[i][n] for i in range(n)]
 
 
+def lu_factor(matrix: list[list[float]]) -> tuple[list[list[float]], list[int]]:
+    """In-place LU with partial pivoting (unit lower triangle below the diagonal), for repeated solves."""
+    n = len(matrix)
+    lu = [row[:] for row in matrix]
+    perm = list(range(n))
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(lu[r][col]))
+        if abs(lu[pivot][col]) < 1e-12:
+            continue
+        if pivot != col:
+            lu[col], lu[pivot] = lu[pivot], lu[col]
+            perm[col], perm[pivot] = perm[pivot], perm[col]
+        pivot_val = lu[col][col]
+        for r in range(col + 1, n):
+            factor = lu[r][col] / pivot_val
+            lu[r][col] = factor
+            if factor == 0:
+                continue
+            for c in range(col + 1, n):
+                lu[r][c] -= factor * lu[col][c]
+    return lu, perm
+
+
+def lu_solve(lu: list[list[float]], perm: list[int], vector: list[float]) -> list[float]:
+    n = len(vector)
+    x = [vector[p] for p in perm]
+    for i in range(n):
+        x[i] -= sum(lu[i][j] * x[j] for j in range(i))
+    for i in range(n - 1, -1, -1):
+        if abs(lu[i][i]) < 1e-12:
+            x[i] = 0.0
+            continue
+        x[i] = (x[i] - sum(lu[i][j] * x[j] for j in range(i + 1, n))) / lu[i][i]
+    return x
+
+
 def inverse_matrix(matrix: list[list[float]]) -> list[list[float]]:
     n = len(matrix)
     aug = [row[:] + [1.0 if i == j else 0.0 for j in range(n)] for i, row in enumerate(matrix)]
@@ -174,6 +213,20 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--config", default="config/analysis-config.json")
     parser.add_argument("--input-dir", default=".")
     parser.add_argument("--output-dir", default="docs/data")
+    parser.add_argument(
+        "--aggregate-state",
+        default=None,
+        help="Keep overview aggregates + per-area contributions here and apply only changed areas on the next run",
+    )
+    parser.add_argument("--verify-aggregates", action="store_true", help="Fail if the overview differs from a full recompute")
+    parser.add_argument(
+        "--sensitivity-quantiles",
+        nargs="+",
+        type=float,
+        default=default_sensitivity_quantiles(),
+        help="Suspicious-area quantile cuts for the sensitivity curve (default 0.80 to 0.99)",
+    )
+    add_instrumentation_args(parser)
     return parser.parse_args()
 
 
@@ -280,8 +333,280 @@ def simple_interaction_effect(rows: list[dict[str, Any]]) -> float:
     return float(by_name.get("x_suspicious", {}).get("coef", 0.0) or 0.0)
 
 
+def default_sensitivity_quantiles() -> list[float]:
+    return [round(0.80 + i / 100, 2) for i in range(20)]
+
+
+def threshold_sensitivity(
+    area_rows: list[dict[str, Any]],
+    model_rows: list[dict[str, Any]],
+    quantiles: list[float],
+    province_levels: list[str],
+    source_party_levels: list[str],
+    low_info_provinces: list[str],
+    ridge: float = 1e-8,
+) -> list[dict[str, Any]]:
+    """Evidence A/B/D and the simple interaction effect for each suspicious-area quantile cut.
+
+    Residuals are sorted once and the cuts are walked from the highest quantile down, so areas
+    only ever join the suspicious set. Only the ``suspicious`` and ``source_share_x_suspicious``
+    columns of the FE design depend on the cut. Z'Z (every other column) is built and LU-factored
+    once. Each cut then adds the newly suspicious rows to Z'W / W'W / W'y and solves the 2x2
+    Schur complement. This is the same ridge system ``ols_fit`` solves, split into blocks.
+    """
+    residuals = [float(a["derivedMetrics"]["smallPartyResidualScore"]) for a in area_rows]
+    order = sorted(range(len(area_rows)), key=lambda i: residuals[i], reverse=True)
+    small_share = [float(a["derivedMetrics"]["smallPartyCombinedShare"]) for a in area_rows]
+    winner_share = [
+        safe_div(float((next((x for x in a.get("constituencyPartyResults", []) if x.get("rank") == 1), {}) or {}).get("votePercent", 0) or 0), 100.0)
+        for a in area_rows
+    ]
+    rows_by_area: dict[str, list[int]] = defaultdict(list)
+    for i, r in enumerate(model_rows):
+        rows_by_area[r.get("areaCode")].append(i)
+    people_codes = {
+        r.get("sourcePartyCode")
+        for r in model_rows
+        if "ประชาชน" in str(r.get("sourcePartyName", "")) or str(r.get("sourcePartyCode", "")) == "PARTY-0012"
+    }
+
+    # FE design without the two suspicious columns, as sparse (column, value) rows
+    low_info = set(low_info_provinces)
+    province_col = {p: 5 + i for i, p in enumerate(province_levels[1:])}
+    source_col = {s: 5 + len(province_col) + i for i, s in enumerate(source_party_levels[1:])}
+    kz = 5 + len(province_col) + len(source_col)
+    z_rows: list[list[tuple[int, float]] | None] = []
+    zz = [[0.0] * kz for _ in range(kz)]
+    zy = [0.0] * kz
+    yy = y_sum = 0.0
+    fe_n = 0
+    for r in model_rows:
+        if r.get("provinceCode") in low_info:
+            z_rows.append(None)
+            continue
+        x = float(r.get("sourceConstituencyShare", 0.0) or 0.0)
+        y = float(r.get("smallPartyShare", 0.0) or 0.0)
+        z = [(0, 1.0), (1, x), (2, float(r.get("turnoutRate", 0.0) or 0.0)), (3, float(r.get("badRate", 0.0) or 0.0)), (4, float(r.get("noRate", 0.0) or 0.0))]
+        if r.get("provinceCode") in province_col:
+            z.append((province_col[r.get("provinceCode")], 1.0))
+        if r.get("sourcePartyCode") in source_col:
+            z.append((source_col[r.get("sourcePartyCode")], 1.0))
+        for i, vi in z:
+            zy[i] += vi * y
+            for j, vj in z:
+                zz[i][j] += vi * vj
+        z_rows.append(z)
+        yy += y * y
+        y_sum += y
+        fe_n += 1
+    sst = yy - safe_div(y_sum * y_sum, fe_n)
+    zz_lu, zz_perm = lu_factor([[v + (ridge if i == j else 0.0) for j, v in enumerate(row)] for i, row in enumerate(zz)])
+    beta_z0 = lu_solve(zz_lu, zz_perm, zy)
+
+    # running sums over suspicious areas / rows
+    zw = [[0.0, 0.0] for _ in range(kz)]
+    ww = [[0.0, 0.0], [0.0, 0.0]]
+    wy = [0.0, 0.0]
+    simple_all = [0.0] * 5  # n, sum x, sum x^2, sum y, sum xy over every model row
+    for r in model_rows:
+        x = float(r.get("sourceConstituencyShare", 0) or 0)
+        y = float(r.get("smallPartyShare", 0) or 0)
+        for k, v in enumerate((1.0, x, x * x, y, x * y)):
+            simple_all[k] += v
+    simple_susp = [0.0] * 5
+    area_sums = [0, 0.0, 0.0]  # suspicious count, small share sum, winner share sum
+    total_small = sum(small_share)
+    total_winner = sum(winner_share)
+    source_agg: dict[str, list] = {}  # code -> [related votes, source votes, first row index]
+    suspicious_rows = 0
+
+    out = []
+    pos = 0
+    for q in sorted(quantiles, reverse=True):
+        threshold = quantile(residuals, q)
+        while pos < len(order) and residuals[order[pos]] >= threshold:
+            a_idx = order[pos]
+            pos += 1
+            area_sums[0] += 1
+            area_sums[1] += small_share[a_idx]
+            area_sums[2] += winner_share[a_idx]
+            for i in rows_by_area.get(area_rows[a_idx].get("areaCode"), []):
+                r = model_rows[i]
+                x = float(r.get("sourceConstituencyShare", 0) or 0)
+                y = float(r.get("smallPartyShare", 0) or 0)
+                for k, v in enumerate((1.0, x, x * x, y, x * y)):
+                    simple_susp[k] += v
+                suspicious_rows += 1
+                code = r.get("sourcePartyCode") or "UNKNOWN"
+                agg = source_agg.setdefault(code, [0.0, 0.0, i])
+                agg[0] += float(r.get("smallPartyVotes", 0) or 0)
+                agg[1] += float(r.get("sourceConstituencyVotes", 0) or 0)
+                agg[2] = min(agg[2], i)
+                z = z_rows[i]
+                if z is None:
+                    continue
+                for j, vj in z:
+                    zw[j][0] += vj
+                    zw[j][1] += vj * x
+                ww[0][0] += 1.0
+                ww[0][1] += x
+                ww[1][1] += x * x
+                wy[0] += y
+                wy[1] += x * y
+        ww[1][0] = ww[0][1]
+
+        # Schur complement of Z'Z in the full (ridge) normal equations
+        g = list(zip(*(lu_solve(zz_lu, zz_perm, [zw[k][c] for k in range(kz)]) for c in range(2))))
+        s = [[ww[a][b] + (ridge if a == b else 0.0) - sum(zw[k][a] * g[k][b] for k in range(kz)) for b in range(2)] for a in range(2)]
+        rhs = [wy[a] - sum(zw[k][a] * beta_z0[k] for k in range(kz)) for a in range(2)]
+        det = s[0][0] * s[1][1] - s[0][1] * s[1][0]
+        s_inv = [[safe_div(s[1][1], det), -safe_div(s[0][1], det)], [-safe_div(s[1][0], det), safe_div(s[0][0], det)]] if abs(det) > 1e-24 else [[0.0, 0.0], [0.0, 0.0]]
+        beta_w = [s_inv[a][0] * rhs[0] + s_inv[a][1] * rhs[1] for a in range(2)]
+        beta_z = [beta_z0[i] - g[i][0] * beta_w[0] - g[i][1] * beta_w[1] for i in range(kz)]
+        # SSE = y'y - 2 b'X'y + b'X'X b, with X'X taken without the ridge
+        fit_term = sum(b * v for b, v in zip(beta_z, zy)) + beta_w[0] * wy[0] + beta_w[1] * wy[1]
+        quad = sum(beta_z[i] * sum(zz[i][j] * beta_z[j] for j in range(kz)) for i in range(kz))
+        quad += 2 * sum(beta_z[k] * (zw[k][0] * beta_w[0] + zw[k][1] * beta_w[1]) for k in range(kz))
+        quad += sum(beta_w[a] * ww[a][b] * beta_w[b] for a in range(2) for b in range(2))
+        sse = max(yy - 2 * fit_term + quad, 0.0)
+        sigma2 = safe_div(sse, max(fe_n - kz - 2, 1))
+        fe_terms = {}
+        for a, name in enumerate(("suspicious", "source_share_x_suspicious")):
+            se = math.sqrt(max(sigma2 * s_inv[a][a], 0.0))
+            fe_terms[name] = {"coef": beta_w[a], "stdErr": se, "tStat": safe_div(beta_w[a], se), "ci95Low": beta_w[a] - 1.96 * se, "ci95High": beta_w[a] + 1.96 * se}
+
+        n, sx, sxx, sy, sxy = simple_all
+        ns, sxs, sxxs, sys_, sxys = simple_susp
+        simple_xtx = [[n, sx, ns, sxs], [sx, sxx, sxs, sxxs], [ns, sxs, ns, sxs], [sxs, sxxs, sxs, sxxs]]
+        for i in range(4):
+            simple_xtx[i][i] += ridge
+        simple_effect = solve_linear_system(simple_xtx, [sy, sxy, sys_, sxys])[3] if n else 0.0
+
+        ranked = sorted(source_agg.items(), key=lambda kv: (-safe_div(kv[1][0], kv[1][1]), kv[1][2]))
+        people = next(((rank, v) for rank, (code, v) in enumerate(ranked, start=1) if code in people_codes), None)
+
+        s_count, s_small, s_win = area_sums
+        c_count = len(area_rows) - s_count
+        mean_s_small = safe_div(s_small, s_count)
+        mean_c_small = safe_div(total_small - s_small, c_count)
+        mean_s_win = safe_div(s_win, s_count)
+        mean_c_win = safe_div(total_winner - s_win, c_count)
+        out.append(
+            {
+                "quantile": q,
+                "threshold": threshold,
+                "suspiciousAreaCount": s_count,
+                "controlAreaCount": c_count,
+                "meanSmallPartyShareSuspicious": mean_s_small,
+                "meanSmallPartyShareControl": mean_c_small,
+                "diffSmallPartyShare": mean_s_small - mean_c_small,
+                "meanWinnerShareSuspicious": mean_s_win,
+                "meanWinnerShareControl": mean_c_win,
+                "diffWinnerShare": mean_s_win - mean_c_win,
+                "fixedEffects": {"nobs": fe_n, "r2": 1.0 - safe_div(sse, sst) if sst > 0 else 0.0, **fe_terms},
+                "simpleInteractionEffect": simple_effect,
+                "suspiciousModelRows": suspicious_rows,
+                "peopleParty": {
+                    "rankByNormalizedEffect": people[0],
+                    "relatedVotes": people[1][0],
+                    "normalizedEffect": safe_div(people[1][0], people[1][1]),
+                }
+                if people
+                else None,
+            }
+        )
+    out.reverse()
+    return out
+
+
+def full_overview(area_rows: list[dict[str, Any]], vote_rows: list[dict[str, Any]], constituency_vote_rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """National / province / party overview aggregates recomputed from every row."""
+    national_totals = {"totalVotes": 0, "goodVotes": 0, "badVotes": 0, "noVotes": 0}
+    constituency_national_totals = {"totalVotes": 0, "goodVotes": 0, "badVotes": 0, "noVotes": 0}
+    province_totals_map: dict[str, dict[str, Any]] = {}
+    party_totals_map: dict[str, dict[str, Any]] = {}
+
+    for a in area_rows:
+        t = a["totals"]
+        national_totals["totalVotes"] += t["totalVotes"]
+        national_totals["goodVotes"] += t["goodVotes"]
+        national_totals["badVotes"] += t["badVotes"]
+        national_totals["noVotes"] += t["noVotes"]
+        ct = a.get("constituencyTotals") or {}
+        constituency_national_totals["totalVotes"] += ct.get("totalVotes", 0) or 0
+        constituency_national_totals["goodVotes"] += ct.get("goodVotes", 0) or 0
+        constituency_national_totals["badVotes"] += ct.get("badVotes", 0) or 0
+        constituency_national_totals["noVotes"] += ct.get("noVotes", 0) or 0
+
+        p_code = a["provinceCode"] or "UNKNOWN"
+        if p_code not in province_totals_map:
+            province_totals_map[p_code] = {
+                "provinceCode": p_code,
+                "provinceName": a.get("provinceName"),
+                "areaCount": 0,
+                "totalVotes": 0,
+                "goodVotes": 0,
+                "badVotes": 0,
+                "noVotes": 0,
+            }
+        province_totals_map[p_code]["areaCount"] += 1
+        province_totals_map[p_code]["totalVotes"] += t["totalVotes"]
+        province_totals_map[p_code]["goodVotes"] += t["goodVotes"]
+        province_totals_map[p_code]["badVotes"] += t["badVotes"]
+        province_totals_map[p_code]["noVotes"] += t["noVotes"]
+
+    for row in vote_rows:
+        p_code = row["partyCode"]
+        if p_code not in party_totals_map:
+            party_totals_map[p_code] = {
+                "partyCode": p_code,
+                "partyNo": row.get("partyNo"),
+                "partyName": row.get("partyName"),
+                "partyColor": row.get("partyColor"),
+                "voteTotal": 0,
+            }
+        party_totals_map[p_code]["voteTotal"] += row.get("voteTotal", 0)
+
+    party_totals = sorted(party_totals_map.values(), key=lambda x: x["voteTotal"], reverse=True)
+    all_party_votes = sum(x["voteTotal"] for x in party_totals) or 1
+    for idx, row in enumerate(party_totals, start=1):
+        row["rank"] = idx
+        row["share"] = row["voteTotal"] / all_party_votes
+
+    constituency_party_totals_map: dict[str, dict[str, Any]] = {}
+    for row in constituency_vote_rows:
+        p_code = row["partyCode"]
+        if p_code not in constituency_party_totals_map:
+            constituency_party_totals_map[p_code] = {
+                "partyCode": p_code,
+                "partyNo": row.get("partyNo"),
+                "partyName": row.get("partyName"),
+                "partyColor": row.get("partyColor"),
+                "voteTotal": 0,
+            }
+        constituency_party_totals_map[p_code]["voteTotal"] += row.get("voteTotal", 0)
+
+    constituency_party_totals = sorted(constituency_party_totals_map.values(), key=lambda x: x["voteTotal"], reverse=True)
+    all_const_votes = sum(x["voteTotal"] for x in constituency_party_totals) or 1
+    for idx, row in enumerate(constituency_party_totals, start=1):
+        row["rank"] = idx
+        row["share"] = row["voteTotal"] / all_const_votes
+
+    province_totals = sorted(province_totals_map.values(), key=lambda x: x["totalVotes"], reverse=True)
+
+    return {
+        "national_totals": national_totals,
+        "constituency_national_totals": constituency_national_totals,
+        "party_totals": party_totals,
+        "constituency_party_totals": constituency_party_totals,
+        "province_totals": province_totals,
+    }
+
+
 def main() -> int:
     args = parse_args()
+    inst = Instrumentation.from_args(args).start()
+    inst.phase("loading")
 
     input_dir = Path(args.input_dir)
     output_dir = Path(args.output_dir)
@@ -345,6 +670,7 @@ def main() -> int:
                     }
                 )
 
+    inst.phase("area_rows")
     area_rows: list[dict[str, Any]] = []
     vote_rows: list[dict[str, Any]] = []
 
@@ -421,6 +747,7 @@ def main() -> int:
         )
 
     # Derived metrics for suspicious-area definition (Residual Top 10%)
+    inst.phase("derived_metrics")
     small_party_codes = {
         p.get("code")
         for p in parties_raw
@@ -476,6 +803,7 @@ def main() -> int:
     model_rows = build_model_rows(area_rows, small_party_codes)
 
     # Evidence A: within-province suspicious vs control comparison
+    inst.phase("within_province")
     provinces_comp = []
     suspicious_shares = []
     control_shares = []
@@ -526,6 +854,7 @@ def main() -> int:
     ci_win = bootstrap_diff_mean(suspicious_win_proxy, control_win_proxy, random.Random(20260210), rounds=500)
 
     # Evidence B: province + source-party fixed effects (summary only)
+    inst.phase("fe_fit")
     province_levels = sorted(
         {
             r.get("provinceCode")
@@ -565,7 +894,14 @@ def main() -> int:
     fe_fit = ols_fit(fe_design, fe_y, fe_names)
     fe_coef_map = {c["name"]: c for c in fe_fit.get("coefficients", [])}
 
+    # Sensitivity of A/B/D to the suspicious-area quantile (residuals and Z'Z computed once)
+    inst.phase("sensitivity")
+    sensitivity_rows = threshold_sensitivity(
+        area_rows, model_rows, args.sensitivity_quantiles, province_levels, source_party_levels, low_info_provinces
+    )
+
     # Evidence C: placebo / permutation for interaction effect
+    inst.phase("placebo")
     placebo_rounds = 1000
     placebo_seed = 20260209
     real_effect = simple_interaction_effect(model_rows)
@@ -581,6 +917,7 @@ def main() -> int:
     placebo_std = stddev(placebo_effects)
 
     # Evidence D: People Party vs others in suspicious areas
+    inst.phase("party_comparison")
     suspicious_model_rows = [r for r in model_rows if r.get("isSuspicious")]
     agg_source: dict[str, dict[str, Any]] = {}
     for r in suspicious_model_rows:
@@ -635,80 +972,29 @@ def main() -> int:
     )
 
     # Overview aggregates
-    national_totals = {"totalVotes": 0, "goodVotes": 0, "badVotes": 0, "noVotes": 0}
-    constituency_national_totals = {"totalVotes": 0, "goodVotes": 0, "badVotes": 0, "noVotes": 0}
-    province_totals_map: dict[str, dict[str, Any]] = {}
-    party_totals_map: dict[str, dict[str, Any]] = {}
-
-    for a in area_rows:
-        t = a["totals"]
-        national_totals["totalVotes"] += t["totalVotes"]
-        national_totals["goodVotes"] += t["goodVotes"]
-        national_totals["badVotes"] += t["badVotes"]
-        national_totals["noVotes"] += t["noVotes"]
-        ct = a.get("constituencyTotals") or {}
-        constituency_national_totals["totalVotes"] += ct.get("totalVotes", 0) or 0
-        constituency_national_totals["goodVotes"] += ct.get("goodVotes", 0) or 0
-        constituency_national_totals["badVotes"] += ct.get("badVotes", 0) or 0
-        constituency_national_totals["noVotes"] += ct.get("noVotes", 0) or 0
-
-        p_code = a["provinceCode"] or "UNKNOWN"
-        if p_code not in province_totals_map:
-            province_totals_map[p_code] = {
-                "provinceCode": p_code,
-                "provinceName": a.get("provinceName"),
-                "areaCount": 0,
-                "totalVotes": 0,
-                "goodVotes": 0,
-                "badVotes": 0,
-                "noVotes": 0,
-            }
-        province_totals_map[p_code]["areaCount"] += 1
-        province_totals_map[p_code]["totalVotes"] += t["totalVotes"]
-        province_totals_map[p_code]["goodVotes"] += t["goodVotes"]
-        province_totals_map[p_code]["badVotes"] += t["badVotes"]
-        province_totals_map[p_code]["noVotes"] += t["noVotes"]
-
-    for row in vote_rows:
-        p_code = row["partyCode"]
-        if p_code not in party_totals_map:
-            party_totals_map[p_code] = {
-                "partyCode": p_code,
-                "partyNo": row.get("partyNo"),
-                "partyName": row.get("partyName"),
-                "partyColor": row.get("partyColor"),
-                "voteTotal": 0,
-            }
-        party_totals_map[p_code]["voteTotal"] += row.get("voteTotal", 0)
-
-    party_totals = sorted(party_totals_map.values(), key=lambda x: x["voteTotal"], reverse=True)
-    all_party_votes = sum(x["voteTotal"] for x in party_totals) or 1
-    for idx, row in enumerate(party_totals, start=1):
-        row["rank"] = idx
-        row["share"] = row["voteTotal"] / all_party_votes
-
-    constituency_party_totals_map: dict[str, dict[str, Any]] = {}
-    for row in constituency_vote_rows:
-        p_code = row["partyCode"]
-        if p_code not in constituency_party_totals_map:
-            constituency_party_totals_map[p_code] = {
-                "partyCode": p_code,
-                "partyNo": row.get("partyNo"),
-                "partyName": row.get("partyName"),
-                "partyColor": row.get("partyColor"),
-                "voteTotal": 0,
-            }
-        constituency_party_totals_map[p_code]["voteTotal"] += row.get("voteTotal", 0)
-
-    constituency_party_totals = sorted(constituency_party_totals_map.values(), key=lambda x: x["voteTotal"], reverse=True)
-    all_const_votes = sum(x["voteTotal"] for x in constituency_party_totals) or 1
-    for idx, row in enumerate(constituency_party_totals, start=1):
-        row["rank"] = idx
-        row["share"] = row["voteTotal"] / all_const_votes
-
-    province_totals = sorted(province_totals_map.values(), key=lambda x: x["totalVotes"], reverse=True)
+    inst.phase("aggregates")
+    if args.aggregate_state:
+        # only areas whose contribution changed since the saved state are applied
+        state_path = Path(args.aggregate_state)
+        engine = OverviewAggregates.load(state_path)
+        changed = engine.apply(engine.changes_from(area_contributions(area_rows, vote_rows, constituency_vote_rows)))
+        overview = engine.overview(parties_by_code)
+        engine.save(state_path)
+        print(f"aggregates: {len(changed['province'])} provinces, {len(changed['party'])} parties updated incrementally")
+    else:
+        overview = full_overview(area_rows, vote_rows, constituency_vote_rows)
+    if args.verify_aggregates:
+        mismatched = [k for k, v in full_overview(area_rows, vote_rows, constituency_vote_rows).items() if overview[k] != v]
+        if mismatched:
+            raise SystemExit(f"incremental aggregates differ from a full recompute: {', '.join(mismatched)}")
+    national_totals = overview["national_totals"]
+    constituency_national_totals = overview["constituency_national_totals"]
+    party_totals = overview["party_totals"]
+    constituency_party_totals = overview["constituency_party_totals"]
+    province_totals = overview["province_totals"]
 
     # Alignment rows
+    inst.phase("alignment")
     alignment_rows = []
     for row in vote_rows:
         party_no = row.get("partyNo")
@@ -792,6 +1078,7 @@ def main() -> int:
     unmatched_count = sum(1 for r in alignment_rows if not r["matched"])
 
     # Consistency checks against summary.json (if present)
+    inst.phase("consistency_checks")
     consistency = {}
     if summary:
         party_list_stats = summary.get("statisticsPartyList", {}).get("voteBreakdownByType", {})
@@ -896,6 +1183,10 @@ def main() -> int:
                     "q99": quantile(placebo_effects, 0.99),
                 },
             },
+            "thresholdSensitivity": {
+                "method": "Suspicious = residual >= quantile(residuals, q) for each q; bootstrap CIs and placebo rounds are only computed at q = 0.9",
+                "rows": sensitivity_rows,
+            },
             "peoplePartyComparisons": {
                 "inSuspiciousAreasOnly": True,
                 "rows": party_rows,
@@ -933,8 +1224,11 @@ def main() -> int:
         },
     }
 
+    inst.phase("serialization")
     json_text = json.dumps(dashboard_data, ensure_ascii=False, separators=(",", ":"))
     sha = hashlib.sha256(json_text.encode("utf-8")).hexdigest()
+    (output_dir / "dashboard-data.json").write_text(json.dumps(dashboard_data, ensure_ascii=False), encoding="utf-8")
+    inst.stop()
 
     metadata = {
         "generatedAt": dt.datetime.now(dt.timezone.utc).isoformat(),
@@ -950,14 +1244,15 @@ def main() -> int:
             "partyMismatchCount": consistency.get("party_totals_vs_summary_data_partyListVotes", {}).get("mismatchCount"),
         },
         "dataSha256": sha,
+        "timings": inst.report(),
     }
 
-    (output_dir / "dashboard-data.json").write_text(json.dumps(dashboard_data, ensure_ascii=False), encoding="utf-8")
     (output_dir / "metadata.json").write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
 
     print(f"wrote {(output_dir / 'dashboard-data.json')}")
     print(f"wrote {(output_dir / 'metadata.json')}")
     print(f"areas={len(area_rows)} alignment_rows={len(alignment_rows)}")
+    inst.print_summary()
     return 0
 
 
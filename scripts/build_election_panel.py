@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Build a long-format (election, district, party) panel from any number of normalized elections.
+
+Each election's parties are chained forward through the pairwise crosswalks (exact name,
+then crosswalk CSV, then fuzzy name) until they reach the party keys of the latest election,
+so one store answers every pairwise or sequential delta through its key index instead of
+re-joining each pair of years.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+from columnar import is_columnar, read_table
+from party_name_index import PartyNameIndex
+from row_stream import load_document
+
+VALUE_FIELDS = [
+    "constituency_votes",
+    "partylist_votes",
+    "constituency_share",
+    "partylist_share",
+    "gap_raw",
+    "constituency_rank",
+    "partylist_rank",
+]
+KEY_FIELDS = ["election", "district_key", "party_key", "party_name_raw", "province_name_norm", "district_no"]
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def normalize_text(s: str | None) -> str:
+    return "" if s is None else re.sub(r"\s+", "", str(s).strip())
+
+
+def parse_pairs(values: list[str], sep: str) -> dict[str, str]:
+    """["66=a.json", "69=b.json"] -> {"66": "a.json", "69": "b.json"}"""
+    out = {}
+    for v in values:
+        k, _, path = v.partition(sep)
+        if not path:
+            raise SystemExit(f"expected KEY{sep}PATH, got {v!r}")
+        out[k.strip()] = path.strip()
+    return out
+
+
+def election_year(label: str) -> int | None:
+    """Buddhist-era year of an election label: "66" -> 2566, "2562" -> 2562, "2019" -> 2562."""
+    if not label.isdigit():
+        return None
+    year = int(label)
+    if year < 100:
+        return 2500 + year
+    return year + 543 if year < 2400 else year
+
+
+def order_elections(labels: list[str], order: list[str] | None) -> list[str]:
+    """Chronological order of the election labels: ``order`` if given, else by ``election_year``."""
+    if order:
+        if sorted(order) != sorted(labels):
+            raise SystemExit(f"--order {','.join(order)} must list each election label once: {','.join(sorted(labels))}")
+        return list(order)
+    unknown = [e for e in labels if election_year(e) is None]
+    if unknown:
+        raise SystemExit(f"cannot infer the year of election label(s) {', '.join(unknown)}; pass --order")
+    return sorted(labels, key=lambda e: (election_year(e), e))
+
+
+def read_crosswalk(path: Path, src: str, dst: str) -> dict[str, dict]:
+    """Crosswalk CSV with party<src>_name -> party<dst>_code / party<dst>_name columns."""
+    out = {}
+    if not path.exists():
+        return out
+    with path.open("r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            key = normalize_text(r.get(f"party{src}_name"))
+            if key:
+                out[key] = {
+                    "code": (r.get(f"party{dst}_code") or "").strip(),
+                    "name": normalize_text(r.get(f"party{dst}_name")),
+                    "notes": r.get("notes") or r.get("mapping_type") or "crosswalk",
+                }
+    return out
+
+
+def load_rows(path: Path, election: str) -> list[dict]:
+    """Rows of one normalized election; a columnar input only opens the columns used here."""
+    if is_columnar(path):
+        wanted = ["district_key", "party_name_norm", "party_name_raw", "province_name_norm", "district_no", f"party_key_{election}", *VALUE_FIELDS]
+        return list(read_table(path).rows(wanted))
+    return load_document(path)["rows"]
+
+
+def own_party_key(row: dict, election: str) -> str | None:
+    return row.get(f"party_key_{election}")
+
+
+def chain_party_keys(elections: list[str], rows: dict[str, list[dict]], crosswalks: dict[tuple[str, str], dict], fuzzy_threshold: float):
+    """Map every (election, party name) to a key of the latest election.
+
+    Walks from the latest election backwards: a party in election E resolves to the
+    already-resolved key of the party it matches in the next election. Names with no
+    match keep their own "<election>:<name>" key, so an unmapped party still chains
+    consistently through earlier years.
+    """
+    resolved: dict[str, dict[str, dict]] = {}
+    latest = elections[-1]
+    resolved[latest] = {}
+    for r in rows[latest]:
+        name = normalize_text(r.get("party_name_norm") or r.get("party_name_raw"))
+        if name and name not in resolved[latest]:
+            key = own_party_key(r, latest) or f"{latest}:{name}"
+            resolved[latest][name] = {"party_key": key, "match": "native", "via": None}
+
+    for i in range(len(elections) - 2, -1, -1):
+        e, nxt = elections[i], elections[i + 1]
+        targets = resolved[nxt]
+        by_key = {v["party_key"]: name for name, v in targets.items()}
+        cw = crosswalks.get((e, nxt), {})
+        index = PartyNameIndex([(name, name) for name in targets])
+        resolved[e] = {}
+        for r in rows[e]:
+            name = normalize_text(r.get("party_name_norm") or r.get("party_name_raw"))
+            if not name or name in resolved[e]:
+                continue
+            hit, match = None, "unmapped"
+            if name in targets:
+                hit, match = name, "exact"
+            elif name in cw:
+                m = cw[name]
+                hit = by_key.get(m["code"]) or (m["name"] if m["name"] in targets else None)
+                match = "manual" if hit else "unmapped"
+            if hit is None:
+                best = index.best(name, fuzzy_threshold)
+                if best:
+                    hit, match = best["key"], f"fuzzy:{best['score']:.3f}"
+            if hit is None:
+                resolved[e][name] = {"party_key": f"{e}:{name}", "match": "unmapped", "via": None}
+            else:
+                resolved[e][name] = {"party_key": targets[hit]["party_key"], "match": match, "via": f"{nxt}:{hit}"}
+    return resolved
+
+
+class ElectionPanel:
+    """Columnar long-format store with a (district, party) -> {election: row} index."""
+
+    def __init__(self, elections: list[str], columns: dict[str, list]):
+        self.elections = elections
+        self.columns = columns
+        self.index: dict[tuple[str, str], dict[str, int]] = {}
+        for i, (e, dk, pk) in enumerate(zip(columns["election"], columns["district_key"], columns["party_key"])):
+            self.index.setdefault((dk, pk), {}).setdefault(e, i)
+
+    def __len__(self) -> int:
+        return len(self.columns["election"])
+
+    def get(self, election: str, district_key: str, party_key: str, field: str = "gap_raw"):
+        i = self.index.get((district_key, party_key), {}).get(election)
+        return None if i is None else self.columns[field][i]
+
+    def delta(self, a: str, b: str, field: str = "gap_raw") -> list[dict]:
+        """Rows present in both elections with value_b - value_a (missing values count as 0)."""
+        col = self.columns[field]
+        out = []
+        for (dk, pk), by_e in self.index.items():
+            ia, ib = by_e.get(a), by_e.get(b)
+            if ia is None or ib is None:
+                continue
+            out.append(
+                {
+                    "district_key": dk,
+                    "party_key": pk,
+                    f"{field}_{a}": col[ia],
+                    f"{field}_{b}": col[ib],
+                    "delta": (col[ib] or 0) - (col[ia] or 0),
+                }
+            )
+        return out
+
+    def sequential_deltas(self, field: str = "gap_raw") -> dict[str, list[dict]]:
+        return {f"{a}->{b}": self.delta(a, b, field) for a, b in zip(self.elections, self.elections[1:])}
+
+    def to_json(self) -> dict:
+        return {"elections": self.elections, "columns": self.columns}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ElectionPanel":
+        return cls(data["elections"], data["columns"])
+
+
+def load_panel(path: Path) -> ElectionPanel:
+    return ElectionPanel.from_json(load_json(path))
+
+
+def merge_value(field: str, a, b):
+    """Combine two rows of one (election, district, party) cell: votes, shares and gaps add, ranks keep the better."""
+    if not isinstance(b, (int, float)):
+        return a
+    if not isinstance(a, (int, float)):
+        return b
+    return min(a, b) if field.endswith("_rank") else a + b
+
+
+def build_panel(elections: list[str], rows: dict[str, list[dict]], resolved: dict) -> tuple[ElectionPanel, int]:
+    """Scatter every election's rows into one long panel keyed by (election, district, party).
+
+    A row whose cell already exists, e.g. two parties the crosswalk maps to one party key in
+    the same district, is folded into it with ``merge_value``; the count of those rows is
+    returned alongside the panel.
+    """
+    columns: dict[str, list] = {k: [] for k in [*KEY_FIELDS, *VALUE_FIELDS]}
+    cell_of: dict[tuple[str, str, str], int] = {}
+    duplicates = 0
+    for e in elections:
+        party_map = resolved[e]
+        for r in rows[e]:
+            dk = r.get("district_key")
+            name = normalize_text(r.get("party_name_norm") or r.get("party_name_raw"))
+            if not dk or name not in party_map:
+                continue
+            pk = party_map[name]["party_key"]
+            i = cell_of.get((e, dk, pk))
+            if i is not None:
+                duplicates += 1
+                for f in VALUE_FIELDS:
+                    columns[f][i] = merge_value(f, columns[f][i], r.get(f))
+                continue
+            cell_of[(e, dk, pk)] = len(columns["election"])
+            columns["election"].append(e)
+            columns["district_key"].append(dk)
+            columns["party_key"].append(pk)
+            columns["party_name_raw"].append(r.get("party_name_raw"))
+            columns["province_name_norm"].append(r.get("province_name_norm"))
+            columns["district_no"].append(r.get("district_no"))
+            for f in VALUE_FIELDS:
+                columns[f].append(r.get(f))
+    return ElectionPanel(elections, columns), duplicates
+
+
+def delta_summary(panel: ElectionPanel, field: str) -> list[dict]:
+    out = []
+    for pair, rows in panel.sequential_deltas(field).items():
+        by_party: dict[str, list[float]] = {}
+        for r in rows:
+            by_party.setdefault(r["party_key"], []).append(r["delta"])
+        parties = [{"party_key": k, "rows": len(v), "mean_delta": sum(v) / len(v)} for k, v in by_party.items()]
+        parties.sort(key=lambda x: x["mean_delta"], reverse=True)
+        out.append({"pair": pair, "field": field, "rows": len(rows), "parties": parties})
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build a long-format panel over N normalized elections")
+    ap.add_argument("--election", action="append", required=True, help="LABEL=path to normalized JSON/JSONL or columnar dir, e.g. 66=data/normalized/election66_normalized.json")
+    ap.add_argument("--order", default=None, help="Comma-separated labels oldest first; default orders labels as BE years (66 -> 2566)")
+    ap.add_argument("--crosswalk", action="append", default=[], help="FROM:TO=csv, e.g. 66:69=config/party-crosswalk-66-69.csv")
+    ap.add_argument("--settings", default="config/research-settings.json")
+    ap.add_argument("--delta-field", default="gap_raw", choices=VALUE_FIELDS)
+    ap.add_argument("--out", default="data/research/election_panel.json")
+    ap.add_argument("--out-summary", default="data/research/election_panel_summary.json")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    inputs = parse_pairs(args.election, "=")
+    # labels are election years (62, 66, 69 or 2562, ...); short ones are read as 25xx
+    elections = order_elections(list(inputs), [e.strip() for e in args.order.split(",")] if args.order else None)
+    rows = {e: load_rows(Path(p), e) for e, p in inputs.items()}
+    settings_path = Path(args.settings)
+    settings = load_json(settings_path) if settings_path.exists() else {}
+    crosswalks = {}
+    for pair, path in parse_pairs(args.crosswalk, "=").items():
+        src, _, dst = pair.partition(":")
+        crosswalks[(src, dst)] = read_crosswalk(Path(path), src, dst)
+
+    inst.phase("party_chain")
+    fuzzy_threshold = float(settings.get("fuzzy_party_match_threshold", 0.85))
+    resolved = chain_party_keys(elections, rows, crosswalks, fuzzy_threshold)
+
+    inst.phase("panel")
+    panel, duplicates = build_panel(elections, rows, resolved)
+
+    inst.phase("deltas")
+    deltas = delta_summary(panel, args.delta_field)
+
+    inst.phase("serialization")
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(panel.to_json(), ensure_ascii=False), encoding="utf-8")
+    inst.stop()
+
+    summary = {
+        "elections": elections,
+        "counts": {
+            "rows": len(panel),
+            "rows_by_election": dict(Counter(panel.columns["election"])),
+            "district_party_keys": len(panel.index),
+            # rows merged into an existing cell (their votes are kept), name kept for readers
+            "duplicate_rows_skipped": duplicates,
+        },
+        "party_match_counts": {e: dict(Counter(v["match"].split(":")[0] for v in resolved[e].values())) for e in elections},
+        "party_chain": {e: resolved[e] for e in elections},
+        "sequential_deltas": deltas,
+    }
+    inst.write_sidecar(Path(args.out_summary))
+    Path(args.out_summary).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"wrote {out_path}")
+    print(f"wrote {args.out_summary}")
+    print(f"elections={','.join(elections)} rows={len(panel)} keys={len(panel.index)}")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,24 +2,105 @@
 import argparse
 import glob
 import json
+from array import array
 from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 
+from columnar import SCHEMA_FILE, is_columnar, read_table
+from group_stats import multi_grouped_stats
+from instrumentation import Instrumentation, add_instrumentation_args
+from row_stream import RowWriter, is_jsonl, iter_rows
+
+# grouping scheme -> key fields; 'province_party' drives residual_score / residual_zscore
+GROUPINGS = {
+    'province_party': ['province_code', 'party_code'],
+    'province': ['province_code'],
+    'region': ['region_code'],
+}
+
+
+# normalize_election69.py row fields the gap rows are built from
+NORMALIZED_COLUMNS = [
+    'area_code',
+    'party_key_69',
+    'constituency_votes',
+    'partylist_votes',
+    'constituency_total_votes',
+    'partylist_total_votes',
+    'constituency_share',
+    'partylist_share',
+    'gap_raw',
+    'constituency_rank',
+    'partylist_rank',
+    'gap_rank_shift',
+]
+
 
 def load_json(path: Path):
     return json.loads(path.read_text(encoding='utf-8'))
 
 
-def mean(vals):
-    return sum(vals) / len(vals) if vals else 0.0
+def normalized_is_fresh(path: Path, sources: list[Path]) -> bool:
+    """True when the normalized-69 output exists and is no older than any raw input."""
+    marker = path / SCHEMA_FILE if is_columnar(path) else path
+    if not marker.is_file():
+        return False
+    built = marker.stat().st_mtime_ns
+    return all(p.stat().st_mtime_ns <= built for p in sources if p.exists())
 
 
-def std(vals):
-    if not vals:
-        return 0.0
-    m = mean(vals)
-    var = sum((x - m) ** 2 for x in vals) / len(vals)
-    return var ** 0.5
+def normalized_area_groups(path: Path):
+    """(area_code, party rows) from the normalized-69 dataset; a columnar copy is read column-wise."""
+    if is_columnar(path):
+        rows = read_table(path).rows(NORMALIZED_COLUMNS)
+    elif is_jsonl(path):
+        rows = iter_rows(path)
+    else:
+        # every feature row is kept in memory anyway, so one C-level parse beats streaming
+        rows = load_json(path)['rows']
+    for area_code, group in groupby(rows, key=itemgetter('area_code')):
+        yield area_code, list(group)
+
+
+def raw_area_groups(const_files: list[str], plist_map: dict[str, str]):
+    """(area_code, party rows) rebuilt from each constituency / party-list AREA file pair."""
+    for cf in const_files:
+        stem = Path(cf).stem
+        if stem not in plist_map:
+            continue
+        c = load_json(Path(cf))
+        p = load_json(Path(plist_map[stem]))
+        c_total = c.get('totalVotes') or 0
+        p_total = p.get('totalVotes') or 0
+        c_by_party = {e['partyCode']: e for e in c.get('entries', [])}
+        p_by_party = {e['partyCode']: e for e in p.get('entries', [])}
+        rows = []
+        for pc in sorted(set(c_by_party) | set(p_by_party)):
+            ce = c_by_party.get(pc, {})
+            pe = p_by_party.get(pc, {})
+            c_votes = ce.get('voteTotal', 0) or 0
+            p_votes = pe.get('voteTotal', 0) or 0
+            c_share = (c_votes / c_total) if c_total else 0
+            p_share = (p_votes / p_total) if p_total else 0
+            c_rank = ce.get('rank')
+            p_rank = pe.get('rank')
+            rows.append({
+                'area_code': c['areaCode'],
+                'party_key_69': pc,
+                'constituency_votes': c_votes,
+                'partylist_votes': p_votes,
+                'constituency_total_votes': c_total,
+                'partylist_total_votes': p_total,
+                'constituency_share': c_share,
+                'partylist_share': p_share,
+                'gap_raw': c_share - p_share,
+                'constituency_rank': c_rank,
+                'partylist_rank': p_rank,
+                'gap_rank_shift': ((c_rank or 999) - (p_rank or 999)),
+            })
+        yield c['areaCode'], rows
 
 
 def quantile(values, q):
@@ -43,10 +124,20 @@ def main():
     ap.add_argument('--parties', default='party-data.json')
     ap.add_argument('--const-dir', default='area-constituency')
     ap.add_argument('--plist-dir', default='area-candidates')
+    ap.add_argument('--normalized', nargs='+',
+                    default=['data/normalized/election69_normalized.cols', 'data/normalized/election69_normalized.json'],
+                    help='normalize_election69.py outputs (.cols directory, JSON or JSON Lines); the first one not older than the raw files is used')
+    ap.add_argument('--from-raw', action='store_true', help='ignore --normalized and rebuild rows from the AREA-*.json files')
     ap.add_argument('--out-features', default='analysis_features.json')
     ap.add_argument('--out-summary', default='analysis_summary.json')
     ap.add_argument('--out-tests', default='hypothesis_tests.json')
+    ap.add_argument('--robust', action='store_true', help='z-score as (gap - median) / (1.4826 * MAD) instead of (gap - mean) / std')
+    ap.add_argument('--groupings', nargs='*', default=[], choices=[g for g in GROUPINGS if g != 'province_party'],
+                    help='extra grouping schemes scored in the same pass (adds residual_zscore_<scheme> columns)')
+    add_instrumentation_args(ap)
     args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+    inst.phase('loading')
 
     common = load_json(Path(args.common))
     parties = load_json(Path(args.parties))['parties']
@@ -59,49 +150,33 @@ def main():
     plist_files = sorted(glob.glob(f"{args.plist_dir}/AREA-*.json"))
     plist_map = {Path(p).stem: p for p in plist_files}
 
+    sources = [Path(args.common), Path(args.parties)] + [Path(p) for p in const_files + plist_files]
+    fresh = [] if args.from_raw else [Path(p) for p in args.normalized if normalized_is_fresh(Path(p), sources)]
+    if fresh:
+        source = str(fresh[0])
+        area_groups = normalized_area_groups(fresh[0])
+    else:
+        source = 'raw'
+        area_groups = raw_area_groups(const_files, plist_map)
+
+    inst.phase('area_rows')
     features = []
     winner_rows = []
 
-    for cf in const_files:
-        c = load_json(Path(cf))
-        area_code = c['areaCode']
-        stem = Path(cf).stem
-        if stem not in plist_map:
-            continue
-        p = load_json(Path(plist_map[stem]))
-
+    for area_code, party_rows in area_groups:
         area_meta = areas.get(area_code, {})
         prov_code = area_meta.get('provinceCode')
         prov_name = provinces.get(prov_code, {}).get('name')
 
-        c_total = c.get('totalVotes') or 0
-        p_total = p.get('totalVotes') or 0
-
-        c_by_party = {e['partyCode']: e for e in c.get('entries', [])}
-        p_by_party = {e['partyCode']: e for e in p.get('entries', [])}
-        party_codes = sorted(set(c_by_party) | set(p_by_party))
-
-        winner = None
-        for e in c.get('entries', []):
-            if e.get('rank') == 1:
-                winner = e
-                break
-
-        winner_party = winner.get('partyCode') if winner else None
-        winner_const_share = (winner.get('voteTotal', 0) / c_total) if (winner and c_total) else 0
-        winner_plist_share = (p_by_party.get(winner_party, {}).get('voteTotal', 0) / p_total) if (winner_party and p_total) else 0
-        winner_gap = winner_const_share - winner_plist_share
-
-        for pc in party_codes:
-            ce = c_by_party.get(pc, {})
-            pe = p_by_party.get(pc, {})
-            c_votes = ce.get('voteTotal', 0)
-            p_votes = pe.get('voteTotal', 0)
-            c_share = (c_votes / c_total) if c_total else 0
-            p_share = (p_votes / p_total) if p_total else 0
-            c_rank = ce.get('rank')
-            p_rank = pe.get('rank')
+        # the winner's gap is its own row's constituency share minus its party-list share
+        winner = next((r for r in party_rows if r['constituency_rank'] == 1), None)
+        winner_party = winner['party_key_69'] if winner else None
+        winner_const_share = winner['constituency_share'] if winner else 0
+        winner_plist_share = winner['partylist_share'] if winner else 0
+        winner_gap = winner['gap_raw'] if winner else 0
 
+        for e in party_rows:
+            pc = e['party_key_69']
             pr = party_by_code.get(pc, {})
             row = {
                 'area_code': area_code,
@@ -111,16 +186,16 @@ def main():
                 'party_code': pc,
                 'party_no': pr.get('number'),
                 'party_name': pr.get('name'),
-                'constituency_votes': c_votes,
-                'partylist_votes': p_votes,
-                'constituency_total_votes': c_total,
-                'partylist_total_votes': p_total,
-                'constituency_share': c_share,
-                'partylist_share': p_share,
-                'gap_raw': c_share - p_share,
-                'constituency_rank': c_rank,
-                'partylist_rank': p_rank,
-                'gap_rank_shift': ((c_rank or 999) - (p_rank or 999)),
+                'constituency_votes': e['constituency_votes'],
+                'partylist_votes': e['partylist_votes'],
+                'constituency_total_votes': e['constituency_total_votes'],
+                'partylist_total_votes': e['partylist_total_votes'],
+                'constituency_share': e['constituency_share'],
+                'partylist_share': e['partylist_share'],
+                'gap_raw': e['gap_raw'],
+                'constituency_rank': e['constituency_rank'],
+                'partylist_rank': e['partylist_rank'],
+                'gap_rank_shift': e['gap_rank_shift'],
                 'winner_gap': winner_gap,
                 'winner_party_code': winner_party,
                 'is_constituency_winner_party': pc == winner_party,
@@ -140,28 +215,35 @@ def main():
             'is_same_as_win66': winner_party == area_meta.get('win66PartyCode'),
         })
 
-    # residual by (province,party)
-    gp = defaultdict(list)
-    for r in features:
-        gp[(r['province_code'], r['party_code'])].append(r['gap_raw'])
-
-    gp_mean = {k: mean(v) for k, v in gp.items()}
-    gp_std = {k: std(v) for k, v in gp.items()}
-
-    for r in features:
-        k = (r['province_code'], r['party_code'])
-        m = gp_mean.get(k, 0)
-        s = gp_std.get(k, 0)
-        resid = r['gap_raw'] - m
-        r['residual_score'] = resid
-        r['residual_zscore'] = (resid / s) if s > 1e-12 else 0.0
+    # residual by (province,party), plus any extra grouping schemes, from one set of columns
+    inst.phase('residuals')
+    gap = array('d', (r['gap_raw'] for r in features))
+    region_of = {code: p.get('regionCode') for code, p in provinces.items()}
+    key_columns = {
+        'province_party': [(r['province_code'], r['party_code']) for r in features],
+        'province': [r['province_code'] for r in features],
+        'region': [region_of.get(r['province_code']) for r in features],
+    }
+    schemes = ['province_party'] + [g for g in args.groupings if g != 'province_party']
+    stats = multi_grouped_stats(gap, {name: key_columns[name] for name in schemes})
+
+    resid = stats['province_party'].residuals(gap, args.robust)
+    z = stats['province_party'].zscores(gap, args.robust)
+    extra_z = {name: stats[name].zscores(gap, args.robust) for name in schemes[1:]}
+    for i, r in enumerate(features):
+        r['residual_score'] = resid[i]
+        r['residual_zscore'] = z[i]
+        for name, zs in extra_z.items():
+            r[f'residual_zscore_{name}'] = zs[i]
 
     # anomaly threshold top 3% by absolute residual zscore
-    absz = [abs(r['residual_zscore']) for r in features]
+    absz = [abs(v) for v in z]
     z_thr = quantile(absz, 0.97)
-    anomaly_rows = [r for r in features if abs(r['residual_zscore']) >= z_thr]
+    is_anomaly = [v >= z_thr for v in absz]
+    anomaly_count = sum(is_anomaly)
 
     # party summary
+    inst.phase('party_summary')
     by_party = defaultdict(lambda: {
         'party_code': None,
         'party_no': None,
@@ -172,7 +254,7 @@ def main():
         'anomaly_rows': 0,
         'winner_count': 0,
     })
-    for r in features:
+    for r, flagged in zip(features, is_anomaly):
         d = by_party[r['party_code']]
         d['party_code'] = r['party_code']
         d['party_no'] = r['party_no']
@@ -181,11 +263,8 @@ def main():
         d['sum_gap_raw'] += r['gap_raw']
         if r['is_constituency_winner_party']:
             d['winner_count'] += 1
-
-    an_set = {(r['area_code'], r['party_code']) for r in anomaly_rows}
-    for r in features:
-        if (r['area_code'], r['party_code']) in an_set:
-            by_party[r['party_code']]['anomaly_rows'] += 1
+        if flagged:
+            d['anomaly_rows'] += 1
 
     party_summary = []
     for d in by_party.values():
@@ -199,11 +278,14 @@ def main():
     wg_thr = quantile(winner_gaps, 0.97)
     winner_gap_watchlist = sorted([w for w in winner_rows if w['winner_gap'] >= wg_thr], key=lambda x: x['winner_gap'], reverse=True)
 
+    inst.stop()
+    inst.write_sidecar(Path(args.out_summary))
     summary = {
+        'source': source,
         'counts': {
             'areas': len({r['area_code'] for r in features}),
             'rows': len(features),
-            'anomaly_rows': len(anomaly_rows),
+            'anomaly_rows': anomaly_count,
             'winner_rows': len(winner_rows),
         },
         'thresholds': {
@@ -211,10 +293,14 @@ def main():
             'winner_gap_top3pct': wg_thr,
         },
         'top_party_by_anomaly_ratio': party_summary[:20],
+        'group_stats': {
+            name: {'groups': len(stats[name].keys), 'stats': stats[name].table(GROUPINGS[name])} for name in schemes[1:]
+        },
         'winner_gap_watchlist': winner_gap_watchlist[:100],
         'notes': [
             'gap_raw = constituency_share - partylist_share',
             'residual_zscore computed within (province, party)',
+            'z-score center/scale: ' + ('median / 1.4826*MAD' if args.robust else 'mean / std'),
             'anomaly uses top 3% absolute residual z-score',
         ],
     }
@@ -240,12 +326,15 @@ def main():
         ]
     }
 
-    Path(args.out_features).write_text(json.dumps({'rows': features}, ensure_ascii=False), encoding='utf-8')
+    with RowWriter(Path(args.out_features)) as writer:
+        writer.write_all('rows', features)
+        writer.close()
     Path(args.out_summary).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
     Path(args.out_tests).write_text(json.dumps(tests, ensure_ascii=False, indent=2), encoding='utf-8')
 
-    print(f"rows={len(features)} areas={len({r['area_code'] for r in features})} anomaly_rows={len(anomaly_rows)}")
+    print(f"source={source} rows={len(features)} areas={len({r['area_code'] for r in features})} anomaly_rows={anomaly_count}")
     print(f"wrote {args.out_features} {args.out_summary} {args.out_tests}")
+    inst.print_summary()
 
 
 if __name__ == '__main__':
@@ -7,9 +7,14 @@ import argparse
 import datetime as dt
 import hashlib
 import json
+import math
 from collections import defaultdict
 from pathlib import Path
 
+from crossyear_panel import load_panel
+from instrumentation import Instrumentation, add_instrumentation_args
+from row_stream import load_document
+
 
 def load_json(path: Path):
     return json.loads(path.read_text(encoding="utf-8"))
@@ -46,68 +51,118 @@ def histogram(vals, bins=40):
     return hist
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Build section JSON for research page")
-    ap.add_argument("--input-dir", default=".")
-    ap.add_argument("--out-dir", default="docs/data/research")
-    args = ap.parse_args()
-
-    input_dir = Path(args.input_dir)
-    out_dir = Path(args.out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    hypothesis = (input_dir / "hypothesis.md").read_text(encoding="utf-8") if (input_dir / "hypothesis.md").exists() else ""
-
-    dash = load_json(input_dir / "docs/data/dashboard-data.json")
-    summary69 = load_json(input_dir / "analysis_summary.json")
-    tests69 = load_json(input_dir / "hypothesis_tests.json")
-    cross_summary = load_json(input_dir / "data/research/crossyear_summary.json")
-    cross_features = load_json(input_dir / "data/research/crossyear_features.json")
-    cross_quality = load_json(input_dir / "data/research/mapping_quality_report.json")
-
-    rows66 = cross_features.get("rows_66", [])
-    rows69 = cross_features.get("rows_69", [])
-    comp = cross_features.get("comparative_rows", [])
-
-    # SECTION: overview
-    over = dash.get("overview", {})
-    party_meta_by_code = {}
-    for p in over.get("party_totals", []):
+# Inputs are addressed by a short key so the dependency map below stays readable.
+INPUT_FILES = {
+    "hypothesis": "hypothesis.md",
+    "dashboard": "docs/data/dashboard-data.json",
+    "summary69": "analysis_summary.json",
+    "tests69": "hypothesis_tests.json",
+    "cross_summary": "data/research/crossyear_summary.json",
+    "cross_features": "data/research/crossyear_features.json",
+    "cross_panel": "data/research/crossyear_panel.json",
+    "cross_panel_bin": "data/research/crossyear_panel.bin",
+    "cross_quality": "data/research/mapping_quality_report.json",
+}
+
+# section -> (output file, inputs it reads). A section is rebuilt only when one of
+# its inputs (or this builder script) changed since the hashes stored in manifest.json.
+SECTION_INPUTS = {
+    "overview": ("section_overview.json", ["hypothesis", "dashboard", "summary69", "cross_summary"]),
+    "gap": ("section_gap.json", ["dashboard", "summary69", "cross_panel", "cross_panel_bin"]),
+    "alignment": ("section_alignment.json", ["dashboard"]),
+    "targeting": ("section_targeting.json", ["cross_summary", "cross_features"]),
+    "robustness": ("section_robustness.json", ["tests69", "cross_quality", "cross_summary", "summary69"]),
+    "appendix": ("section_appendix.json", ["cross_features"]),
+}
+
+BUILDER_KEY = "__builder__"
+
+
+def file_sha256(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Inputs:
+    """Lazily load research inputs so unaffected large files are never parsed."""
+
+    def __init__(self, input_dir: Path):
+        self.input_dir = input_dir
+        self._cache = {}
+
+    def path(self, key: str) -> Path:
+        return self.input_dir / INPUT_FILES[key]
+
+    def get(self, key: str):
+        if key not in self._cache:
+            path = self.path(key)
+            if key == "hypothesis":
+                self._cache[key] = path.read_text(encoding="utf-8") if path.exists() else ""
+            elif key == "cross_features":
+                self._cache[key] = load_document(path)
+            elif key == "cross_panel":
+                # header + mmap-ed columns; the .bin is a separate key only so it is hashed
+                self._cache[key] = load_panel(path)
+            else:
+                self._cache[key] = load_json(path)
+        return self._cache[key]
+
+
+def party_meta_by_code(dash) -> dict:
+    out = {}
+    for p in dash.get("overview", {}).get("party_totals", []):
         code = p.get("partyCode")
         if not code:
             continue
-        party_meta_by_code[code] = {"party_name": p.get("partyName"), "party_no": p.get("partyNo")}
-    section_overview = {
+        out[code] = {"party_name": p.get("partyName"), "party_no": p.get("partyNo")}
+    return out
+
+
+def build_section_overview(inp: Inputs):
+    over = inp.get("dashboard").get("overview", {})
+    cross_summary = inp.get("cross_summary")
+    # row counts come from the cross-year summary so editing hypothesis.md never parses the features file
+    cross_counts = cross_summary.get("counts", {})
+    return {
         "title": "ภาพรวมข้อมูลและผลรวมคะแนน",
-        "hypothesis_markdown": hypothesis,
+        "hypothesis_markdown": inp.get("hypothesis"),
         "national_totals_partylist_69": over.get("national_totals"),
         "province_totals_partylist_69": over.get("province_totals", []),
         "top_party_totals_partylist_69": over.get("party_totals", [])[:30],
         "coverage": cross_summary.get("coverage", {}),
         "counts": {
-            "rows66": len(rows66),
-            "rows69": len(rows69),
-            "comparative_rows": len(comp),
-            "areas69": summary69.get("counts", {}).get("areas"),
+            "rows66": cross_counts.get("rows66", 0),
+            "rows69": cross_counts.get("rows69", 0),
+            "comparative_rows": cross_counts.get("comparative_rows", 0),
+            "areas69": inp.get("summary69").get("counts", {}).get("areas"),
         },
     }
 
-    # SECTION: gap
-    g66 = [r.get("gap_raw") for r in rows66 if isinstance(r.get("gap_raw"), (int, float))]
-    g69 = [r.get("gap_raw") for r in rows69 if isinstance(r.get("gap_raw"), (int, float))]
+
+def build_section_gap(inp: Inputs):
+    summary69 = inp.get("summary69")
+    # gaps come from the cross-year panel, so this section never parses crossyear_features.json
+    panel = inp.get("cross_panel")
+    g66 = [v for _, _, v in panel.column66("gap_raw_66") if not math.isnan(v)]
+    gap69 = panel.col("gap_raw_69")
+    cells69 = panel.present(69)
+    g69 = panel.values("gap_raw_69", cells69)
 
     # by party mean gap 69
     by_party_69 = defaultdict(lambda: {"party_code": None, "party_name": None, "party_no": None, "rows": 0, "sum_gap": 0.0})
-    for r in rows69:
-        code = r.get("party_key_69")
-        if not code:
-            continue
-        d = by_party_69[code]
-        d["party_code"] = code
-        d["party_name"] = r.get("party_name_raw")
-        d["party_no"] = r.get("party_no_raw")
+    for c in cells69:
+        party = panel.parties[c % panel.n_parties]
+        d = by_party_69[party["key"]]
+        d["party_code"] = party["key"]
+        d["party_name"] = party["name"]
+        d["party_no"] = party["no"]
         d["rows"] += 1
-        d["sum_gap"] += r.get("gap_raw") or 0.0
+        d["sum_gap"] += 0.0 if math.isnan(gap69[c]) else gap69[c]
 
     party_gap_69 = []
     for d in by_party_69.values():
@@ -120,15 +175,16 @@ def main() -> int:
         })
     party_gap_69.sort(key=lambda x: x["mean_gap_raw_69"], reverse=True)
 
+    meta_by_code = party_meta_by_code(inp.get("dashboard"))
     winner_gap_watchlist = []
     for w in summary69.get("winner_gap_watchlist", []):
         x = dict(w)
-        meta = party_meta_by_code.get(w.get("winner_party_code"), {})
+        meta = meta_by_code.get(w.get("winner_party_code"), {})
         x["winner_party_name"] = meta.get("party_name")
         x["winner_party_no"] = meta.get("party_no")
         winner_gap_watchlist.append(x)
 
-    section_gap = {
+    return {
         "title": "ผลวิเคราะห์ Gap: แบ่งเขตเทียบบัญชีรายชื่อ",
         "gap_distribution_66": histogram(g66, bins=50),
         "gap_distribution_69": histogram(g69, bins=50),
@@ -145,9 +201,10 @@ def main() -> int:
         "winner_gap_threshold_top3pct": summary69.get("thresholds", {}).get("winner_gap_top3pct"),
     }
 
-    # SECTION: alignment
-    align = dash.get("alignment", {})
-    section_alignment = {
+
+def build_section_alignment(inp: Inputs):
+    align = inp.get("dashboard").get("alignment", {})
+    return {
         "title": "ผลวิเคราะห์เลขชนและคะแนนบัญชีรายชื่อ",
         "summary": align.get("summary", {}),
         "summary_by_base_party": align.get("summary_by_base_party", []),
@@ -155,8 +212,10 @@ def main() -> int:
         "outlier_rows_top": {k: (v.get("rows") or [])[:200] for k, v in align.get("outliers", {}).items()},
     }
 
-    # SECTION: targeting + บ้านใหญ่ proxy
-    winner_rows = cross_features.get("winner_rows_69", [])
+
+def build_section_targeting(inp: Inputs):
+    cross_summary = inp.get("cross_summary")
+    winner_rows = inp.get("cross_features").get("winner_rows_69", [])
     winner_rows_sorted = sorted(winner_rows, key=lambda x: (x.get("winner_gap_69") or 0.0), reverse=True)
 
     # province-level concentration proxy
@@ -185,7 +244,7 @@ def main() -> int:
         )
     prov_targeting.sort(key=lambda x: x["mean_winner_gap_69"], reverse=True)
 
-    section_targeting = {
+    return {
         "title": "Targeting เขตพอมีโอกาส และบ้านใหญ่ (proxy)",
         "winner_rows_69_top": winner_rows_sorted[:250],
         "province_targeting_summary": prov_targeting,
@@ -193,12 +252,15 @@ def main() -> int:
         "threshold_close66": cross_summary.get("thresholds", {}).get("close_margin_66_p30"),
     }
 
-    section_robustness = {
+
+def build_section_robustness(inp: Inputs):
+    cross_summary = inp.get("cross_summary")
+    return {
         "title": "Robustness และข้อจำกัด",
-        "hypothesis_tests": tests69.get("tests", []),
-        "mapping_quality": cross_quality,
+        "hypothesis_tests": inp.get("tests69").get("tests", []),
+        "mapping_quality": inp.get("cross_quality"),
         "coverage": cross_summary.get("coverage", {}),
-        "notes": summary69.get("notes", []),
+        "notes": inp.get("summary69").get("notes", []),
         "disclaimer": [
             "ผลลัพธ์เป็นหลักฐานเชิงสถิติและข้อสังเกตจากข้อมูล ไม่ใช่ข้อพิสูจน์ทางกฎหมาย",
             "การเทียบข้ามปีระดับเขตอาจได้รับผลจากการเปลี่ยน boundary หรือบริบทการเมืองในพื้นที่",
@@ -206,39 +268,89 @@ def main() -> int:
         ],
     }
 
-    files = {
-        "section_overview.json": section_overview,
-        "section_gap.json": section_gap,
-        "section_alignment.json": section_alignment,
-        "section_targeting.json": section_targeting,
-        "section_robustness.json": section_robustness,
-    }
-
-    for fn, data in files.items():
-        (out_dir / fn).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
 
+def build_section_appendix(inp: Inputs):
     # lightweight appendix (interactive large table source) in separate lazy file
-    appendix = {
+    return {
         "title": "ภาคผนวกข้อมูล",
-        "comparative_rows": comp,
+        "comparative_rows": inp.get("cross_features").get("comparative_rows", []),
     }
-    (out_dir / "section_appendix.json").write_text(json.dumps(appendix, ensure_ascii=False), encoding="utf-8")
+
+
+SECTION_BUILDERS = {
+    "overview": build_section_overview,
+    "gap": build_section_gap,
+    "alignment": build_section_alignment,
+    "targeting": build_section_targeting,
+    "robustness": build_section_robustness,
+    "appendix": build_section_appendix,
+}
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write text unless the file already holds identical bytes (keeps mtime/ETag stable)."""
+    data = text.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.write_bytes(data)
+    return True
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build section JSON for research page")
+    ap.add_argument("--input-dir", default=".")
+    ap.add_argument("--out-dir", default="docs/data/research")
+    ap.add_argument("--force", action="store_true", help="Rebuild every section regardless of stored input hashes")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    input_dir = Path(args.input_dir)
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    inp = Inputs(input_dir)
+    inst.phase("hash_inputs")
+    input_hashes = {key: file_sha256(inp.path(key)) for key in INPUT_FILES}
+    input_hashes[BUILDER_KEY] = file_sha256(Path(__file__))
+
+    manifest_path = out_dir / "manifest.json"
+    prev_manifest = load_json(manifest_path) if manifest_path.exists() else {}
+    prev_hashes = prev_manifest.get("sectionInputHashes", {})
+
+    inst.end_phase()
+    rebuilt = []
+    for name, (fn, deps) in SECTION_INPUTS.items():
+        current = {k: input_hashes[k] for k in [*deps, BUILDER_KEY]}
+        if not args.force and (out_dir / fn).exists() and prev_hashes.get(name) == current:
+            continue
+        with inst.span(f"section_{name}"):
+            data = SECTION_BUILDERS[name](inp)
+            write_if_changed(out_dir / fn, json.dumps(data, ensure_ascii=False))
+        rebuilt.append(name)
+
+    section_hashes = {name: {k: input_hashes[k] for k in [*deps, BUILDER_KEY]} for name, (_, deps) in SECTION_INPUTS.items()}
+    if not rebuilt and prev_manifest.get("sectionInputHashes") == section_hashes and prev_manifest.get("inputs") == input_hashes:
+        inst.stop()
+        print(f"research sections up to date in {out_dir}")
+        return 0
+
+    inst.phase("manifest")
+
+    # manifest counts mirror the overview section, so reuse it instead of re-reading the features
+    section_overview = load_json(out_dir / SECTION_INPUTS["overview"][0])
+    overview_counts = section_overview.get("counts", {})
+    summary69 = inp.get("summary69")
+    hypothesis = inp.get("hypothesis")
 
     manifest = {
         "version": "1.0.0",
         "generatedAt": dt.datetime.now(dt.timezone.utc).isoformat(),
-        "sections": {
-            "overview": "section_overview.json",
-            "gap": "section_gap.json",
-            "alignment": "section_alignment.json",
-            "targeting": "section_targeting.json",
-            "robustness": "section_robustness.json",
-            "appendix": "section_appendix.json",
-        },
+        "sections": {name: fn for name, (fn, _) in SECTION_INPUTS.items()},
         "counts": {
-            "rows66": len(rows66),
-            "rows69": len(rows69),
-            "comparativeRows": len(comp),
+            "rows66": overview_counts.get("rows66"),
+            "rows69": overview_counts.get("rows69"),
+            "comparativeRows": overview_counts.get("comparative_rows"),
             "areas69": summary69.get("counts", {}).get("areas", 0),
         },
         "thresholds": {
@@ -247,10 +359,16 @@ def main() -> int:
         },
         "hypothesis_source": "hypothesis.md",
         "dataSha": hashlib.sha256((json.dumps(section_overview, ensure_ascii=False) + hypothesis).encode("utf-8")).hexdigest(),
+        "inputs": input_hashes,
+        "sectionInputHashes": section_hashes,
+        "rebuiltSections": rebuilt,
     }
+    inst.stop()
+    manifest["timings"] = inst.report()
 
     (out_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"wrote research sections to {out_dir}")
+    print(f"wrote research sections to {out_dir} rebuilt={','.join(rebuilt) or '-'}")
+    inst.print_summary()
     return 0
 
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Load election 69 results, normalized 66/69 rows and cross-year rows into an indexed SQLite store."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import glob
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+from row_stream import iter_rows
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE regions (code TEXT PRIMARY KEY, name TEXT, total_areas INTEGER);
+CREATE TABLE provinces (code TEXT PRIMARY KEY, region_code TEXT, name TEXT);
+CREATE TABLE areas (
+    code TEXT PRIMARY KEY, province_code TEXT, number INTEGER, name TEXT, win66_party_code TEXT
+);
+CREATE TABLE parties (code TEXT PRIMARY KEY, number INTEGER, name TEXT, name_en TEXT, color TEXT);
+CREATE TABLE candidates (
+    code TEXT PRIMARY KEY, area_code TEXT, party_code TEXT, number INTEGER, prefix TEXT,
+    first_name TEXT, last_name TEXT, is66_winner INTEGER, party66_ref_code TEXT, switched_party TEXT
+);
+CREATE TABLE area_turnout (
+    area_code TEXT, ballot TEXT, total_votes INTEGER, good_votes INTEGER, bad_votes INTEGER,
+    no_votes INTEGER, eligible_voters INTEGER, progress_percent REAL,
+    PRIMARY KEY (area_code, ballot)
+);
+-- one row per (area, party) with both ballots side by side
+CREATE TABLE area_party (
+    area_code TEXT NOT NULL, province_code TEXT, party_code TEXT NOT NULL, candidate_code TEXT,
+    constituency_votes INTEGER, partylist_votes INTEGER,
+    constituency_rank INTEGER, partylist_rank INTEGER,
+    constituency_share REAL, partylist_share REAL, gap REAL,
+    PRIMARY KEY (area_code, party_code)
+) WITHOUT ROWID;
+CREATE TABLE normalized_rows (
+    election INTEGER, district_key TEXT, province_name_norm TEXT, district_no INTEGER,
+    party_key TEXT, party_name_norm TEXT, party_no INTEGER,
+    constituency_votes REAL, partylist_votes REAL, constituency_rank INTEGER, partylist_rank INTEGER,
+    constituency_share REAL, partylist_share REAL, gap_raw REAL
+);
+CREATE TABLE crossyear_rows (
+    district_key TEXT, province_name_norm TEXT, district_no INTEGER, party_key_69 TEXT,
+    party_name_66 TEXT, party_name_69 TEXT, gap_raw_66 REAL, gap_raw_69 REAL, delta_gap_raw REAL,
+    constituency_share_66 REAL, constituency_share_69 REAL, partylist_share_66 REAL, partylist_share_69 REAL
+);
+"""
+
+# indexes are created after the bulk load so inserts do not pay for them row by row
+INDEXES = """
+CREATE INDEX idx_area_party_province ON area_party (province_code, party_code);
+CREATE INDEX idx_area_party_party ON area_party (party_code, constituency_rank);
+CREATE INDEX idx_candidates_area_party ON candidates (area_code, party_code);
+CREATE INDEX idx_areas_province ON areas (province_code);
+CREATE INDEX idx_normalized_district_party ON normalized_rows (election, district_key, party_name_norm);
+CREATE INDEX idx_normalized_province_party ON normalized_rows (election, province_name_norm, party_name_norm);
+CREATE INDEX idx_crossyear_district_party ON crossyear_rows (district_key, party_key_69);
+CREATE INDEX idx_crossyear_province_party ON crossyear_rows (province_name_norm, party_key_69);
+"""
+
+AGGREGATES = """
+CREATE TABLE party_totals AS
+SELECT party_code,
+       SUM(constituency_votes) AS constituency_votes,
+       SUM(partylist_votes) AS partylist_votes,
+       SUM(constituency_rank = 1) AS seats,
+       COUNT(candidate_code) AS areas_contested,
+       AVG(gap) AS mean_gap
+FROM area_party GROUP BY party_code;
+CREATE UNIQUE INDEX idx_party_totals ON party_totals (party_code);
+
+CREATE TABLE province_party_totals AS
+SELECT province_code, party_code,
+       SUM(constituency_votes) AS constituency_votes,
+       SUM(partylist_votes) AS partylist_votes,
+       SUM(constituency_rank = 1) AS seats,
+       COUNT(*) AS areas
+FROM area_party GROUP BY province_code, party_code;
+CREATE UNIQUE INDEX idx_province_party_totals ON province_party_totals (province_code, party_code);
+
+CREATE TABLE province_totals AS
+SELECT province_code,
+       SUM(CASE WHEN ballot = 'constituency' THEN total_votes END) AS constituency_votes,
+       SUM(CASE WHEN ballot = 'partylist' THEN total_votes END) AS partylist_votes,
+       SUM(CASE WHEN ballot = 'constituency' THEN eligible_voters END) AS eligible_voters
+FROM area_turnout JOIN areas ON areas.code = area_turnout.area_code GROUP BY province_code;
+CREATE UNIQUE INDEX idx_province_totals ON province_totals (province_code);
+
+CREATE TABLE crossyear_party_totals AS
+SELECT party_key_69, COUNT(*) AS rows, AVG(gap_raw_66) AS mean_gap_66, AVG(gap_raw_69) AS mean_gap_69,
+       AVG(delta_gap_raw) AS mean_delta_gap
+FROM crossyear_rows GROUP BY party_key_69;
+CREATE UNIQUE INDEX idx_crossyear_party_totals ON crossyear_party_totals (party_key_69);
+"""
+
+# examples from the dashboards / notebooks; timed after the build as a smoke test
+SAMPLE_QUERIES = {
+    "party_share_in_province": (
+        "SELECT SUM(partylist_votes) * 1.0 / (SELECT partylist_votes FROM province_totals WHERE province_code = ?) "
+        "FROM area_party WHERE province_code = ? AND party_code = ?",
+        ("PROVINCE-10", "PROVINCE-10", "PARTY-0046"),
+    ),
+    "areas_where_x_beat_y": (
+        "SELECT x.area_code FROM area_party x JOIN area_party y ON y.area_code = x.area_code AND y.party_code = ? "
+        "WHERE x.party_code = ? AND x.constituency_votes > y.constituency_votes",
+        ("PARTY-0037", "PARTY-0046"),
+    ),
+    "party_totals": ("SELECT * FROM party_totals ORDER BY seats DESC LIMIT 10", ()),
+}
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def share(votes, total):
+    return (votes / total) if total else 0.0
+
+
+def area_rows(common: dict, const_dir: str, plist_dir: str, candidate_by_area_party: dict):
+    """Yield (turnout rows, area_party rows) per area from the raw AREA-*.json files."""
+    areas = {a["code"]: a for a in common["areas"]}
+    plist_map = {Path(p).stem: p for p in glob.glob(f"{plist_dir}/AREA-*.json")}
+    for cf in sorted(glob.glob(f"{const_dir}/AREA-*.json")):
+        stem = Path(cf).stem
+        if stem not in plist_map:
+            continue
+        c = load_json(Path(cf))
+        p = load_json(Path(plist_map[stem]))
+        area_code = c["areaCode"]
+        province_code = areas.get(area_code, {}).get("provinceCode")
+        turnout = [
+            (area_code, ballot, d.get("totalVotes"), d.get("goodVotes"), d.get("badVotes"), d.get("noVotes"), d.get("totalEligibleVoters"), d.get("voteProgressPercent"))
+            for ballot, d in (("constituency", c), ("partylist", p))
+        ]
+        c_total = c.get("totalVotes") or 0
+        p_total = p.get("totalVotes") or 0
+        c_by_party = {e.get("partyCode"): e for e in c.get("entries", [])}
+        p_by_party = {e.get("partyCode"): e for e in p.get("entries", [])}
+        rows = []
+        for code in sorted(set(c_by_party) | set(p_by_party)):
+            ce = c_by_party.get(code, {})
+            pe = p_by_party.get(code, {})
+            c_votes = ce.get("voteTotal", 0) or 0
+            p_votes = pe.get("voteTotal", 0) or 0
+            c_share = share(c_votes, c_total)
+            p_share = share(p_votes, p_total)
+            candidate = ce.get("candidateCode") or candidate_by_area_party.get((area_code, code))
+            rows.append((area_code, province_code, code, candidate, c_votes, p_votes, ce.get("rank"), pe.get("rank"), c_share, p_share, c_share - p_share))
+        yield turnout, rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build an indexed SQLite results store")
+    ap.add_argument("--common", default="common-data.json")
+    ap.add_argument("--parties", default="party-data.json")
+    ap.add_argument("--candidates", default="candidate-data.json")
+    ap.add_argument("--const-dir", default="area-constituency")
+    ap.add_argument("--plist-dir", default="area-candidates")
+    ap.add_argument("--in66", default="data/normalized/election66_normalized.json")
+    ap.add_argument("--in69", default="data/normalized/election69_normalized.json")
+    ap.add_argument("--crossyear-features", default="data/research/crossyear_features.json")
+    ap.add_argument("--out", default="data/results.sqlite")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    common = load_json(Path(args.common))
+    parties = load_json(Path(args.parties))["parties"]
+    candidates = load_json(Path(args.candidates))["candidates"]
+    candidate_by_area_party = {(c.get("areaCode"), c.get("partyCode")): c.get("code") for c in candidates}
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # build next to the target and swap in at the end so readers never see a half-built file
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp_path, isolation_level=None)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+    con.executescript(SCHEMA)
+
+    # every bulk insert below runs in this one transaction
+    counts = {}
+    con.execute("BEGIN")
+
+    inst.phase("dimensions")
+    con.executemany("INSERT INTO regions VALUES (?, ?, ?)", [(r["code"], r.get("name"), r.get("totalAreas")) for r in common["regions"]])
+    con.executemany("INSERT INTO provinces VALUES (?, ?, ?)", [(p["code"], p.get("regionCode"), p.get("name")) for p in common["provinces"]])
+    con.executemany(
+        "INSERT INTO areas VALUES (?, ?, ?, ?, ?)",
+        [(a["code"], a.get("provinceCode"), a.get("number"), a.get("name"), a.get("win66PartyCode")) for a in common["areas"]],
+    )
+    con.executemany(
+        "INSERT INTO parties VALUES (?, ?, ?, ?, ?)",
+        [(p["code"], p.get("number"), p.get("name"), p.get("nameEn"), p.get("colorPrimary")) for p in parties],
+    )
+    con.executemany(
+        "INSERT INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (c["code"], c.get("areaCode"), c.get("partyCode"), c.get("number"), c.get("prefix"), c.get("firstName"), c.get("lastName"), int(bool(c.get("is66Winner"))), c.get("party66RefCode"), c.get("switchedParty"))
+            for c in candidates
+        ],
+    )
+
+    inst.phase("area_party")
+    n_area_party = 0
+    for turnout, rows in area_rows(common, args.const_dir, args.plist_dir, candidate_by_area_party):
+        con.executemany("INSERT INTO area_turnout VALUES (?, ?, ?, ?, ?, ?, ?, ?)", turnout)
+        con.executemany("INSERT INTO area_party VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        n_area_party += len(rows)
+    counts["area_party"] = n_area_party
+
+    inst.phase("normalized_rows")
+    for election, path in ((66, Path(args.in66)), (69, Path(args.in69))):
+        if not path.exists():
+            continue
+        before = con.total_changes
+        # executemany consumes the stream directly, so rows are never all in memory
+        con.executemany(
+            "INSERT INTO normalized_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    election, r.get("district_key"), r.get("province_name_norm"), r.get("district_no"),
+                    r.get("party_key_69"), r.get("party_name_norm"), r.get("party_no_raw"),
+                    r.get("constituency_votes"), r.get("partylist_votes"), r.get("constituency_rank"), r.get("partylist_rank"),
+                    r.get("constituency_share"), r.get("partylist_share"), r.get("gap_raw"),
+                )
+                for r in iter_rows(path, "rows")
+            ),
+        )
+        counts[f"normalized_rows_{election}"] = con.total_changes - before
+
+    inst.phase("crossyear_rows")
+    features_path = Path(args.crossyear_features)
+    if features_path.exists():
+        before = con.total_changes
+        con.executemany(
+            "INSERT INTO crossyear_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    r.get("district_key"), r.get("province_name_norm"), r.get("district_no"), r.get("party_key_69"),
+                    r.get("party_name_66"), r.get("party_name_69"), r.get("gap_raw_66"), r.get("gap_raw_69"), r.get("delta_gap_raw"),
+                    r.get("constituency_share_66"), r.get("constituency_share_69"), r.get("partylist_share_66"), r.get("partylist_share_69"),
+                )
+                for r in iter_rows(features_path, "comparative_rows")
+            ),
+        )
+        counts["crossyear_rows"] = con.total_changes - before
+
+    con.executemany(
+        "INSERT INTO meta VALUES (?, ?)",
+        [("generatedAt", dt.datetime.now(dt.timezone.utc).isoformat()), ("counts", json.dumps(counts))],
+    )
+    con.execute("COMMIT")
+
+    inst.phase("indexes")
+    con.executescript(INDEXES)
+
+    inst.phase("aggregates")
+    con.executescript(AGGREGATES)
+    con.execute("ANALYZE")
+    con.close()
+    os.replace(tmp_path, out_path)
+
+    inst.phase("sample_queries")
+    ro = sqlite3.connect(f"file:{out_path}?mode=ro", uri=True)
+    timings = {}
+    for name, (sql, params) in SAMPLE_QUERIES.items():
+        t0 = time.perf_counter()
+        ro.execute(sql, params).fetchall()
+        timings[name] = time.perf_counter() - t0
+    ro.close()
+    inst.stop()
+
+    print(f"wrote {out_path} " + " ".join(f"{k}={v}" for k, v in counts.items()))
+    for name, secs in timings.items():
+        print(f"  query {name}: {secs * 1000:.2f} ms")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
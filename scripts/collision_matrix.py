@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Ballot-number collision matrix over every party number and every area.
+
+A collision is a party-list vote row for party number N in an area that has a constituency
+candidate numbered N. The collided votes are credited to the cell
+(party-list party, candidate's party). The rows come from ``alignment_sweep.load_collisions``
+for all party numbers, not only ``small_party_range``.
+
+Each cell is an integer code ``party_no * n_slots + slot``, so totals are scatter-adds into
+one flat array. The per-area contributions are the same rows laid out by cell with a
+counting sort (CSR offsets). The baseline shuffles candidate numbers within each area, as
+the placebo rounds in ``build_dashboard_data.py`` do. It re-runs the scatter-add over the
+candidate-numbered rows only, and keeps per-cell running sums for the mean, std and
+empirical p-value.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+from array import array
+from pathlib import Path
+
+from alignment_sweep import CollisionTable, load_collisions, load_json
+from group_stats import group_runs
+from instrumentation import Instrumentation, add_instrumentation_args
+
+CELL_COLUMNS = ["listParty", "candidateParty", "votes", "areas", "baselineMean", "baselineStd", "z", "pValue"]
+
+
+class CollisionMatrix:
+    """Observed collided votes per cell, their per-area contributions, and a permutation baseline."""
+
+    def __init__(self, table: CollisionTable):
+        self.table = table
+        self.n_slots = table.n_slots
+        self.size = (table.max_no + 1) * self.n_slots
+        self.observed = array("q", [0]) * self.size
+        collided = [i for i, s in enumerate(table.cand) if s]
+        keys = [table.party_no[i] * self.n_slots + table.cand[i] for i in collided]
+        for key, i in zip(keys, collided):
+            self.observed[key] += table.votes[i]
+        self.cells = sorted(set(keys))
+        cell_id = {key: c for c, key in enumerate(self.cells)}
+        order, self.offsets = group_runs(array("i", (cell_id[k] for k in keys)), len(self.cells))
+        self.contrib_area = array("i", (table.area[collided[j]] for j in order))
+        self.contrib_votes = array("q", (table.votes[collided[j]] for j in order))
+        self.rounds = 0
+
+    def _permutable(self) -> list[tuple[list[int], list[tuple[int, int, int]]]]:
+        """Per area: candidate slots in number order, and (row position, party number, votes) of rows that can collide."""
+        t = self.table
+        rows_by_area: list[list[int]] = [[] for _ in t.area_codes]
+        for i, a in enumerate(t.area):
+            rows_by_area[a].append(i)
+        out = []
+        for a, cands in enumerate(t.area_candidates):
+            if not cands:
+                continue
+            position = {no: k for k, (no, _) in enumerate(cands)}
+            rows = [(position[t.party_no[i]], t.party_no[i], t.votes[i]) for i in rows_by_area[a] if t.party_no[i] in position]
+            if rows:
+                out.append(([slot for _, slot in cands], rows))
+        return out
+
+    def baseline(self, rounds: int, seed: int) -> None:
+        """Shuffle candidate numbers within each area ``rounds`` times; cell and column stats accumulate."""
+        areas = self._permutable()
+        n = self.n_slots
+        total = array("d", [0.0]) * self.size
+        total_sq = array("d", [0.0]) * self.size
+        ge = array("q", [0]) * self.size
+        col_total = [0.0] * n
+        col_sq = [0.0] * n
+        col_ge = [0] * n
+        observed_col = self.column_totals()
+        rng = random.Random(seed)
+        for _ in range(rounds):
+            cells = array("q", [0]) * self.size
+            for slots, rows in areas:
+                shuffled = slots[:]
+                rng.shuffle(shuffled)
+                for k, p, v in rows:
+                    cells[p * n + shuffled[k]] += v
+            cols = [0] * n
+            for key in range(self.size):
+                v = cells[key]
+                if v:
+                    total[key] += v
+                    total_sq[key] += v * v
+                    cols[key % n] += v
+                if v >= self.observed[key]:
+                    ge[key] += 1
+            for s in range(1, n):
+                col_total[s] += cols[s]
+                col_sq[s] += cols[s] * cols[s]
+                col_ge[s] += 1 if cols[s] >= observed_col[s] else 0
+        self.rounds = rounds
+        self.base_total, self.base_sq, self.base_ge = total, total_sq, ge
+        self.col_total, self.col_sq, self.col_ge = col_total, col_sq, col_ge
+
+    def column_totals(self) -> list[int]:
+        cols = [0] * self.n_slots
+        for key in self.cells:
+            cols[key % self.n_slots] += self.observed[key]
+        return cols
+
+    def _stats(self, observed: float, total: float, sq: float, ge: int) -> tuple[float, float, float, float]:
+        """(baseline mean, std, z, one-sided empirical p) for one observed value."""
+        m = total / self.rounds
+        sd = math.sqrt(max(sq / self.rounds - m * m, 0.0))
+        return m, sd, (observed - m) / sd if sd > 1e-12 else 0.0, ge / self.rounds
+
+    def cell_rows(self) -> list[list]:
+        """One row per non-zero cell, laid out as ``CELL_COLUMNS`` (party number, candidate party index)."""
+        out = []
+        for c, key in enumerate(self.cells):
+            p, s = divmod(key, self.n_slots)
+            votes = self.observed[key]
+            stats = self._stats(votes, self.base_total[key], self.base_sq[key], self.base_ge[key]) if self.rounds else (0.0, 0.0, 0.0, 0.0)
+            out.append([p, s - 1, votes, self.offsets[c + 1] - self.offsets[c], *stats])
+        return out
+
+    def candidate_party_rows(self) -> list[dict]:
+        """National view: collided votes credited to each candidate party vs the baseline."""
+        out = []
+        for s, votes in enumerate(self.column_totals()):
+            if s == 0:
+                continue
+            m, sd, z, p = self._stats(votes, self.col_total[s], self.col_sq[s], self.col_ge[s]) if self.rounds else (0.0, 0.0, 0.0, 0.0)
+            out.append({"candidateParty": s - 1, "votes": votes, "baselineMean": m, "baselineStd": sd, "z": z, "pValue": p})
+        out.sort(key=lambda r: r["z"], reverse=True)
+        return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build the full ballot-number collision matrix with a permutation baseline")
+    ap.add_argument("--input-dir", default=".")
+    ap.add_argument("--rounds", type=int, default=1000, help="Permutation rounds for the baseline (0 to skip)")
+    ap.add_argument("--seed", type=int, default=20260209)
+    ap.add_argument("--out", default="docs/data/collision-matrix.json")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    input_dir = Path(args.input_dir)
+    table = load_collisions(input_dir)
+    parties_by_no = {p["number"]: p for p in load_json(input_dir / "party-data.json")["parties"] if isinstance(p.get("number"), int)}
+
+    inst.phase("matrix")
+    matrix = CollisionMatrix(table)
+
+    inst.phase("baseline")
+    if args.rounds > 0:
+        matrix.baseline(args.rounds, args.seed)
+    inst.stop()
+
+    list_parties = sorted({key // table.n_slots for key in matrix.cells})
+    out = {
+        "meta": {
+            "rows": len(table.votes),
+            "collidedRows": len(matrix.contrib_votes),
+            "collidedVotes": sum(matrix.contrib_votes),
+            "cells": len(matrix.cells),
+            "areas": len(table.area_codes),
+            "rounds": matrix.rounds,
+            "seed": args.seed,
+            "pValue": "share of permutation rounds with at least the observed votes",
+        },
+        "areas": table.area_codes,
+        "listParties": {
+            str(no): {"code": parties_by_no.get(no, {}).get("code"), "name": parties_by_no.get(no, {}).get("name")} for no in list_parties
+        },
+        "candidateParties": table.cand_parties,
+        "columns": CELL_COLUMNS,
+        "cells": matrix.cell_rows(),
+        "contributions": {
+            "offsets": list(matrix.offsets),
+            "area": list(matrix.contrib_area),
+            "votes": list(matrix.contrib_votes),
+        },
+        "byCandidateParty": matrix.candidate_party_rows(),
+    }
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(out, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    inst.write_sidecar(out_path)
+    print(f"wrote {out_path}: {len(matrix.cells)} cells from {len(matrix.contrib_votes)} collided rows, {matrix.rounds} baseline rounds")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Columnar export of row datasets: one ``.npy`` file per column plus a dictionary string table.
+
+Layout of ``<name>.cols/``::
+
+    _schema.json          meta + per-table row counts and column specs
+    <table>/<col>.npy     numeric columns (<f8 / <i8 / |u1), NPY v1.0, mmap-able
+    <table>/<col>.valid.npy   |u1 validity mask for int/bool columns that contain nulls
+    <table>/<col>.codes.npy   <i4 dictionary codes for string columns (-1 = null)
+    <table>/<col>.dict.json   the string table for those codes
+    <table>/<col>.json    anything else (lists, mixed types) as a plain JSON array
+
+The files are written with the stdlib only; ``numpy.load(path, mmap_mode="r")`` reads them
+directly. Readers here select columns by name and memory-map numeric ones. When pyarrow is
+installed, ``write_arrow`` produces an Arrow IPC file with dictionary-encoded strings instead.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+import math
+import mmap
+import shutil
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # optional; the .npy layout needs nothing beyond the stdlib
+    pa = None
+
+SCHEMA_FILE = "_schema.json"
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# npy dtype descr -> (array typecode, itemsize)
+DTYPES = {"<f8": ("d", 8), "<i8": ("q", 8), "<i4": ("i", 4), "|u1": ("B", 1)}
+
+
+def infer_kind(values: list) -> str:
+    kinds = set()
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, bool):
+            kinds.add("bool")
+        elif isinstance(v, int):
+            kinds.add("int")
+        elif isinstance(v, float):
+            kinds.add("float")
+        elif isinstance(v, str):
+            kinds.add("str")
+        else:
+            return "json"
+    if not kinds:
+        return "json"
+    if kinds <= {"int"}:
+        return "int"
+    if kinds <= {"int", "float"}:
+        return "float"
+    if kinds == {"bool"}:
+        return "bool"
+    if kinds == {"str"}:
+        return "str"
+    return "json"
+
+
+def _write_npy(path: Path, descr: str, values: array) -> None:
+    if sys.byteorder != "little" and descr[0] == "<":
+        values = array(values.typecode, values)
+        values.byteswap()
+    header = repr({"descr": descr, "fortran_order": False, "shape": (len(values),)})
+    # pad so the data starts on a 64-byte boundary, as numpy does
+    pad = 64 - (len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + " " * pad + "\n"
+    with path.open("wb") as f:
+        f.write(NPY_MAGIC)
+        f.write(len(header).to_bytes(2, "little"))
+        f.write(header.encode("latin1"))
+        values.tofile(f)
+
+
+def _npy_header(buf) -> tuple[dict, int]:
+    if bytes(buf[:8]) != NPY_MAGIC:
+        raise ValueError("not an NPY v1.0 file")
+    hlen = int.from_bytes(bytes(buf[8:10]), "little")
+    return ast.literal_eval(bytes(buf[10 : 10 + hlen]).decode("latin1")), 10 + hlen
+
+
+def _read_npy(path: Path, use_mmap: bool):
+    with path.open("rb") as f:
+        if use_mmap and sys.byteorder == "little" and path.stat().st_size:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header, offset = _npy_header(mm)
+            typecode, _ = DTYPES[header["descr"]]
+            return memoryview(mm)[offset:].cast(typecode)
+        raw = f.read()
+    header, offset = _npy_header(raw)
+    typecode, _ = DTYPES[header["descr"]]
+    out = array(typecode)
+    out.frombytes(raw[offset:])
+    if sys.byteorder != "little" and header["descr"][0] == "<":
+        out.byteswap()
+    return out
+
+
+def write_column(table_dir: Path, name: str, values: list) -> dict:
+    kind = infer_kind(values)
+    has_null = any(v is None for v in values)
+    spec: dict[str, Any] = {"kind": kind}
+    if kind == "float":
+        _write_npy(table_dir / f"{name}.npy", "<f8", array("d", (math.nan if v is None else float(v) for v in values)))
+        # NaN marks null; keep a mask only if real NaNs could be confused with it
+        if has_null and any(isinstance(v, float) and math.isnan(v) for v in values):
+            _write_npy(table_dir / f"{name}.valid.npy", "|u1", array("B", (v is not None for v in values)))
+            spec["mask"] = True
+    elif kind in ("int", "bool"):
+        descr, tc = ("<i8", "q") if kind == "int" else ("|u1", "B")
+        _write_npy(table_dir / f"{name}.npy", descr, array(tc, (0 if v is None else int(v) for v in values)))
+        if has_null:
+            _write_npy(table_dir / f"{name}.valid.npy", "|u1", array("B", (v is not None for v in values)))
+            spec["mask"] = True
+    elif kind == "str":
+        table: dict[str, int] = {}
+        codes = array("i", (-1 if v is None else table.setdefault(v, len(table)) for v in values))
+        _write_npy(table_dir / f"{name}.codes.npy", "<i4", codes)
+        (table_dir / f"{name}.dict.json").write_text(json.dumps(list(table), ensure_ascii=False), encoding="utf-8")
+        spec["dictionary_size"] = len(table)
+    else:
+        (table_dir / f"{name}.json").write_text(json.dumps(values, ensure_ascii=False), encoding="utf-8")
+    return spec
+
+
+def column_names(rows: list[dict]) -> list[str]:
+    return list(dict.fromkeys(k for r in rows for k in r))
+
+
+def write_columnar(out_dir: Path, tables: dict[str, list[dict]], meta: dict | None = None) -> Path:
+    """Write each table's rows column by column; replaces out_dir atomically-ish via a temp dir."""
+    out_dir = Path(out_dir)
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    schema: dict[str, Any] = {"version": 1, "format": "npy", "meta": meta or {}, "tables": {}}
+    for table, rows in tables.items():
+        tdir = tmp / table
+        tdir.mkdir()
+        cols = {}
+        for name in column_names(rows):
+            # rows missing a key read back as null
+            cols[name] = write_column(tdir, name, [r.get(name) for r in rows])
+        schema["tables"][table] = {"row_count": len(rows), "columns": cols}
+    (tmp / SCHEMA_FILE).write_text(json.dumps(schema, ensure_ascii=False, indent=2), encoding="utf-8")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp.rename(out_dir)
+    return out_dir
+
+
+def write_arrow(path: Path, tables: dict[str, list[dict]], meta: dict | None = None) -> list[Path]:
+    """One Arrow IPC file per table (``<stem>.<table>.arrow``); string columns are dictionary-encoded."""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; use the .npy columnar layout instead")
+    path = Path(path)
+    written = []
+    for table, rows in tables.items():
+        arrays, names = [], []
+        for name in column_names(rows):
+            values = [r.get(name) for r in rows]
+            kind = infer_kind(values)
+            if kind == "json":
+                values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+            col = pa.array(values)
+            if kind in ("str", "json"):
+                col = col.dictionary_encode()
+            arrays.append(col)
+            names.append(name)
+        tbl = pa.Table.from_arrays(arrays, names=names).replace_schema_metadata({"meta": json.dumps(meta or {}, ensure_ascii=False)})
+        out = path.with_name(f"{path.stem}.{table}.arrow")
+        with pa_ipc.new_file(out, tbl.schema) as w:
+            w.write_table(tbl)
+        written.append(out)
+    return written
+
+
+def export_columnar(path: Path, tables: dict[str, list[dict]], meta: dict | None = None) -> list[Path]:
+    """``--out-columnar`` entry point: ``*.arrow`` -> Arrow IPC, anything else -> .npy directory."""
+    path = Path(path)
+    if path.suffix == ".arrow":
+        return write_arrow(path, tables, meta)
+    return [write_columnar(path, tables, meta)]
+
+
+def is_columnar(path: Path) -> bool:
+    return (Path(path) / SCHEMA_FILE).exists()
+
+
+class ColumnarTable:
+    """Lazy reader for one table; only the columns that are asked for are opened."""
+
+    def __init__(self, root: Path, table: str, use_mmap: bool = True):
+        self.root = Path(root)
+        self.schema = json.loads((self.root / SCHEMA_FILE).read_text(encoding="utf-8"))
+        self.meta = self.schema.get("meta", {})
+        self.spec = self.schema["tables"][table]
+        self.dir = self.root / table
+        self.row_count = self.spec["row_count"]
+        self.use_mmap = use_mmap
+        self._cache: dict[str, Any] = {}
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.spec["columns"])
+
+    def raw(self, name: str):
+        """Numeric buffer (memoryview over mmap when possible) or dictionary codes, undecoded."""
+        kind = self.spec["columns"][name]["kind"]
+        if kind == "str":
+            return _read_npy(self.dir / f"{name}.codes.npy", self.use_mmap)
+        if kind == "json":
+            raise TypeError(f"column {name!r} is stored as JSON, not a buffer")
+        return _read_npy(self.dir / f"{name}.npy", self.use_mmap)
+
+    def dictionary(self, name: str) -> list[str]:
+        return json.loads((self.dir / f"{name}.dict.json").read_text(encoding="utf-8"))
+
+    def column(self, name: str) -> list:
+        """Decoded Python values with nulls restored."""
+        if name in self._cache:
+            return self._cache[name]
+        spec = self.spec["columns"][name]
+        kind = spec["kind"]
+        if kind == "json":
+            out = json.loads((self.dir / f"{name}.json").read_text(encoding="utf-8"))
+        elif kind == "str":
+            table = self.dictionary(name)
+            out = [None if c < 0 else table[c] for c in self.raw(name)]
+        else:
+            buf = self.raw(name)
+            if kind == "float":
+                out = [None if math.isnan(v) else v for v in buf]
+            elif kind == "bool":
+                out = [bool(v) for v in buf]
+            else:
+                out = list(buf)
+            if spec.get("mask"):
+                valid = _read_npy(self.dir / f"{name}.valid.npy", self.use_mmap)
+                out = [v if ok else None for v, ok in zip(out, valid)]
+        self._cache[name] = out
+        return out
+
+    def rows(self, columns: Iterable[str] | None = None) -> Iterator[dict]:
+        names = [c for c in (columns or self.columns) if c in self.spec["columns"]]
+        cols = [self.column(c) for c in names]
+        for values in zip(*cols) if cols else ():
+            yield dict(zip(names, values))
+
+
+def read_table(root: Path, table: str = "rows", use_mmap: bool = True) -> ColumnarTable:
+    return ColumnarTable(root, table, use_mmap)
+
+
+def load_columnar_document(root: Path, columns: Iterable[str] | None = None) -> dict:
+    """Rebuild ``{"meta": ..., <table>: [rows]}`` from a columnar directory."""
+    schema = json.loads((Path(root) / SCHEMA_FILE).read_text(encoding="utf-8"))
+    out: dict[str, Any] = {"meta": schema.get("meta", {})}
+    for table in schema["tables"]:
+        out[table] = list(ColumnarTable(root, table).rows(columns))
+    return out
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Dense district x party panel for the cross-year dataset, persisted as mmap-able columns.
+
+Columns are flat ``array`` buffers of length ``n_districts * n_parties`` (row-major, district
+first). Absent cells are NaN for float columns and -1 for int columns. The on-disk form is a
+JSON header plus one raw binary file, so readers can ``load_panel(..., mmap=True)`` or point
+``numpy.memmap`` at the same offsets without parsing crossyear_features.json.
+
+A cell holds one row per year. Further year-66 rows for the same (district, party) cell, e.g.
+two 66 parties merged into one 69 party by the crosswalk, are listed in ``extra66`` as
+``(row ordinal, cell)`` pairs with their values in ``extra66_columns``, so no votes are dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import sys
+from array import array
+from pathlib import Path
+
+NAN = float("nan")
+
+FLOAT_COLUMNS = [
+    "constituency_share_66",
+    "partylist_share_66",
+    "gap_raw_66",
+    "constituency_rank_66",
+    "constituency_share_69",
+    "partylist_share_69",
+    "gap_raw_69",
+    "constituency_rank_69",
+]
+# row ordinals back into rows_66 / rows_69, used to keep row-order semantics
+INT_COLUMNS = ["row66", "row69"]
+EXTRA66_COLUMNS = [name for name in FLOAT_COLUMNS if name.endswith("_66")]
+
+UNMAPPED_PREFIX = "66:"
+
+
+def to_float(v) -> float:
+    return float(v) if isinstance(v, (int, float)) else NAN
+
+
+class Panel:
+    def __init__(
+        self,
+        districts: list[dict],
+        parties: list[dict],
+        columns: dict,
+        extra66: list[tuple[int, int]] | None = None,
+        extra66_columns: dict | None = None,
+    ):
+        self.districts = districts
+        self.parties = parties
+        self.columns = columns
+        self.extra66 = extra66 or []
+        self.extra66_columns = extra66_columns or {name: array("d") for name in EXTRA66_COLUMNS}
+        self.n_districts = len(districts)
+        self.n_parties = len(parties)
+        self.district_id = {d["key"]: i for i, d in enumerate(districts)}
+        self.party_id = {p["key"]: j for j, p in enumerate(parties)}
+
+    def cell(self, district_key: str, party_key: str) -> int | None:
+        i = self.district_id.get(district_key)
+        j = self.party_id.get(party_key)
+        return None if i is None or j is None else i * self.n_parties + j
+
+    def col(self, name: str):
+        return self.columns[name]
+
+    def present(self, year: int) -> list[int]:
+        """Cell indexes that hold a row for the given year, in original row order."""
+        ords = self.columns[f"row{year}"]
+        cells = [c for c in range(len(ords)) if ords[c] >= 0]
+        cells.sort(key=lambda c: ords[c])
+        return cells
+
+    def rows66(self) -> list[tuple[int, int]]:
+        """(row ordinal, cell) for every placed year-66 row, including ``extra66``, in row order."""
+        ords = self.columns["row66"]
+        return sorted([(ords[c], c) for c in range(len(ords)) if ords[c] >= 0] + list(self.extra66))
+
+    def column66(self, name: str) -> list[tuple[int, int, float]]:
+        """(row ordinal, cell, value) of a year-66 float column for every row of ``rows66()``."""
+        col = self.columns[name]
+        ords = self.columns["row66"]
+        out = [(ords[c], c, col[c]) for c in range(len(ords)) if ords[c] >= 0]
+        out += [(o, c, v) for (o, c), v in zip(self.extra66, self.extra66_columns[name])]
+        out.sort(key=lambda t: t[0])
+        return out
+
+    def values(self, name: str, cells: list[int]) -> list[float]:
+        col = self.columns[name]
+        return [col[c] for c in cells if not math.isnan(col[c])]
+
+
+def build_panel(rows66: list[dict], rows69: list[dict], parties69: list[dict]) -> tuple[Panel, int]:
+    """Intern district/party ids and scatter both years into dense columns.
+
+    Year-66 rows without a year-69 party key get a 66-only party id so margins and
+    distributions still see them. The first year-66 row of a cell fills the columns; later
+    ones go to ``panel.extra66``. Returns the panel and the number of those extra rows.
+    """
+    districts: list[dict] = []
+    district_id: dict[str, int] = {}
+    for r in [*rows66, *rows69]:
+        dk = r.get("district_key")
+        if dk and dk not in district_id:
+            district_id[dk] = len(districts)
+            districts.append({"key": dk, "province_name_norm": r.get("province_name_norm"), "district_no": r.get("district_no"), "area_code": None})
+        if dk and r.get("area_code") and not districts[district_id[dk]]["area_code"]:
+            districts[district_id[dk]]["area_code"] = r["area_code"]
+
+    parties: list[dict] = []
+    party_id: dict[str, int] = {}
+    for p in parties69:
+        party_id[p["code"]] = len(parties)
+        parties.append({"key": p["code"], "name": p.get("name"), "no": p.get("number"), "year69": True})
+
+    def party_key(r, year):
+        if year == 69 or r.get("party_key_69"):
+            return r.get("party_key_69")
+        return UNMAPPED_PREFIX + (r.get("party_name_norm") or r.get("party_name_raw") or "")
+
+    for r in rows66:
+        pk = party_key(r, 66)
+        if pk and pk not in party_id:
+            party_id[pk] = len(parties)
+            parties.append({"key": pk, "name": r.get("party_name_raw"), "no": r.get("party_no_raw"), "year69": False})
+
+    n = len(districts) * len(parties)
+    columns = {name: array("d", [NAN]) * n for name in FLOAT_COLUMNS}
+    columns.update({name: array("i", [-1]) * n for name in INT_COLUMNS})
+    width = len(parties)
+    extra66: list[tuple[int, int]] = []
+    extra66_columns = {name: array("d") for name in EXTRA66_COLUMNS}
+
+    for year, rows in ((66, rows66), (69, rows69)):
+        c_share, p_share, gap, rank = (columns[f"{k}_{year}"] for k in ("constituency_share", "partylist_share", "gap_raw", "constituency_rank"))
+        ords = columns[f"row{year}"]
+        for idx, r in enumerate(rows):
+            dk = r.get("district_key")
+            pk = party_key(r, year)
+            if not dk or pk not in party_id:
+                continue
+            c = district_id[dk] * width + party_id[pk]
+            if ords[c] >= 0:
+                if year == 66:
+                    extra66.append((idx, c))
+                    for k in ("constituency_share", "partylist_share", "gap_raw", "constituency_rank"):
+                        extra66_columns[f"{k}_66"].append(to_float(r.get(k)))
+                continue
+            ords[c] = idx
+            c_share[c] = to_float(r.get("constituency_share"))
+            p_share[c] = to_float(r.get("partylist_share"))
+            gap[c] = to_float(r.get("gap_raw"))
+            rank[c] = to_float(r.get("constituency_rank"))
+
+    return Panel(districts, parties, columns, extra66, extra66_columns), len(extra66)
+
+
+def save_panel(panel: Panel, stem: Path) -> tuple[Path, Path]:
+    """Write <stem>.json (header) and <stem>.bin (columns back to back)."""
+    stem.parent.mkdir(parents=True, exist_ok=True)
+    header_path = stem.with_suffix(".json")
+    bin_path = stem.with_suffix(".bin")
+    layout = {}
+    offset = 0
+    with bin_path.open("wb") as f:
+        for name in [*FLOAT_COLUMNS, *INT_COLUMNS]:
+            col = panel.columns[name]
+            col.tofile(f)
+            layout[name] = {"typecode": col.typecode, "itemsize": col.itemsize, "offset": offset, "length": len(col)}
+            offset += col.itemsize * len(col)
+    header = {
+        "version": 1,
+        "byteorder": sys.byteorder,
+        "shape": [panel.n_districts, panel.n_parties],
+        "binary": bin_path.name,
+        "districts": panel.districts,
+        "parties": panel.parties,
+        "columns": layout,
+        "extra66": [list(e) for e in panel.extra66],
+        # NaN is not valid JSON, so absent values are written as null
+        "extra66_columns": {name: [None if math.isnan(v) else v for v in col] for name, col in panel.extra66_columns.items()},
+    }
+    header_path.write_text(json.dumps(header, ensure_ascii=False), encoding="utf-8")
+    return header_path, bin_path
+
+
+def load_panel(stem: Path, columns: list[str] | None = None, use_mmap: bool = True) -> Panel:
+    """Load a saved panel; with use_mmap the columns are zero-copy views on the file."""
+    header = json.loads(stem.with_suffix(".json").read_text(encoding="utf-8"))
+    bin_path = stem.with_suffix(".json").parent / header["binary"]
+    wanted = columns or list(header["columns"])
+    out = {}
+    native = header["byteorder"] == sys.byteorder
+    if use_mmap and native:
+        with bin_path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        for name in wanted:
+            meta = header["columns"][name]
+            start = meta["offset"]
+            out[name] = view[start : start + meta["itemsize"] * meta["length"]].cast(meta["typecode"])
+    else:
+        with bin_path.open("rb") as f:
+            for name in wanted:
+                meta = header["columns"][name]
+                f.seek(meta["offset"])
+                col = array(meta["typecode"])
+                col.fromfile(f, meta["length"])
+                if not native:
+                    col.byteswap()
+                out[name] = col
+    extra66_columns = {name: array("d", [NAN if v is None else v for v in vals]) for name, vals in header.get("extra66_columns", {}).items()}
+    return Panel(header["districts"], header["parties"], out, [tuple(e) for e in header.get("extra66", [])], extra66_columns or None)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""District overlap weights (66 district -> 69 district) as a CSR sparse matrix.
+
+Row i of the matrix is a year-69 target district, column j a year-66 source district, and
+the value the share of the source district's votes that falls inside the target. Votes are
+moved onto year-69 boundaries with one mat-vec per party: ``y = W @ x``.
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+from pathlib import Path
+
+
+def normalize_text(s: str | None) -> str:
+    return "" if s is None else re.sub(r"\s+", "", str(s).strip())
+
+
+class OverlapMatrix:
+    def __init__(self, targets: list[str], sources: list[str], indptr: list[int], indices: list[int], data: list[float]):
+        self.targets = targets
+        self.sources = sources
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.source_id = {k: j for j, k in enumerate(sources)}
+        self.target_id = {k: i for i, k in enumerate(targets)}
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @classmethod
+    def from_triplets(cls, triplets: list[tuple[str, str, float]]) -> "OverlapMatrix":
+        """Build from (source_key, target_key, weight); repeated pairs are summed."""
+        sources: list[str] = []
+        targets: list[str] = []
+        source_id: dict[str, int] = {}
+        target_id: dict[str, int] = {}
+        cells: dict[tuple[int, int], float] = {}
+        for src, dst, w in triplets:
+            if src not in source_id:
+                source_id[src] = len(sources)
+                sources.append(src)
+            if dst not in target_id:
+                target_id[dst] = len(targets)
+                targets.append(dst)
+            key = (target_id[dst], source_id[src])
+            cells[key] = cells.get(key, 0.0) + w
+        by_row: list[list[tuple[int, float]]] = [[] for _ in targets]
+        for (i, j), w in cells.items():
+            by_row[i].append((j, w))
+        indptr = [0]
+        indices: list[int] = []
+        data: list[float] = []
+        for row in by_row:
+            row.sort()
+            indices.extend(j for j, _ in row)
+            data.extend(w for _, w in row)
+            indptr.append(len(indices))
+        return cls(targets, sources, indptr, indices, data)
+
+    def matvec(self, x: list[float]) -> list[float]:
+        """y[i] = sum_j W[i, j] * x[j] over the stored entries of row i."""
+        indptr, indices, data = self.indptr, self.indices, self.data
+        return [sum(data[k] * x[indices[k]] for k in range(indptr[i], indptr[i + 1])) for i in range(len(self.targets))]
+
+    def source_weight_sums(self) -> dict[str, float]:
+        sums = [0.0] * len(self.sources)
+        for j, w in zip(self.indices, self.data):
+            sums[j] += w
+        return {k: sums[j] for j, k in enumerate(self.sources)}
+
+    def redrawn_sources(self) -> list[str]:
+        """Sources whose votes do not all stay in the target with the same key."""
+        moves: list[list[tuple[str, float]]] = [[] for _ in self.sources]
+        for i, dst in enumerate(self.targets):
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                moves[self.indices[k]].append((dst, self.data[k]))
+        return [src for src, m in zip(self.sources, moves) if not (len(m) == 1 and m[0][0] == src and abs(m[0][1] - 1.0) <= 1e-9)]
+
+
+def read_overlap(path: Path) -> list[tuple[str, str, float]]:
+    """CSV with district66_key, district69_key, weight; missing file means no boundary changes."""
+    out = []
+    if not path.exists():
+        return out
+    with path.open("r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            src = normalize_text(r.get("district66_key"))
+            dst = normalize_text(r.get("district69_key"))
+            try:
+                w = float(r.get("weight") or "")
+            except ValueError:
+                continue
+            if src and dst and w > 0:
+                out.append((src, dst, w))
+    return out
+
+
+def overlap_with_identity(triplets: list[tuple[str, str, float]]) -> OverlapMatrix:
+    """Add identity entries for unlisted districts that share a key with a listed target.
+
+    A year-69 district that receives votes from a re-drawn district may also keep its own
+    same-named year-66 district; that district must flow through the matrix too, otherwise
+    the target would mix reallocated and untouched rows.
+    """
+    listed = {src for src, _, _ in triplets}
+    extra = [(dst, dst, 1.0) for dst in dict.fromkeys(dst for _, dst, _ in triplets) if dst not in listed]
+    return OverlapMatrix.from_triplets([*triplets, *extra])
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Grouped statistics over flat value columns: count, mean, std, median and MAD per group.
+
+Rows are given dense group ids (``intern``). One counting-sort scatter then lays each group
+out as a contiguous run of row indexes in input order, so every group is gathered once
+without a per-group dict of lists. Within a run the statistics take a few passes: a sum for
+the mean, a second sum of squared deviations for the std, and sorts for median and MAD.
+Sums are taken in row order, which makes mean and std bit-identical to summing each group's
+list directly (a one-pass sum/sum-of-squares or Welford update would not be). Several grouping schemes over the same column share
+the value buffer and are computed in one call, without re-reading the rows.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Hashable, Iterable
+
+# MAD -> sigma for normally distributed data
+MAD_SCALE = 1.4826
+EPS = 1e-12
+
+
+def intern(keys: Iterable[Hashable]) -> tuple[array, list]:
+    """Dense group ids in first-seen order, plus the distinct keys (id -> key)."""
+    index: dict = {}
+    ids = array("i", (index.setdefault(k, len(index)) for k in keys))
+    return ids, list(index)
+
+
+def _median(sorted_vals: list[float]) -> float:
+    n = len(sorted_vals)
+    if not n:
+        return 0.0
+    mid = n // 2
+    return sorted_vals[mid] if n % 2 else (sorted_vals[mid - 1] + sorted_vals[mid]) / 2
+
+
+def group_runs(ids: array, n_groups: int) -> tuple[array, array]:
+    """Stable counting sort: (row order grouped by id, run start offsets of length n_groups + 1)."""
+    counts = [0] * n_groups
+    for g in ids:
+        counts[g] += 1
+    offsets = array("q", [0]) * (n_groups + 1)
+    for g in range(n_groups):
+        offsets[g + 1] = offsets[g] + counts[g]
+    pos = list(offsets[:-1])
+    order = array("q", [0]) * len(ids)
+    for i, g in enumerate(ids):
+        order[pos[g]] = i
+        pos[g] += 1
+    return order, offsets
+
+
+class GroupedStats:
+    """Per-group statistics for one grouping scheme; arrays are indexed by group id."""
+
+    def __init__(self, keys: list, ids: array, count: array, mean: array, std: array, median: array, mad: array):
+        self.keys = keys
+        self.ids = ids
+        self.count = count
+        self.mean = mean
+        self.std = std
+        self.median = median
+        self.mad = mad
+
+    def center_scale(self, robust: bool = False) -> tuple[array, array]:
+        if robust:
+            return self.median, array("d", (MAD_SCALE * m for m in self.mad))
+        return self.mean, self.std
+
+    def residuals(self, values, robust: bool = False) -> array:
+        center, _ = self.center_scale(robust)
+        return array("d", (v - center[g] for v, g in zip(values, self.ids)))
+
+    def zscores(self, values, robust: bool = False) -> array:
+        """(value - center) / scale per row; 0.0 where the group's scale is ~0."""
+        center, scale = self.center_scale(robust)
+        return array("d", ((v - center[g]) / scale[g] if scale[g] > EPS else 0.0 for v, g in zip(values, self.ids)))
+
+    def table(self, key_fields: list[str]) -> list[dict]:
+        out = []
+        for g, key in enumerate(self.keys):
+            key = key if isinstance(key, tuple) else (key,)
+            out.append(
+                {
+                    **dict(zip(key_fields, key)),
+                    "rows": self.count[g],
+                    "mean": self.mean[g],
+                    "std": self.std[g],
+                    "median": self.median[g],
+                    "mad": self.mad[g],
+                }
+            )
+        return out
+
+
+def grouped_stats(values, ids: array, keys: list) -> GroupedStats:
+    """Count / mean / population std / median / MAD of ``values`` for every group.
+
+    Each group's run is gathered once from the counting sort; the mean and the std are then
+    two-pass (mean first, squared deviations second) and median / MAD come from two sorts.
+    """
+    n_groups = len(keys)
+    order, offsets = group_runs(ids, n_groups)
+    count = array("q", [0]) * n_groups
+    mean = array("d", [0.0]) * n_groups
+    std = array("d", [0.0]) * n_groups
+    median = array("d", [0.0]) * n_groups
+    mad = array("d", [0.0]) * n_groups
+    for g in range(n_groups):
+        run = [values[i] for i in order[offsets[g] : offsets[g + 1]]]
+        if not run:
+            continue
+        n = len(run)
+        m = sum(run) / n
+        med = _median(sorted(run))
+        count[g] = n
+        mean[g] = m
+        std[g] = (sum((x - m) ** 2 for x in run) / n) ** 0.5
+        median[g] = med
+        mad[g] = _median(sorted(abs(x - med) for x in run))
+    return GroupedStats(keys, ids, count, mean, std, median, mad)
+
+
+def multi_grouped_stats(values, schemes: dict[str, Iterable[Hashable]]) -> dict[str, GroupedStats]:
+    """Stats for several grouping schemes over the same value column: {name: per-row keys}."""
+    values = values if isinstance(values, array) else array("d", (math.nan if v is None else v for v in values))
+    out = {}
+    for name, keys in schemes.items():
+        ids, distinct = intern(keys)
+        out[name] = grouped_stats(values, ids, distinct)
+    return out
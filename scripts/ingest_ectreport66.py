@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Ingest every sheet of ectreport66.xlsx into one indexed SQLite database.
+
+Each worker process streams whole sheets with ``iterparse`` (largest first) and hands typed
+rows to the single writer in fixed-size batches over a bounded queue, so memory stays at
+about ``--jobs`` x ``--batch-size`` rows whatever the sheet size. Column types come from
+the workbook's ``Schema`` sheet; keys and foreign keys come from ``TABLES`` below. A derived
+``constituency`` table (one row per ``cons_id``) is the parent for constituency foreign keys,
+since ``info_constituency`` has one row per administrative zone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+import sqlite3
+import time
+import traceback
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+from normalize_election66 import NS_MAIN, NS_PKG_REL, NS_REL, col_to_idx
+
+SCHEMA_SHEET = "Schema"
+# sheet -> primary key, foreign keys {column: (table, column)}, extra indexed columns
+TABLES = {
+    "info_province": {"pk": ["prov_id"], "fk": {}},
+    "info_party_overview": {"pk": ["id"], "fk": {}, "unique": ["party_no"]},
+    "info_constituency": {"pk": ["cons_id", "zone"], "fk": {"cons_id": ("constituency", "cons_id"), "prov_id": ("info_province", "prov_id")}},
+    "result_constituencies_status": {
+        "pk": ["cons_id"],
+        "fk": {"cons_id": ("constituency", "cons_id"), "prov_id": ("info_province", "prov_id")},
+    },
+    "result_constituencies_PartyList": {
+        "pk": ["cons_id", "party_id"],
+        "fk": {"cons_id": ("constituency", "cons_id"), "party_id": ("info_party_overview", "id")},
+    },
+    "result_constituencies_Candidate": {
+        "pk": ["mp_app_id"],
+        "fk": {
+            "cons_id": ("constituency", "cons_id"),
+            "party_id": ("info_party_overview", "id"),
+            "mp_app_id": ("Candidate_Constituency", "mp_app_id"),
+        },
+    },
+    "Candidate_Constituency": {"pk": ["mp_app_id"], "fk": {"mp_app_party_id": ("info_party_overview", "id")}},
+    "Candidate_PartyList": {"pk": ["party_no", "list_no"], "fk": {"party_no": ("info_party_overview", "party_no")}},
+    "Candidate_PM": {"pk": ["party_no", "name"], "fk": {"party_no": ("info_party_overview", "party_no")}},
+}
+SQL_TYPES = {"string": "TEXT", "number": "NUMERIC", "boolean": "INTEGER", "array": "TEXT"}
+# Excel stores ids typed as text in the sheets as floats ("701.0")
+FLOAT_INT = re.compile(r"-?\d+\.0+")
+
+DERIVED_SQL = """
+CREATE TABLE constituency (
+    cons_id TEXT PRIMARY KEY,
+    cons_no NUMERIC,
+    prov_id TEXT REFERENCES info_province(prov_id),
+    registered_vote NUMERIC,
+    total_vote_stations NUMERIC,
+    zone_count INTEGER
+);
+INSERT INTO constituency
+SELECT cons_id, MIN(cons_no), MIN(prov_id), MAX(registered_vote), MAX(total_vote_stations), COUNT(zone)
+FROM info_constituency GROUP BY cons_id;
+"""
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sheet_targets(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Sheet name -> worksheet part path, in workbook order."""
+    ns = {"x": NS_MAIN}
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    rel_map = {r.attrib.get("Id"): r.attrib.get("Target") for r in rels.findall(f"{{{NS_PKG_REL}}}Relationship")}
+    out = {}
+    for s in wb.findall("x:sheets/x:sheet", ns):
+        target = rel_map.get(s.attrib.get(f"{{{NS_REL}}}id"))
+        if target:
+            out[s.attrib["name"]] = target.lstrip("/") if target.startswith("/xl/") else "xl/" + target
+    return out
+
+
+def read_shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    out = []
+    si_tag, t_tag = f"{{{NS_MAIN}}}si", f"{{{NS_MAIN}}}t"
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == si_tag:
+                out.append("".join(t.text or "" for t in elem.iter(t_tag)))
+                elem.clear()
+    return out
+
+
+def iter_sheet_rows(zf: zipfile.ZipFile, part: str, shared: list[str]):
+    """Yield each worksheet row as a list of cell strings, clearing parsed rows as it goes."""
+    row_tag, c_tag = f"{{{NS_MAIN}}}row", f"{{{NS_MAIN}}}c"
+    v_tag, is_tag, t_tag = f"{{{NS_MAIN}}}v", f"{{{NS_MAIN}}}is", f"{{{NS_MAIN}}}t"
+    with zf.open(part) as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != row_tag:
+                continue
+            values: dict[int, str] = {}
+            for c in elem.iter(c_tag):
+                ctype = c.attrib.get("t")
+                if ctype == "inlineStr":
+                    node = c.find(is_tag)
+                    value = "".join(t.text or "" for t in node.iter(t_tag)) if node is not None else ""
+                else:
+                    v = c.find(v_tag)
+                    raw = (v.text or "") if v is not None else ""
+                    value = shared[int(raw)] if ctype == "s" and raw else raw
+                values[col_to_idx(c.attrib.get("r", ""))] = value
+            elem.clear()
+            if values:
+                yield [values.get(i, "") for i in range(max(values) + 1)]
+
+
+def read_schema(zf: zipfile.ZipFile, part: str, shared: list[str]) -> dict[str, dict[str, str]]:
+    """Schema sheet -> {sheet: {column: "string" | "number" | "boolean" | "array"}}."""
+    out: dict[str, dict[str, str]] = {}
+    rows = iter_sheet_rows(zf, part, shared)
+    header = [h.strip() for h in next(rows, [])]
+    for row in rows:
+        rec = dict(zip(header, row))
+        sheet, column, dtype = (rec.get(k, "").strip() for k in ("Sheet", "Column", "Data Type"))
+        if sheet and column:
+            out.setdefault(sheet, {})[column] = "array" if dtype.lower().startswith("array") else dtype.lower()
+    return out
+
+
+def schema_for_sheet(schema: dict[str, dict[str, str]], sheet: str) -> dict[str, str]:
+    """The Schema sheet names some sheets with a suffix ("..._CandidateConst"); match by prefix."""
+    if sheet in schema:
+        return schema[sheet]
+    hits = [name for name in schema if name.startswith(sheet)]
+    return schema[hits[0]] if len(hits) == 1 else {}
+
+
+def column_types(sheet: str, header: list[str], schema: dict[str, dict[str, str]]) -> tuple[dict[str, str], list[str]]:
+    """Resolve each column's type; returns the types and the columns the Schema sheet did not cover."""
+    declared = schema_for_sheet(schema, sheet)
+    types, missing = {}, []
+    for col in header:
+        if col in declared:
+            types[col] = declared[col]
+        else:
+            missing.append(col)
+            types[col] = "number" if re.search(r"(_no|_vote|_rank|_percent)$", col) else "string"
+    # a foreign key takes its parent's type so the join compares like with like
+    for col, (table, parent_col) in TABLES.get(sheet, {}).get("fk", {}).items():
+        parent = schema_for_sheet(schema, table).get(parent_col)
+        if col in types and parent:
+            types[col] = parent
+    return types, missing
+
+
+def cast(value: str, dtype: str):
+    s = value.strip()
+    if not s:
+        return None
+    if dtype == "number":
+        try:
+            x = float(s)
+        except ValueError:
+            return s
+        return int(x) if x.is_integer() else x
+    if dtype == "boolean":
+        return 1 if s.lower() in ("1", "true", "1.0") else 0
+    if FLOAT_INT.fullmatch(s):
+        return s.split(".", 1)[0]
+    return s
+
+
+def sheet_worker(xlsx: str, targets: dict[str, str], shared: list[str], schema: dict, tasks, results, batch_size: int) -> None:
+    """Worker loop: take sheet names off ``tasks`` until a None sentinel, stream each one."""
+    with zipfile.ZipFile(xlsx) as zf:
+        while True:
+            sheet = tasks.get()
+            if sheet is None:
+                return
+            try:
+                rows = iter_sheet_rows(zf, targets[sheet], shared)
+                header = [h.strip() for h in next(rows, [])]
+                while header and not header[-1]:
+                    header.pop()
+                types, missing = column_types(sheet, header, schema)
+                results.put(("header", sheet, {"columns": header, "types": types, "missing_from_schema": missing}))
+                casters = [types[c] for c in header]
+                batch, count = [], 0
+                for row in rows:
+                    if not any(v.strip() for v in row[: len(header)]):
+                        continue
+                    row = row[: len(header)] + [""] * (len(header) - len(row))
+                    batch.append(tuple(cast(v, t) for v, t in zip(row, casters)))
+                    if len(batch) >= batch_size:
+                        results.put(("rows", sheet, batch))
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    results.put(("rows", sheet, batch))
+                    count += len(batch)
+                results.put(("done", sheet, count))
+            except Exception:
+                results.put(("error", sheet, traceback.format_exc()))
+
+
+def create_table_sql(sheet: str, columns: list[str], types: dict[str, str]) -> str:
+    spec = TABLES.get(sheet, {"pk": [], "fk": {}})
+    lines = [f"{quote(c)} {SQL_TYPES.get(types[c], 'TEXT')}" for c in columns]
+    pk = [c for c in spec["pk"] if c in columns]
+    if pk:
+        lines.append(f"PRIMARY KEY ({', '.join(quote(c) for c in pk)})")
+    for col, (table, parent_col) in spec["fk"].items():
+        if col in columns:
+            lines.append(f"FOREIGN KEY ({quote(col)}) REFERENCES {quote(table)}({quote(parent_col)})")
+    return f"CREATE TABLE {quote(sheet)} (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+def index_sql(sheet: str, columns: list[str]) -> list[str]:
+    spec = TABLES.get(sheet, {"pk": [], "fk": {}})
+    out = []
+    for col in spec.get("unique", []):
+        if col in columns:
+            out.append(f"CREATE UNIQUE INDEX {quote(f'ux_{sheet}_{col}')} ON {quote(sheet)}({quote(col)})")
+    pk_lead = spec["pk"][0] if spec["pk"] else None
+    for col in spec["fk"]:
+        # the leading primary-key column is already indexed by the key itself
+        if col in columns and col != pk_lead:
+            out.append(f"CREATE INDEX {quote(f'ix_{sheet}_{col}')} ON {quote(sheet)}({quote(col)})")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Ingest all sheets of ectreport66.xlsx into an indexed SQLite database")
+    ap.add_argument("--input", default="ectreport66.xlsx")
+    ap.add_argument("--out", default="data/ect66.sqlite")
+    ap.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--batch-size", type=int, default=2000)
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("workbook")
+    xlsx = Path(args.input)
+    with zipfile.ZipFile(xlsx) as zf:
+        targets = sheet_targets(zf)
+        sizes = {name: zf.getinfo(part).file_size for name, part in targets.items()}
+        shared = read_shared_strings(zf)
+        schema = read_schema(zf, targets[SCHEMA_SHEET], shared) if SCHEMA_SHEET in targets else {}
+    sheets = sorted((s for s in targets if s != SCHEMA_SHEET), key=lambda s: -sizes[s])
+
+    inst.phase("ingest")
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp_path)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+    jobs = max(1, min(args.jobs, len(sheets)))
+    tasks = ctx.Queue()
+    for s in sheets:
+        tasks.put(s)
+    for _ in range(jobs):
+        tasks.put(None)
+    results = ctx.Queue(maxsize=jobs * 2)
+    workers = [
+        ctx.Process(target=sheet_worker, args=(str(xlsx), targets, shared, schema, tasks, results, args.batch_size), daemon=True)
+        for _ in range(jobs)
+    ]
+    for w in workers:
+        w.start()
+
+    report: dict[str, dict] = {}
+    insert_sql: dict[str, str] = {}
+    pending = set(sheets)
+    errors = {}
+    t0 = time.perf_counter()
+    with con:
+        while pending:
+            try:
+                kind, sheet, payload = results.get(timeout=5)
+            except queue.Empty:
+                if not any(w.is_alive() for w in workers):
+                    raise RuntimeError(f"workers exited with sheets pending: {sorted(pending)}")
+                continue
+            if kind == "header":
+                cols = payload["columns"]
+                con.execute(create_table_sql(sheet, cols, payload["types"]))
+                insert_sql[sheet] = f"INSERT OR IGNORE INTO {quote(sheet)} VALUES ({', '.join('?' for _ in cols)})"
+                report[sheet] = {**payload, "rows_read": 0, "rows_inserted": 0}
+            elif kind == "rows":
+                before = con.total_changes
+                con.executemany(insert_sql[sheet], payload)
+                report[sheet]["rows_read"] += len(payload)
+                report[sheet]["rows_inserted"] += con.total_changes - before
+            elif kind == "done":
+                report[sheet]["seconds"] = round(time.perf_counter() - t0, 3)
+                pending.discard(sheet)
+            else:
+                errors[sheet] = payload
+                pending.discard(sheet)
+    for w in workers:
+        w.join()
+    if errors:
+        con.close()
+        tmp_path.unlink(missing_ok=True)
+        for sheet, tb in errors.items():
+            print(f"[error] {sheet}\n{tb}")
+        return 1
+
+    inst.phase("indexes")
+    con.executescript(DERIVED_SQL)
+    for sheet in sheets:
+        for sql in index_sql(sheet, report[sheet]["columns"]):
+            con.execute(sql)
+    fk_violations: dict[str, int] = {}
+    for table, _, _, _ in con.execute("PRAGMA foreign_key_check"):
+        fk_violations[table] = fk_violations.get(table, 0) + 1
+    for sheet, r in report.items():
+        r["duplicate_keys_skipped"] = r["rows_read"] - r["rows_inserted"]
+    meta = {
+        "source": str(xlsx),
+        "sheets": sheets,
+        "tables": report,
+        "constituency_rows": con.execute("SELECT COUNT(*) FROM constituency").fetchone()[0],
+        "foreign_key_violations": fk_violations,
+    }
+    con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    con.execute("INSERT INTO meta VALUES ('ingest', ?)", (json.dumps(meta, ensure_ascii=False),))
+    con.execute("ANALYZE")
+    con.commit()
+    con.close()
+    os.replace(tmp_path, out_path)
+    inst.stop()
+
+    print(f"wrote {out_path}")
+    for sheet in sheets:
+        r = report[sheet]
+        extra = f" duplicates={r['duplicate_keys_skipped']}" if r["duplicate_keys_skipped"] else ""
+        print(f"  {sheet}: rows={r['rows_inserted']}{extra}")
+    if fk_violations:
+        print(f"  foreign key violations: {fk_violations}")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
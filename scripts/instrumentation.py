@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Lightweight timing / peak-memory spans for pipeline scripts."""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def add_instrumentation_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--profile", default=None, help="Write a cProfile .prof file (snakeviz / flameprof compatible)")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Track per-span tracemalloc peaks (accurate but slows pure-Python loops ~10x)",
+    )
+
+
+def max_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def timings_path(data_path: Path) -> Path:
+    data_path = Path(data_path)
+    return data_path.with_name(f"{data_path.stem}.timings.json")
+
+
+class Instrumentation:
+    """Record wall time, CPU time and memory per named span.
+
+    Process max RSS is always recorded (cheap); tracemalloc peaks only with trace_memory.
+    Spans nest and a parent's peak includes the peaks of its children. ``phase()`` is a
+    sequential shorthand for long scripts: it closes the previous phase and opens the next.
+    """
+
+    def __init__(self, trace_memory: bool = False, profile_path: str | None = None):
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.spans: list[dict[str, Any]] = []
+        self._stack: list[dict[str, Any]] = []
+        self._phase_cm = None
+        self._profiler = None
+        self._t0 = time.perf_counter()
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "Instrumentation":
+        return cls(trace_memory=getattr(args, "trace_memory", False), profile_path=getattr(args, "profile", None))
+
+    def start(self) -> "Instrumentation":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self) -> None:
+        self.end_phase()
+        if self._profiler is not None:
+            self._profiler.disable()
+            Path(self.profile_path).parent.mkdir(parents=True, exist_ok=True)
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def span(self, name: str):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+        frame = {"name": name, "peak": 0, "depth": len(self._stack)}
+        self._stack.append(frame)
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.process_time() - cpu0
+            peak = max(tracemalloc.get_traced_memory()[1], frame["peak"]) if tracing else None
+            self._stack.pop()
+            if tracing and self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            self.spans.append(
+                {
+                    "name": name,
+                    "depth": frame["depth"],
+                    "wallSeconds": wall,
+                    "cpuSeconds": cpu,
+                    "peakMemoryBytes": peak,
+                    "maxRssBytes": max_rss_bytes(),
+                }
+            )
+
+    def phase(self, name: str) -> None:
+        self.end_phase()
+        self._phase_cm = self.span(name)
+        self._phase_cm.__enter__()
+
+    def end_phase(self) -> None:
+        if self._phase_cm is not None:
+            cm, self._phase_cm = self._phase_cm, None
+            cm.__exit__(None, None, None)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "totalWallSeconds": time.perf_counter() - self._t0,
+            "traceMemory": self.trace_memory,
+            "profileFile": self.profile_path,
+            "spans": self.spans,
+        }
+
+    def write_sidecar(self, data_path: Path, extra: dict[str, Any] | None = None) -> Path:
+        """Write ``report()`` (plus any run-dependent ``extra`` fields) next to a data output as ``<stem>.timings.json``.
+
+        Timings change on every run, so they never go into data files that later stages hash.
+        """
+        path = timings_path(data_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({**self.report(), **(extra or {})}, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def print_summary(self) -> None:
+        for s in self.spans:
+            if s["peakMemoryBytes"] is not None:
+                mem = f" peak={s['peakMemoryBytes'] / 1e6:.1f}MB"
+            elif s["maxRssBytes"] is not None:
+                mem = f" maxrss={s['maxRssBytes'] / 1e6:.1f}MB"
+            else:
+                mem = ""
+            print(f"  {'  ' * s['depth']}{s['name']}: wall={s['wallSeconds']:.3f}s cpu={s['cpuSeconds']:.3f}s{mem}")
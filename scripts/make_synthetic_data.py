@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""Generate synthetic election inputs in the exact shapes the pipeline reads.
+
+Writes common-data.json, party-data.json, candidate-data.json, summary.json,
+area-constituency/AREA-*.json, area-candidates/AREA-*.json, election-66.xlsx,
+ectreport66.xlsx (the ECT report workbook, one sheet per table) and the config/ + hypothesis.md files into --out-dir, scaled to N areas and M parties.
+With --snapshots K > 1, earlier vote-count snapshots are written under
+snapshots/SNAP-<k>/ (the live directories hold the final snapshot).
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import random
+import shutil
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+REGIONS = ["bangkok", "central", "north", "northeast", "east", "south"]
+NAME_SYLLABLES = ["ไทย", "รัก", "ชาติ", "พลัง", "ประชา", "ธรรม", "เสรี", "ก้าว", "ใหม่", "สังคม", "เพื่อ", "รวม", "ภูมิ", "กล้า", "ชน"]
+FIRST_NAMES = ["สมชาย", "สมหญิง", "ลลิดา", "ปารเมศ", "จรยุทธ", "มงคล", "แทนคุณ", "วิชัย", "สุดา", "ประเสริฐ"]
+LAST_NAMES = ["ใจดี", "รักไทย", "เพริศวิวัฒนา", "วิทยารักษ์สรรค์", "เสมอภาพ", "จิตต์อิสระ", "ศรีสุข", "บุญมา"]
+
+
+def party_name(i: int) -> str:
+    a = NAME_SYLLABLES[i % len(NAME_SYLLABLES)]
+    b = NAME_SYLLABLES[(i // len(NAME_SYLLABLES) + 3) % len(NAME_SYLLABLES)]
+    return f"{a}{b}{i}"
+
+
+def pct(part: int, total: int) -> float:
+    return round(100.0 * part / total, 2) if total else 0.0
+
+
+def split_votes(rng: random.Random, total: int, weights: list[float]) -> list[int]:
+    s = sum(weights) or 1.0
+    votes = [int(total * w / s) for w in weights]
+    votes[0] += total - sum(votes)
+    return votes
+
+
+def ranked_entries(items: list[dict], good: int) -> list[dict]:
+    items.sort(key=lambda e: -e["voteTotal"])
+    for rank, e in enumerate(items, start=1):
+        e["rank"] = rank
+        e["votePercent"] = pct(e["voteTotal"], good)
+    return items
+
+
+def write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def col_name(idx: int) -> str:
+    out = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        out = chr(ord("A") + rem) + out
+    return out
+
+
+def sheet_xml(rows: list[list]) -> str:
+    parts = []
+    for r_idx, row in enumerate(rows, start=1):
+        cells = []
+        for c_idx, v in enumerate(row):
+            ref = f"{col_name(c_idx)}{r_idx}"
+            if isinstance(v, (int, float)):
+                cells.append(f'<c r="{ref}"><v>{v}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(v))}</t></is></c>')
+        parts.append(f'<row r="{r_idx}">{"".join(cells)}</row>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f"<sheetData>{''.join(parts)}</sheetData></worksheet>"
+    )
+
+
+def write_workbook(path: Path, sheets: dict[str, list[list]]) -> None:
+    """Minimal xlsx with one worksheet per entry of ``sheets`` (in order), inline strings only."""
+    names = list(sheets)
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+        + "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>' for i, name in enumerate(names, start=1))
+        + "</sheets></workbook>"
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(
+            f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(names) + 1)
+        )
+        + "</Relationships>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(names) + 1)
+        )
+        + "</Types>"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", content_types)
+        zf.writestr("xl/workbook.xml", workbook)
+        zf.writestr("xl/_rels/workbook.xml.rels", rels)
+        for i, name in enumerate(names, start=1):
+            zf.writestr(f"xl/worksheets/sheet{i}.xml", sheet_xml(sheets[name]))
+
+
+def write_xlsx(path: Path, rows: list[list], sheet_name: str = "Sheet1") -> None:
+    """Minimal single-sheet xlsx with inline strings, readable by normalize_election66."""
+    write_workbook(path, {sheet_name: rows})
+
+
+# ectreport66.xlsx sheets and their Schema-sheet types, as far as ingest_ectreport66 and
+# build_candidate_history read them
+ECT_SHEETS = {
+    "info_province": {"province_id": "string", "prov_id": "string", "province": "string", "total_registered_vote": "number", "total_vote_stations": "number"},
+    "info_party_overview": {"id": "number", "party_no": "number", "name": "string", "abbr": "string", "color": "string"},
+    "info_constituency": {"cons_id": "string", "cons_no": "number", "prov_id": "string", "registered_vote": "number", "total_vote_stations": "number", "zone": "Array[string]"},
+    "Candidate_Constituency": {"mp_app_id": "string", "mp_app_name": "string", "mp_app_no": "number", "mp_app_party_id": "string"},
+    "result_constituencies_status": {"prov_id": "string", "cons_id": "string", "turn_out": "number", "percent_turn_out": "number", "counted_vote_stations": "number", "percent_count": "number", "pause_report": "boolean"},
+    "result_constituencies_Candidate": {"cons_id": "string", "mp_app_id": "string", "mp_app_rank": "number", "mp_app_vote": "number", "mp_app_vote_percent": "number", "party_id": "number"},
+    "result_constituencies_PartyList": {"cons_id": "string", "party_id": "number", "party_list_vote": "number", "party_list_vote_percent": "number"},
+}
+
+
+def generate(out_dir: Path, areas: int = 400, parties: int = 60, snapshots: int = 1, seed: int = 69, candidates_per_area: int = 9) -> dict:
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for sub in ("area-constituency", "area-candidates", "snapshots"):
+        shutil.rmtree(out_dir / sub, ignore_errors=True)
+
+    n_prov = max(1, round(areas * 77 / 400))
+    provinces = [
+        {"code": f"PROVINCE-{10 + i}", "regionCode": REGIONS[i % len(REGIONS)], "name": f"จังหวัด{party_name(i)}"}
+        for i in range(n_prov)
+    ]
+    party_rows = [
+        {
+            "code": f"PARTY-{i:04d}",
+            "number": i,
+            "name": party_name(i),
+            "nameEn": f"Party {i}",
+            "colorPrimary": f"#{rng.randrange(0x1000000):06X}",
+        }
+        for i in range(1, parties + 1)
+    ]
+    party_by_code = {p["code"]: p for p in party_rows}
+    prov_by_code = {p["code"]: p for p in provinces}
+    # a few large parties take most of the vote, like the real data
+    strength = {p["code"]: (rng.uniform(5, 30) if i < 6 else rng.uniform(0.05, 2.0)) for i, p in enumerate(party_rows)}
+
+    area_rows = []
+    prov_area_no: dict[str, int] = {}
+    for i in range(areas):
+        prov = provinces[i % n_prov]
+        no = prov_area_no.get(prov["code"], 0) + 1
+        prov_area_no[prov["code"]] = no
+        area_rows.append(
+            {
+                "code": f"AREA-{1001 + i:04d}",
+                "provinceCode": prov["code"],
+                "areaCode": f"{no:02d}",
+                "number": no,
+                "name": f"{prov['name']} เขต {no}",
+                "win66PartyCode": rng.choice(party_rows[:6])["code"],
+            }
+        )
+    region_areas = {r: 0 for r in REGIONS}
+    for a in area_rows:
+        region_areas[prov_by_code[a["provinceCode"]]["regionCode"]] += 1
+    regions = [{"code": r, "name": r, "totalAreas": n} for r, n in region_areas.items()]
+    common = {"regions": regions, "provinces": provinces, "areas": area_rows, "resultSourceTypeInfos": [{"code": "latest", "name": "ล่าสุด", "description": "synthetic"}]}
+
+    candidates = []
+    const_payloads = {}
+    plist_payloads = {}
+    xlsx_rows = [["", "province_name", "mp_app_id", "cons_id", "no", "party_id", "party_no", "party_name", "party_list_vote", "zone_vote", "mp_app_rank"]]
+    party_list_totals = {p["code"]: 0 for p in party_rows}
+    const_totals = {p["code"]: 0 for p in party_rows}
+    seats = {p["code"]: 0 for p in party_rows}
+    stat_pl = {"total": 0, "good": 0, "bad": 0, "no": 0}
+    stat_c = {"total": 0, "good": 0, "bad": 0, "no": 0}
+    xlsx_idx = 0
+    # a separate stream, so adding the ECT workbook leaves every other output unchanged
+    rng66 = random.Random(seed + 66)
+    ect = {sheet: [list(cols)] for sheet, cols in ECT_SHEETS.items()}
+    ect["info_province"] += [[str(10 + i), p["code"], p["name"], 0, 0] for i, p in enumerate(provinces)]
+    ect["info_party_overview"] += [[float(700 + p["number"]), float(p["number"]), p["name"], p["nameEn"], p["colorPrimary"]] for p in party_rows]
+
+    for a in area_rows:
+        code = a["code"]
+        prov = prov_by_code[a["provinceCode"]]
+        k = min(candidates_per_area, parties)
+        cand_parties = rng.sample(party_rows, k)
+        numbers = list(range(1, k + 1))
+        rng.shuffle(numbers)
+        area_cands = []
+        for p, no in zip(cand_parties, numbers):
+            c = {
+                "code": f"CANDIDATE-MP-{code[5:]}{no:02d}",
+                "areaCode": code,
+                "partyCode": p["code"],
+                "number": no,
+                "prefix": rng.choice(["นาย", "นาง", "นางสาว"]),
+                "specialPrefix": "",
+                "firstName": rng.choice(FIRST_NAMES),
+                "lastName": rng.choice(LAST_NAMES),
+                "is66Winner": rng.random() < 0.1,
+                "party66RefCode": str(rng.randrange(1, 70)) if rng.random() < 0.5 else None,
+                "switchedParty": (rng.random() < 0.3) if rng.random() < 0.5 else None,
+            }
+            candidates.append(c)
+            area_cands.append(c)
+
+        total = rng.randrange(60000, 110000)
+        bad = int(total * rng.uniform(0.01, 0.05))
+        novote = int(total * rng.uniform(0.01, 0.05))
+        good = total - bad - novote
+        c_votes = split_votes(rng, good, [strength[c["partyCode"]] * rng.uniform(0.3, 1.7) for c in area_cands])
+        const_entries = ranked_entries(
+            [{"candidateCode": c["code"], "partyCode": c["partyCode"], "voteTotal": v} for c, v in zip(area_cands, c_votes)],
+            good,
+        )
+        seats[const_entries[0]["partyCode"]] += 1
+        for e in const_entries:
+            const_totals[e["partyCode"]] += e["voteTotal"]
+        const_payloads[code] = {
+            "lastUpdatedAt": "2026-02-09T07:33:48.604Z",
+            "sourceType": "synthetic",
+            "areaCode": code,
+            "win66PartyCode": a["win66PartyCode"],
+            "voteProgressExists": True,
+            "voteProgressPercent": 100,
+            "goodVotes": good,
+            "goodVotePercent": pct(good, total),
+            "badVotes": bad,
+            "badVotePercent": pct(bad, total),
+            "noVotes": novote,
+            "noVotePercent": pct(novote, total),
+            "totalVotes": total,
+            "totalEligibleVoters": int(total * 1.5),
+            "totalStations": rng.randrange(150, 300),
+            "stationsReported": 0,
+            "entries": const_entries,
+        }
+        for key, val in (("total", total), ("good", good), ("bad", bad), ("no", novote)):
+            stat_c[key] += val
+
+        p_total = int(total * rng.uniform(0.93, 1.0))
+        p_bad = int(p_total * rng.uniform(0.02, 0.05))
+        p_no = int(p_total * rng.uniform(0.01, 0.04))
+        p_good = p_total - p_bad - p_no
+        p_votes = split_votes(rng, p_good, [strength[p["code"]] * rng.uniform(0.5, 1.5) for p in party_rows])
+        plist_entries = ranked_entries([{"partyCode": p["code"], "voteTotal": v} for p, v in zip(party_rows, p_votes)], p_good)
+        for e in plist_entries:
+            party_list_totals[e["partyCode"]] += e["voteTotal"]
+        plist_payloads[code] = {
+            "sourceType": "synthetic",
+            "areaCode": code,
+            "voteProgressExists": True,
+            "voteProgressPercent": 100,
+            "goodVotes": p_good,
+            "goodVotePercent": pct(p_good, p_total),
+            "badVotes": p_bad,
+            "badVotePercent": pct(p_bad, p_total),
+            "noVotes": p_no,
+            "noVotePercent": pct(p_no, p_total),
+            "totalVotes": p_total,
+            "entries": plist_entries,
+        }
+        for key, val in (("total", p_total), ("good", p_good), ("bad", p_bad), ("no", p_no)):
+            stat_pl[key] += val
+
+        # year-66 rows for the same district, most parties keep their names
+        by_party_pl = {e["partyCode"]: e["voteTotal"] for e in plist_entries}
+        cand_by_code = {c["code"]: c for c in area_cands}
+        cons_id = f"{prov['code']}_{a['number']}"
+        stations = const_payloads[code]["totalStations"]
+        ect["info_constituency"].append([cons_id, float(a["number"]), prov["code"], float(int(total * 1.5)), float(stations), f'["อำเภอ{a["number"]}"]'])
+        ect["result_constituencies_status"].append([prov["code"], cons_id, float(total), 66.66667, float(stations), 100.0, 0])
+        for rank, e in enumerate(const_entries, start=1):
+            p = party_by_code[e["partyCode"]]
+            name66 = p["name"] if rng.random() < 0.8 else f"{p['name']}เดิม"
+            xlsx_idx += 1
+            xlsx_rows.append(
+                [
+                    str(xlsx_idx),
+                    prov["name"],
+                    f"{prov['code']}_{a['number']}_{rank}",
+                    f"{prov['code']}_{a['number']}",
+                    float(rank),
+                    str(700 + p["number"]),
+                    float(p["number"]),
+                    name66,
+                    float(int(by_party_pl.get(p["code"], 0) * rng.uniform(0.7, 1.3))),
+                    float(int(e["voteTotal"] * rng.uniform(0.7, 1.3))),
+                    float(rank),
+                ]
+            )
+            # most year-69 candidates ran in the same district in 66
+            c = cand_by_code[e["candidateCode"]]
+            if rng66.random() < 0.6:
+                cand_name = f"{c['prefix']}{c['firstName']} {c['lastName']}"
+            else:
+                cand_name = f"{rng66.choice(['นาย', 'นาง'])}{rng66.choice(FIRST_NAMES)} {rng66.choice(LAST_NAMES)}"
+            mp_app_id, pl_vote, zone_vote = xlsx_rows[-1][2], xlsx_rows[-1][8], xlsx_rows[-1][9]
+            ect["Candidate_Constituency"].append([mp_app_id, cand_name, float(rank), float(700 + p["number"])])
+            ect["result_constituencies_Candidate"].append([cons_id, mp_app_id, float(rank), zone_vote, round(100 * zone_vote / total, 5), float(700 + p["number"])])
+            ect["result_constituencies_PartyList"].append([cons_id, float(700 + p["number"]), pl_vote, round(100 * pl_vote / total, 5)])
+
+    for code, payload in const_payloads.items():
+        write_json(out_dir / "area-constituency" / f"{code}.json", payload)
+    for code, payload in plist_payloads.items():
+        write_json(out_dir / "area-candidates" / f"{code}.json", payload)
+
+    # earlier snapshots: same shape, scaled-down counts and progress
+    for k in range(1, snapshots):
+        frac = k / snapshots
+        snap_dir = out_dir / "snapshots" / f"SNAP-{k:03d}"
+        for sub, payloads in (("area-constituency", const_payloads), ("area-candidates", plist_payloads)):
+            for code, payload in payloads.items():
+                snap = dict(payload)
+                snap["voteProgressPercent"] = int(100 * frac)
+                for key in ("goodVotes", "badVotes", "noVotes", "totalVotes"):
+                    snap[key] = int(payload[key] * frac)
+                snap["entries"] = [dict(e, voteTotal=int(e["voteTotal"] * frac * rng.uniform(0.9, 1.1))) for e in payload["entries"]]
+                write_json(snap_dir / sub / f"{code}.json", snap)
+
+    party_list_seats = {code: 0 for code in seats}
+    pl_sum = sum(party_list_totals.values()) or 1
+    for code, v in party_list_totals.items():
+        party_list_seats[code] = int(100 * v / pl_sum)
+
+    summary = {
+        "lastUpdatedAt": dt.datetime(2026, 2, 9, tzinfo=dt.timezone.utc).isoformat(),
+        "lastUpdatedAtFromOrigin": dt.datetime(2026, 2, 9, tzinfo=dt.timezone.utc).isoformat(),
+        "voteProgressExists": True,
+        "voteProgressPercent": 100,
+        "data": [
+            {
+                "partyCode": p["code"],
+                "constituencySeats": seats[p["code"]],
+                "partylistSeats": party_list_seats[p["code"]],
+                "totalSeats": seats[p["code"]] + party_list_seats[p["code"]],
+                "constituencyVotes": const_totals[p["code"]],
+                "partyListVotes": party_list_totals[p["code"]],
+            }
+            for p in party_rows
+        ],
+        "statisticsConstitution": {
+            "total": stat_c["total"],
+            "percent": 100,
+            "voteBreakdownByType": {"goodVoteTotal": stat_c["good"], "badVoteTotal": stat_c["bad"], "noVoteTotal": stat_c["no"]},
+        },
+        "statisticsPartyList": {
+            "total": stat_pl["total"],
+            "percent": 100,
+            "voteBreakdownByType": {"goodVoteTotal": stat_pl["good"], "badVoteTotal": stat_pl["bad"], "noVoteTotal": stat_pl["no"]},
+        },
+    }
+
+    write_json(out_dir / "common-data.json", common)
+    write_json(out_dir / "party-data.json", {"parties": party_rows})
+    write_json(out_dir / "candidate-data.json", {"candidates": candidates})
+    write_json(out_dir / "summary.json", summary)
+    write_xlsx(out_dir / "election-66.xlsx", xlsx_rows)
+    schema = [["Sheet", "Column", "Data Type", "Description", "Example"]]
+    schema += [[sheet, col, dtype, "", ""] for sheet, cols in ECT_SHEETS.items() for col, dtype in cols.items()]
+    write_workbook(out_dir / "ectreport66.xlsx", {"Schema": schema, **ect})
+
+    write_json(
+        out_dir / "config" / "analysis-config.json",
+        {
+            "small_party_range": [1, min(9, parties)],
+            "base_party_numbers": [p["number"] for p in party_rows[:6]],
+            "outlier_percentiles": [0.99, 0.97, 0.95],
+            "top_n_default": 20,
+            "labels": {"project": "synthetic"},
+        },
+    )
+    write_json(
+        out_dir / "config" / "research-settings.json",
+        {"anomaly_quantile": 0.97, "min_district_mapping_coverage": 0.9, "small_party_range": [1, min(9, parties)], "top_watchlist_limit": 200},
+    )
+    write_json(out_dir / "config" / "province-aliases.json", {})
+    (out_dir / "config" / "party-crosswalk-66-69.csv").write_text(
+        "party66_name,party66_no,party69_code,party69_name,mapping_type,notes\n", encoding="utf-8"
+    )
+    (out_dir / "hypothesis.md").write_text("# synthetic\n", encoding="utf-8")
+
+    return {"areas": areas, "parties": parties, "snapshots": snapshots, "provinces": n_prov, "candidates": len(candidates), "xlsxRows": len(xlsx_rows) - 1}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate synthetic pipeline inputs")
+    ap.add_argument("--out-dir", required=True)
+    ap.add_argument("--areas", type=int, default=400)
+    ap.add_argument("--parties", type=int, default=60)
+    ap.add_argument("--snapshots", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=69)
+    args = ap.parse_args()
+
+    info = generate(Path(args.out_dir), areas=args.areas, parties=args.parties, snapshots=args.snapshots, seed=args.seed)
+    print(f"wrote synthetic inputs to {args.out_dir} {info}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,10 +6,14 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import sqlite3
 import zipfile
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
+from columnar import export_columnar
+from instrumentation import Instrumentation, add_instrumentation_args
+
 NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
 NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
@@ -127,17 +131,9 @@ def parse_xlsx_sheet_rows(xlsx_path: Path, sheet_name: str | None = None):
             yield [values_by_idx.get(i, "") for i in range(max_idx + 1)]
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Normalize election-66.xlsx")
-    ap.add_argument("--input", default="election-66.xlsx")
-    ap.add_argument("--sheet", default="Sheet1")
-    ap.add_argument("--province-aliases", default="config/province-aliases.json")
-    ap.add_argument("--out", default="data/normalized/election66_normalized.json")
-    args = ap.parse_args()
-
-    aliases = json.loads(Path(args.province_aliases).read_text(encoding="utf-8")) if Path(args.province_aliases).exists() else {}
-
-    rows_iter = parse_xlsx_sheet_rows(Path(args.input), args.sheet)
+def iter_sheet_records(xlsx_path: Path, sheet_name: str):
+    """Rows of the pre-flattened sheet as {header: value} dicts."""
+    rows_iter = parse_xlsx_sheet_rows(xlsx_path, sheet_name)
     header_raw = next(rows_iter)
     headers = [normalize_text(h) for h in header_raw]
 
@@ -148,13 +144,78 @@ def main() -> int:
     else:
         trim_first = False
 
-    norm_rows = []
     for row in rows_iter:
         if trim_first and row:
             row = row[1:]
 
-        rec = {headers[i]: (row[i] if i < len(row) else "") for i in range(len(headers))}
+        yield {headers[i]: (row[i] if i < len(row) else "") for i in range(len(headers))}
+
+
+# One row per (constituency, party) that has a party-list or a constituency result, with
+# the same column names as the flattened election-66.xlsx sheet.
+ECT_RECORDS_SQL = """
+WITH keys AS (
+    SELECT cons_id, party_id FROM result_constituencies_PartyList
+    UNION
+    SELECT cons_id, party_id FROM result_constituencies_Candidate
+)
+SELECT
+    p.province AS province_name,
+    k.cons_id AS cons_id,
+    o.name AS party_name,
+    o.party_no AS party_no,
+    k.party_id AS party_id,
+    cc.mp_app_no AS no,
+    rc.mp_app_id AS mp_app_id,
+    rc.mp_app_vote AS zone_vote,
+    pl.party_list_vote AS party_list_vote,
+    rc.mp_app_rank AS mp_app_rank
+FROM keys k
+JOIN constituency c ON c.cons_id = k.cons_id
+LEFT JOIN info_province p ON p.prov_id = c.prov_id
+LEFT JOIN info_party_overview o ON o.id = k.party_id
+LEFT JOIN result_constituencies_PartyList pl ON pl.cons_id = k.cons_id AND pl.party_id = k.party_id
+LEFT JOIN result_constituencies_Candidate rc ON rc.cons_id = k.cons_id AND rc.party_id = k.party_id
+LEFT JOIN Candidate_Constituency cc ON cc.mp_app_id = rc.mp_app_id
+ORDER BY k.cons_id, k.party_id
+"""
+
+
+def iter_ect_records(db_path: Path):
+    """Records joined by key from the database written by ingest_ectreport66.py."""
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    con.row_factory = sqlite3.Row
+    try:
+        for row in con.execute(ECT_RECORDS_SQL):
+            yield {k: ("" if row[k] is None else str(row[k])) for k in row.keys()}
+    finally:
+        con.close()
+
 
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Normalize election-66.xlsx")
+    ap.add_argument("--input", default="election-66.xlsx")
+    ap.add_argument("--sheet", default="Sheet1")
+    ap.add_argument("--ect-db", default=None, help="Read from the ectreport66 SQLite database (scripts/ingest_ectreport66.py) instead of --input/--sheet")
+    ap.add_argument("--province-aliases", default="config/province-aliases.json")
+    ap.add_argument("--out", default="data/normalized/election66_normalized.json")
+    ap.add_argument("--out-columnar", default=None, help="Also write a columnar copy: a .npy column directory, or Arrow IPC if the path ends in .arrow")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+    aliases = json.loads(Path(args.province_aliases).read_text(encoding="utf-8")) if Path(args.province_aliases).exists() else {}
+
+    if args.ect_db:
+        inst.phase("ect_db_rows")
+        source, source_sheet = args.ect_db, "ectreport66"
+        records = iter_ect_records(Path(args.ect_db))
+    else:
+        inst.phase("xlsx_rows")
+        source, source_sheet = args.input, args.sheet
+        records = iter_sheet_records(Path(args.input), args.sheet)
+
+    norm_rows = []
+    for rec in records:
         province = normalize_province(rec.get("province_name", ""), aliases)
         cons_id = normalize_text(rec.get("cons_id", ""))
         m = re.search(r"_(\d+)$", cons_id)
@@ -167,7 +228,7 @@ def main() -> int:
 
         out = {
             "election_year": 66,
-            "source_sheet": args.sheet,
+            "source_sheet": source_sheet,
             "province_name_raw": normalize_text(rec.get("province_name", "")),
             "province_name_norm": province,
             "district_no": district_no,
@@ -194,6 +255,7 @@ def main() -> int:
         norm_rows.append(out)
 
     # Fill district totals + shares + gaps from available rows in same district
+    inst.phase("district_shares")
     by_district = {}
     for r in norm_rows:
         key = r["district_key"]
@@ -219,10 +281,11 @@ def main() -> int:
         p_rank = r.get("partylist_rank")
         r["gap_rank_shift"] = ((c_rank if c_rank is not None else 999) - (p_rank if p_rank is not None else 999))
 
+    inst.stop()
     out = {
         "meta": {
-            "source": str(args.input),
-            "sheet": args.sheet,
+            "source": str(source),
+            "sheet": source_sheet,
             "row_count": len(norm_rows),
             "district_count": len({r["district_key"] for r in norm_rows if r.get("district_key")}),
         },
@@ -233,6 +296,11 @@ def main() -> int:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     out_path.write_text(json.dumps(out, ensure_ascii=False), encoding="utf-8")
     print(f"wrote {out_path} rows={len(norm_rows)}")
+    inst.write_sidecar(out_path)
+    if args.out_columnar:
+        for p in export_columnar(Path(args.out_columnar), {"rows": norm_rows}, out["meta"]):
+            print(f"wrote {p}")
+    inst.print_summary()
     return 0
 
 
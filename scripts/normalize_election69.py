@@ -8,6 +8,10 @@ import glob
 import json
 from pathlib import Path
 
+from columnar import export_columnar
+from instrumentation import Instrumentation, add_instrumentation_args
+from row_stream import RowWriter
+
 
 def load_json(path: Path):
     return json.loads(path.read_text(encoding="utf-8"))
@@ -37,8 +41,12 @@ def main() -> int:
     ap.add_argument("--const-dir", default="area-constituency")
     ap.add_argument("--plist-dir", default="area-candidates")
     ap.add_argument("--province-aliases", default="config/province-aliases.json")
-    ap.add_argument("--out", default="data/normalized/election69_normalized.json")
+    ap.add_argument("--out", default="data/normalized/election69_normalized.json", help="A .jsonl path writes JSON Lines")
+    ap.add_argument("--out-columnar", default=None, help="Also write a columnar copy: a .npy column directory, or Arrow IPC if the path ends in .arrow")
+    add_instrumentation_args(ap)
     args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+    inst.phase("loading")
 
     aliases = json.loads(Path(args.province_aliases).read_text(encoding="utf-8")) if Path(args.province_aliases).exists() else {}
 
@@ -52,7 +60,14 @@ def main() -> int:
     plist_map = {Path(p).stem: p for p in glob.glob(f"{args.plist_dir}/AREA-*.json")}
     const_files = sorted(glob.glob(f"{args.const_dir}/AREA-*.json"))
 
-    rows = []
+    inst.phase("area_rows")
+    # rows go straight to disk as they are produced; meta is written after them
+    out_path = Path(args.out)
+    writer = RowWriter(out_path)
+    writer.array("rows")
+    district_keys = set()
+    # the columnar copy needs every row at the end, so rows are only kept when it is asked for
+    kept_rows = [] if args.out_columnar else None
 
     for cf in const_files:
         c = load_json(Path(cf))
@@ -87,51 +102,56 @@ def main() -> int:
             c_rank = ce.get("rank")
             p_rank = pe.get("rank")
 
-            rows.append(
-                {
-                    "election_year": 69,
-                    "province_name_raw": province.get("name"),
-                    "province_name_norm": province_norm,
-                    "district_no": district_no,
-                    "district_key": f"{province_norm}__{district_no}" if province_norm and district_no is not None else None,
-                    "area_code": area_code,
-                    "party_key_69": code,
-                    "party_name_raw": party.get("name"),
-                    "party_name_norm": normalize_party_name(party.get("name", "")),
-                    "party_no_raw": party.get("number"),
-                    "party_id_raw": code,
-                    "candidate_no": None,
-                    "candidate_id_raw": ce.get("candidateCode"),
-                    "constituency_votes": c_votes,
-                    "partylist_votes": p_votes,
-                    "constituency_rank": c_rank,
-                    "partylist_rank": p_rank,
-                    "constituency_total_votes": c_total,
-                    "partylist_total_votes": p_total,
-                    "constituency_share": c_share,
-                    "partylist_share": p_share,
-                    "gap_raw": c_share - p_share,
-                    "gap_rank_shift": ((c_rank if c_rank is not None else 999) - (p_rank if p_rank is not None else 999)),
-                    "district_match_confidence": "high",
-                    "mapping_notes": "native_69",
-                    "win66_party_code": area.get("win66PartyCode"),
-                }
-            )
-
-    out = {
-        "meta": {
-            "source_const_dir": args.const_dir,
-            "source_partylist_dir": args.plist_dir,
-            "row_count": len(rows),
-            "district_count": len({r["district_key"] for r in rows if r.get("district_key")}),
-        },
-        "rows": rows,
+            district_key = f"{province_norm}__{district_no}" if province_norm and district_no is not None else None
+            if district_key:
+                district_keys.add(district_key)
+            row = {
+                "election_year": 69,
+                "province_name_raw": province.get("name"),
+                "province_name_norm": province_norm,
+                "district_no": district_no,
+                "district_key": district_key,
+                "area_code": area_code,
+                "party_key_69": code,
+                "party_name_raw": party.get("name"),
+                "party_name_norm": normalize_party_name(party.get("name", "")),
+                "party_no_raw": party.get("number"),
+                "party_id_raw": code,
+                "candidate_no": None,
+                "candidate_id_raw": ce.get("candidateCode"),
+                "constituency_votes": c_votes,
+                "partylist_votes": p_votes,
+                "constituency_rank": c_rank,
+                "partylist_rank": p_rank,
+                "constituency_total_votes": c_total,
+                "partylist_total_votes": p_total,
+                "constituency_share": c_share,
+                "partylist_share": p_share,
+                "gap_raw": c_share - p_share,
+                "gap_rank_shift": ((c_rank if c_rank is not None else 999) - (p_rank if p_rank is not None else 999)),
+                "district_match_confidence": "high",
+                "mapping_notes": "native_69",
+                "win66_party_code": area.get("win66PartyCode"),
+            }
+            writer.write(row)
+            if kept_rows is not None:
+                kept_rows.append(row)
+
+    inst.stop()
+    row_count = writer.counts["rows"]
+    meta = {
+        "source_const_dir": args.const_dir,
+        "source_partylist_dir": args.plist_dir,
+        "row_count": row_count,
+        "district_count": len(district_keys),
     }
-
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(out, ensure_ascii=False), encoding="utf-8")
-    print(f"wrote {out_path} rows={len(rows)}")
+    writer.close(meta=meta)
+    inst.write_sidecar(out_path)
+    print(f"wrote {out_path} rows={row_count}")
+    if kept_rows is not None:
+        for p in export_columnar(Path(args.out_columnar), {"rows": kept_rows}, meta):
+            print(f"wrote {p}")
+    inst.print_summary()
     return 0
 
 
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Incremental national / province / party overview aggregates for the dashboard.
+
+``OverviewAggregates`` keeps each area's contribution next to the running aggregates.
+``apply`` swaps an area's contribution: the old one is subtracted and the new one added.
+Only the touched parties and provinces are moved in their rankings, by bisect over sorted
+keys. On election night, a poll where a handful of areas changed costs time proportional
+to those areas, not to every vote row.
+
+``overview`` returns the same five structures that ``build_dashboard_data.py`` computes
+from scratch, with the same order. Ties in vote totals keep first-appearance order: for
+parties, the (area code, entry index) of their first row; for provinces, their first area
+code. This matches the stable sorts of the full recompute.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+from pathlib import Path
+from typing import Any
+
+TOTAL_KEYS = ("totalVotes", "goodVotes", "badVotes", "noVotes")
+PARTY_KINDS = ("party", "constituency_party")
+
+
+def area_contributions(area_rows: list[dict], vote_rows: list[dict], constituency_vote_rows: list[dict]) -> dict[str, dict]:
+    """{area_code: contribution} from the rows ``build_dashboard_data.py`` builds; JSON-safe."""
+    out: dict[str, dict] = {}
+    for a in area_rows:
+        t = a["totals"]
+        ct = a.get("constituencyTotals") or {}
+        out.setdefault(a["areaCode"], {}).update(
+            {
+                "province": [a["provinceCode"] or "UNKNOWN", a.get("provinceName")],
+                "totals": [t[k] for k in TOTAL_KEYS],
+                "constituencyTotals": [ct.get(k, 0) or 0 for k in TOTAL_KEYS],
+            }
+        )
+    for kind, rows in (("party", vote_rows), ("constituency_party", constituency_vote_rows)):
+        for row in rows:
+            out.setdefault(row["areaCode"], {}).setdefault(kind, []).append([row["partyCode"], row.get("voteTotal", 0)])
+    return out
+
+
+class OverviewAggregates:
+    def __init__(self):
+        self.areas: dict[str, dict] = {}
+        self.national = [0] * len(TOTAL_KEYS)
+        self.constituency_national = [0] * len(TOTAL_KEYS)
+        # code -> {"name", "totals", "members": {area_code: True}, "key"}
+        self.provinces: dict[str, dict] = {}
+        # kind -> code -> {"votes", "at": {area_code: entry index}, "key"}
+        self.parties: dict[str, dict[str, dict]] = {kind: {} for kind in PARTY_KINDS}
+        self.party_sum = {kind: 0 for kind in PARTY_KINDS}
+        self.province_ranking: list[tuple] = []
+        self.party_ranking: dict[str, list[tuple]] = {kind: [] for kind in PARTY_KINDS}
+
+    # -- updates ---------------------------------------------------------------
+
+    def apply(self, changes: dict[str, dict | None]) -> dict[str, set]:
+        """Replace the contribution of each changed area (None removes it); returns what was touched."""
+        touched: dict[str, set] = {"province": set(), **{kind: set() for kind in PARTY_KINDS}}
+        for area_code, new in changes.items():
+            old = self.areas.pop(area_code, None)
+            if old is not None:
+                self._add(area_code, old, -1, touched)
+            if new is not None:
+                self.areas[area_code] = new
+                self._add(area_code, new, 1, touched)
+        for code in touched["province"]:
+            self._rerank_province(code)
+        for kind in PARTY_KINDS:
+            for code in touched[kind]:
+                self._rerank_party(kind, code)
+        return touched
+
+    def _add(self, area_code: str, c: dict, sign: int, touched: dict[str, set]) -> None:
+        if "totals" in c:
+            for i, v in enumerate(c["totals"]):
+                self.national[i] += sign * v
+            for i, v in enumerate(c["constituencyTotals"]):
+                self.constituency_national[i] += sign * v
+            code, name = c["province"]
+            prov = self.provinces.setdefault(code, {"name": name, "totals": [0] * len(TOTAL_KEYS), "members": {}, "key": None})
+            for i, v in enumerate(c["totals"]):
+                prov["totals"][i] += sign * v
+            if sign > 0:
+                prov["members"][area_code] = True
+            else:
+                prov["members"].pop(area_code, None)
+            touched["province"].add(code)
+        for kind in PARTY_KINDS:
+            for idx, (code, votes) in enumerate(c.get(kind, [])):
+                party = self.parties[kind].setdefault(code, {"votes": 0, "at": {}, "key": None})
+                party["votes"] += sign * votes
+                self.party_sum[kind] += sign * votes
+                if sign > 0:
+                    party["at"].setdefault(area_code, idx)
+                else:
+                    party["at"].pop(area_code, None)
+                touched[kind].add(code)
+
+    @staticmethod
+    def _move(ranking: list[tuple], old_key: tuple | None, new_key: tuple | None) -> None:
+        if old_key is not None:
+            del ranking[bisect.bisect_left(ranking, old_key)]
+        if new_key is not None:
+            bisect.insort(ranking, new_key)
+
+    def _rerank_province(self, code: str) -> None:
+        prov = self.provinces[code]
+        new_key = (-prov["totals"][0], min(prov["members"]), code) if prov["members"] else None
+        self._move(self.province_ranking, prov["key"], new_key)
+        prov["key"] = new_key
+        if new_key is None:
+            del self.provinces[code]
+
+    def _rerank_party(self, kind: str, code: str) -> None:
+        party = self.parties[kind][code]
+        new_key = (-party["votes"], min(party["at"].items()), code) if party["at"] else None
+        self._move(self.party_ranking[kind], party["key"], new_key)
+        party["key"] = new_key
+        if new_key is None:
+            del self.parties[kind][code]
+
+    # -- output ----------------------------------------------------------------
+
+    def overview(self, parties_by_code: dict[str, dict]) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "national_totals": dict(zip(TOTAL_KEYS, self.national)),
+            "constituency_national_totals": dict(zip(TOTAL_KEYS, self.constituency_national)),
+        }
+        for kind, name in (("party", "party_totals"), ("constituency_party", "constituency_party_totals")):
+            total = self.party_sum[kind] or 1
+            rows = []
+            for rank, key in enumerate(self.party_ranking[kind], start=1):
+                code = key[-1]
+                meta = parties_by_code.get(code, {})
+                votes = self.parties[kind][code]["votes"]
+                rows.append(
+                    {
+                        "partyCode": code,
+                        "partyNo": meta.get("number"),
+                        "partyName": meta.get("name"),
+                        "partyColor": meta.get("colorPrimary"),
+                        "voteTotal": votes,
+                        "rank": rank,
+                        "share": votes / total,
+                    }
+                )
+            out[name] = rows
+        out["province_totals"] = [
+            {
+                "provinceCode": key[-1],
+                "provinceName": self.provinces[key[-1]]["name"],
+                "areaCount": len(self.provinces[key[-1]]["members"]),
+                **dict(zip(TOTAL_KEYS, self.provinces[key[-1]]["totals"])),
+            }
+            for key in self.province_ranking
+        ]
+        return out
+
+    # -- persistence -----------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        state = {
+            "version": 1,
+            "areas": self.areas,
+            "national": self.national,
+            "constituency_national": self.constituency_national,
+            "provinces": {code: {"name": p["name"], "totals": p["totals"], "members": list(p["members"])} for code, p in self.provinces.items()},
+            "parties": {kind: {code: {"votes": p["votes"], "at": p["at"]} for code, p in table.items()} for kind, table in self.parties.items()},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "OverviewAggregates":
+        """Restore a saved engine; rankings are re-sorted from the stored entities."""
+        agg = cls()
+        if not path.exists():
+            return agg
+        state = json.loads(path.read_text(encoding="utf-8"))
+        agg.areas = state["areas"]
+        agg.national = state["national"]
+        agg.constituency_national = state["constituency_national"]
+        for code, p in state["provinces"].items():
+            agg.provinces[code] = {"name": p["name"], "totals": p["totals"], "members": dict.fromkeys(p["members"], True), "key": None}
+            agg._rerank_province(code)
+        for kind, table in state["parties"].items():
+            for code, p in table.items():
+                agg.parties[kind][code] = {"votes": p["votes"], "at": p["at"], "key": None}
+                agg.party_sum[kind] += p["votes"]
+                agg._rerank_party(kind, code)
+        return agg
+
+    def changes_from(self, contributions: dict[str, dict]) -> dict[str, dict | None]:
+        """Areas whose contribution differs from the stored one (None for areas that disappeared)."""
+        changes: dict[str, dict | None] = {code: c for code, c in contributions.items() if self.areas.get(code) != c}
+        changes.update({code: None for code in self.areas if code not in contributions})
+        return changes
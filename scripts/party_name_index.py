@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Fuzzy party-name candidate index: Thai-aware n-gram postings + edit-distance rescoring."""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+
+# Thai above/below vowels, tone marks and other combining signs attach to the previous
+# base consonant; treating base+marks as one unit keeps a tone-mark typo to one edit.
+THAI_COMBINING = {chr(c) for c in (0x0E31, *range(0x0E34, 0x0E3B), *range(0x0E47, 0x0E4F))}
+
+STRIP_PATTERNS = [re.compile(r"\s+"), re.compile(r"^พรรค"), re.compile(r"\(มหาชน\)")]
+
+
+def fuzzy_key(name: str | None) -> str:
+    x = "" if name is None else str(name).strip().replace("\u200b", "")
+    for pat in STRIP_PATTERNS:
+        x = pat.sub("", x)
+    return x.lower()
+
+
+def clusters(s: str) -> list[str]:
+    out: list[str] = []
+    for ch in s:
+        if ch in THAI_COMBINING and out:
+            out[-1] += ch
+        else:
+            out.append(ch)
+    return out
+
+
+def ngrams(units: list[str], n: int = 3) -> set[tuple[str, ...]]:
+    padded = ["^"] * (n - 1) + units + ["$"] * (n - 1)
+    return {tuple(padded[i : i + n]) for i in range(len(padded) - n + 1)}
+
+
+def levenshtein(a: list[str], b: list[str]) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def similarity(a: list[str], b: list[str]) -> float:
+    longest = max(len(a), len(b))
+    return 1.0 - levenshtein(a, b) / longest if longest else 1.0
+
+
+class PartyNameIndex:
+    """Inverted index from cluster n-grams to target names.
+
+    ``candidates`` only rescores the ``pool`` targets sharing the most n-grams, so a
+    lookup costs O(postings touched + pool * len^2) regardless of how many targets exist.
+    """
+
+    def __init__(self, targets: list[tuple[str, str]], n: int = 3):
+        self.n = n
+        self.keys: list[str] = []
+        self.names: list[str] = []
+        self.units: list[list[str]] = []
+        self.gram_counts: list[int] = []
+        self.postings: dict[tuple[str, ...], list[int]] = {}
+        for key, name in targets:
+            units = clusters(fuzzy_key(name))
+            if not units:
+                continue
+            idx = len(self.keys)
+            self.keys.append(key)
+            self.names.append(name)
+            self.units.append(units)
+            grams = ngrams(units, n)
+            self.gram_counts.append(len(grams))
+            for g in grams:
+                self.postings.setdefault(g, []).append(idx)
+
+    def candidates(self, name: str, limit: int = 5, pool: int = 20) -> list[dict]:
+        units = clusters(fuzzy_key(name))
+        if not units:
+            return []
+        grams = ngrams(units, self.n)
+        overlap: Counter[int] = Counter()
+        for g in grams:
+            for idx in self.postings.get(g, ()):
+                overlap[idx] += 1
+        # Dice coefficient on n-gram sets picks the shortlist
+        shortlist = sorted(overlap, key=lambda i: -2.0 * overlap[i] / (len(grams) + self.gram_counts[i]))[:pool]
+        scored = [
+            {"key": self.keys[i], "name": self.names[i], "score": similarity(units, self.units[i])}
+            for i in shortlist
+        ]
+        scored.sort(key=lambda x: -x["score"])
+        return scored[:limit]
+
+    def best(self, name: str, threshold: float) -> dict | None:
+        top = self.candidates(name, limit=1)
+        return top[0] if top and top[0]["score"] >= threshold else None
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Streaming writer/reader for ``{"meta": ..., "rows": [...]}`` style datasets.
+
+Rows are serialized one at a time as they are produced, so a script never holds the full
+output string; top-level scalars such as ``meta`` are written after the arrays, once they
+are known. A path ending in ``.jsonl`` switches to JSON Lines: one row per line, a
+``{"__array__": name}`` line before each array and a final ``{"__tail__": {...}}`` line.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+from columnar import is_columnar, load_columnar_document
+
+CHUNK = 1 << 16
+# a scalar (number / true / false / null) is complete only once one of these follows it
+_DELIMITERS = ",]} \t\r\n"
+_decoder = json.JSONDecoder()
+# one shared encoder: json.dumps(..., ensure_ascii=False) would build a new one per row
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def is_jsonl(path: Path) -> bool:
+    return Path(path).suffix == ".jsonl"
+
+
+def _dumps(obj: Any) -> str:
+    return _encoder.encode(obj)
+
+
+class RowWriter:
+    """Write named arrays row by row, then the remaining top-level keys on close.
+
+    The file is written to ``<path>.tmp`` and renamed on close, so readers never see a
+    half-written dataset. The JSON output is equivalent to ``json.dumps`` of the dict
+    ``{**arrays, **tail}``.
+    """
+
+    def __init__(self, path: Path, head: dict | None = None):
+        self.path = Path(path)
+        self.jsonl = is_jsonl(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = self._tmp.open("w", encoding="utf-8")
+        self._array: str | None = None
+        self._first_key = True
+        self._first_row = True
+        self._closed = False
+        self.counts: dict[str, int] = {}
+        if self.jsonl:
+            if head:
+                self._f.write(_dumps({"__head__": head}) + "\n")
+        else:
+            self._f.write("{")
+            for k, v in (head or {}).items():
+                self._key(k)
+                self._f.write(_dumps(v))
+
+    def _key(self, name: str) -> None:
+        self._f.write(("" if self._first_key else ", ") + _dumps(name) + ": ")
+        self._first_key = False
+
+    def _end_array(self) -> None:
+        if self._array is not None and not self.jsonl:
+            self._f.write("]")
+        self._array = None
+
+    def array(self, name: str) -> "RowWriter":
+        self._end_array()
+        self._array = name
+        self._first_row = True
+        self.counts[name] = 0
+        if self.jsonl:
+            self._f.write(_dumps({"__array__": name}) + "\n")
+        else:
+            self._key(name)
+            self._f.write("[")
+        return self
+
+    def write(self, row: Any) -> None:
+        if self._array is None:
+            self.array("rows")
+        if self.jsonl:
+            self._f.write(_dumps(row) + "\n")
+        else:
+            self._f.write(_dumps(row) if self._first_row else ", " + _dumps(row))
+        self._first_row = False
+        self.counts[self._array] += 1
+
+    def write_all(self, name: str, rows) -> None:
+        self.array(name)
+        for row in rows:
+            self.write(row)
+
+    def close(self, **tail: Any) -> Path:
+        if self._closed:
+            return self.path
+        self._closed = True
+        self._end_array()
+        if self.jsonl:
+            if tail:
+                self._f.write(_dumps({"__tail__": tail}) + "\n")
+        else:
+            for k, v in tail.items():
+                self._key(k)
+                self._f.write(_dumps(v))
+            self._f.write("}")
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif not self._closed:
+            self._closed = True
+            self._f.close()
+            self._tmp.unlink(missing_ok=True)
+
+
+class _Buffer:
+    """Refilling text buffer for incremental raw_decode of one top-level object."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def skip_ws(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.skip_ws() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.skip_ws()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a scalar at the buffer edge may be cut short ("1." / "12e" / "12"); only trust it
+            # once a delimiter follows
+            if not isinstance(obj, (dict, list, str)) and (end >= len(self.buf) or self.buf[end] not in _DELIMITERS):
+                if self.fill():
+                    continue
+            self.pos = end
+            return obj
+
+
+def iter_events(path: Path) -> Iterator[tuple[str, str, Any]]:
+    """Yield ("row", array_name, row) for array items and ("key", name, value) for the rest."""
+    path = Path(path)
+    with path.open("r", encoding="utf-8") as f:
+        if is_jsonl(path):
+            array = None
+            for line in f:
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                if isinstance(obj, dict) and len(obj) == 1:
+                    if "__array__" in obj:
+                        array = obj["__array__"]
+                        yield ("array", array, None)
+                        continue
+                    if "__head__" in obj or "__tail__" in obj:
+                        for k, v in next(iter(obj.values())).items():
+                            yield ("key", k, v)
+                        continue
+                yield ("row", array or "rows", obj)
+            return
+
+        b = _Buffer(f)
+        b.expect("{")
+        if b.skip_ws() == "}":
+            return
+        while True:
+            key = b.value()
+            b.expect(":")
+            if b.skip_ws() == "[":
+                b.pos += 1
+                yield ("array", key, None)
+                if b.skip_ws() == "]":
+                    b.pos += 1
+                else:
+                    while True:
+                        yield ("row", key, b.value())
+                        ch = b.skip_ws()
+                        b.pos += 1
+                        if ch == "]":
+                            break
+                        if ch != ",":
+                            raise ValueError(f"expected ',' or ']' in array {key!r}")
+            else:
+                yield ("key", key, b.value())
+            ch = b.skip_ws()
+            b.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError("expected ',' or '}' between top-level keys")
+
+
+def iter_rows(path: Path, array: str = "rows") -> Iterator[Any]:
+    """Stream the items of one top-level array without loading the rest of the file."""
+    for kind, name, value in iter_events(path):
+        if kind == "row" and name == array:
+            yield value
+
+
+def load_document(path: Path) -> dict:
+    """Materialize a streamed (or plain) JSON / JSON Lines / columnar dataset as a dict."""
+    if is_columnar(path):
+        return load_columnar_document(path)
+    out: dict[str, Any] = {}
+    for kind, name, value in iter_events(path):
+        if kind == "array":
+            out[name] = []
+        elif kind == "row":
+            out.setdefault(name, []).append(value)
+        else:
+            out[name] = value
+    return out
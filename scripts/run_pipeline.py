@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Run the README pipeline as a hash-cached DAG of script stages."""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import datetime as dt
+import glob
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    args: list[str]
+    inputs: list[str]
+    outputs: list[str]
+    deps: list[str] = field(default_factory=list)
+
+
+# Inputs and outputs may be glob patterns (relative to --input-dir); a columnar ``.cols``
+# directory is listed as ``<dir>/**`` so every column file is hashed, not only its schema.
+# deps are derived from outputs, so a stage only waits on the stages that actually write
+# files it reads.
+STAGES = [
+    Stage(
+        name="normalize66",
+        script="normalize_election66.py",
+        args=[
+            "--input", "election-66.xlsx",
+            "--sheet", "Sheet1",
+            "--province-aliases", "config/province-aliases.json",
+            "--out", "data/normalized/election66_normalized.json",
+        ],
+        inputs=["election-66.xlsx", "config/province-aliases.json"],
+        outputs=["data/normalized/election66_normalized.json"],
+    ),
+    Stage(
+        name="ingest_ect66",
+        script="ingest_ectreport66.py",
+        args=["--input", "ectreport66.xlsx", "--out", "data/ect66.sqlite"],
+        inputs=["ectreport66.xlsx"],
+        outputs=["data/ect66.sqlite"],
+    ),
+    Stage(
+        name="normalize69",
+        script="normalize_election69.py",
+        args=[
+            "--common", "common-data.json",
+            "--parties", "party-data.json",
+            "--const-dir", "area-constituency",
+            "--plist-dir", "area-candidates",
+            "--province-aliases", "config/province-aliases.json",
+            "--out", "data/normalized/election69_normalized.json",
+            "--out-columnar", "data/normalized/election69_normalized.cols",
+        ],
+        inputs=[
+            "common-data.json",
+            "party-data.json",
+            "area-constituency/AREA-*.json",
+            "area-candidates/AREA-*.json",
+            "config/province-aliases.json",
+        ],
+        outputs=["data/normalized/election69_normalized.json", "data/normalized/election69_normalized.cols/**"],
+    ),
+    Stage(
+        name="crossyear",
+        script="build_crossyear_dataset.py",
+        args=[
+            "--in66", "data/normalized/election66_normalized.json",
+            "--in69", "data/normalized/election69_normalized.json",
+            "--parties", "party-data.json",
+            "--crosswalk", "config/party-crosswalk-66-69.csv",
+            "--district-overlap", "config/district-overlap-66-69.csv",
+            "--settings", "config/research-settings.json",
+            "--out-features", "data/research/crossyear_features.json",
+            "--out-summary", "data/research/crossyear_summary.json",
+            "--out-quality", "data/research/mapping_quality_report.json",
+            "--out-panel", "data/research/crossyear_panel",
+        ],
+        inputs=[
+            "data/normalized/election66_normalized.json",
+            "data/normalized/election69_normalized.json",
+            "party-data.json",
+            "config/party-crosswalk-66-69.csv",
+            "config/district-overlap-66-69.csv",
+            "config/research-settings.json",
+        ],
+        outputs=[
+            "data/research/crossyear_features.json",
+            "data/research/crossyear_summary.json",
+            "data/research/mapping_quality_report.json",
+            "data/research/crossyear_panel.json",
+            "data/research/crossyear_panel.bin",
+        ],
+    ),
+    Stage(
+        name="election_panel",
+        script="build_election_panel.py",
+        args=[
+            "--election", "66=data/normalized/election66_normalized.json",
+            "--election", "69=data/normalized/election69_normalized.json",
+            "--crosswalk", "66:69=config/party-crosswalk-66-69.csv",
+            "--settings", "config/research-settings.json",
+            "--out", "data/research/election_panel.json",
+            "--out-summary", "data/research/election_panel_summary.json",
+        ],
+        inputs=[
+            "data/normalized/election66_normalized.json",
+            "data/normalized/election69_normalized.json",
+            "config/party-crosswalk-66-69.csv",
+            "config/research-settings.json",
+        ],
+        outputs=["data/research/election_panel.json", "data/research/election_panel_summary.json"],
+    ),
+    Stage(
+        name="candidate_history",
+        script="build_candidate_history.py",
+        args=[
+            "--candidates", "candidate-data.json",
+            "--common", "common-data.json",
+            "--parties", "party-data.json",
+            "--const-dir", "area-constituency",
+            "--ect-db", "data/ect66.sqlite",
+            "--province-aliases", "config/province-aliases.json",
+            "--out", "data/research/candidate_history.json",
+        ],
+        inputs=[
+            "candidate-data.json",
+            "common-data.json",
+            "party-data.json",
+            "area-constituency/AREA-*.json",
+            "data/ect66.sqlite",
+            "config/province-aliases.json",
+        ],
+        outputs=["data/research/candidate_history.json"],
+    ),
+    Stage(
+        name="results_db",
+        script="build_results_db.py",
+        args=[
+            "--common", "common-data.json",
+            "--parties", "party-data.json",
+            "--candidates", "candidate-data.json",
+            "--const-dir", "area-constituency",
+            "--plist-dir", "area-candidates",
+            "--in66", "data/normalized/election66_normalized.json",
+            "--in69", "data/normalized/election69_normalized.json",
+            "--crossyear-features", "data/research/crossyear_features.json",
+            "--out", "data/results.sqlite",
+        ],
+        inputs=[
+            "common-data.json",
+            "party-data.json",
+            "candidate-data.json",
+            "area-constituency/AREA-*.json",
+            "area-candidates/AREA-*.json",
+            "data/normalized/election66_normalized.json",
+            "data/normalized/election69_normalized.json",
+            "data/research/crossyear_features.json",
+        ],
+        outputs=["data/results.sqlite"],
+    ),
+    Stage(
+        name="gap_analysis",
+        script="build_gap_analysis.py",
+        args=[
+            "--common", "common-data.json",
+            "--parties", "party-data.json",
+            "--const-dir", "area-constituency",
+            "--plist-dir", "area-candidates",
+            "--normalized", "data/normalized/election69_normalized.cols",
+            "--out-features", "analysis_features.json",
+            "--out-summary", "analysis_summary.json",
+            "--out-tests", "hypothesis_tests.json",
+        ],
+        inputs=[
+            "common-data.json",
+            "party-data.json",
+            "area-constituency/AREA-*.json",
+            "area-candidates/AREA-*.json",
+            "data/normalized/election69_normalized.cols/**",
+        ],
+        outputs=["analysis_features.json", "analysis_summary.json", "hypothesis_tests.json"],
+    ),
+    Stage(
+        name="dashboard",
+        script="build_dashboard_data.py",
+        args=[
+            "--config", "config/analysis-config.json",
+            "--input-dir", ".",
+            "--output-dir", "docs/data",
+            "--aggregate-state", "data/pipeline/overview_aggregates.json",
+        ],
+        inputs=[
+            "config/analysis-config.json",
+            "common-data.json",
+            "party-data.json",
+            "candidate-data.json",
+            "summary.json",
+            "area-constituency/AREA-*.json",
+            "area-candidates/AREA-*.json",
+        ],
+        outputs=["docs/data/dashboard-data.json", "docs/data/metadata.json"],
+    ),
+    Stage(
+        name="alignment_sweep",
+        script="alignment_sweep.py",
+        args=["--config", "config/analysis-config.json", "--input-dir", ".", "--out", "docs/data/alignment-sweep.json"],
+        inputs=["config/analysis-config.json", "party-data.json", "candidate-data.json", "area-candidates/AREA-*.json"],
+        outputs=["docs/data/alignment-sweep.json"],
+    ),
+    Stage(
+        name="collision_matrix",
+        script="collision_matrix.py",
+        args=["--input-dir", ".", "--out", "docs/data/collision-matrix.json"],
+        inputs=["party-data.json", "candidate-data.json", "area-candidates/AREA-*.json"],
+        outputs=["docs/data/collision-matrix.json"],
+    ),
+    Stage(
+        name="dashboard_cache",
+        script="build_dashboard_cache.py",
+        args=["--input-dir", ".", "--out", "data/dashboard_cache.cols"],
+        inputs=["common-data.json", "party-data.json", "candidate-data.json", "area-candidates/AREA-*.json"],
+        outputs=["data/dashboard_cache.cols/**"],
+    ),
+    Stage(
+        name="research_page",
+        script="build_research_page_data.py",
+        args=["--input-dir", ".", "--out-dir", "docs/data/research"],
+        inputs=[
+            "hypothesis.md",
+            "docs/data/dashboard-data.json",
+            "analysis_summary.json",
+            "hypothesis_tests.json",
+            "data/research/crossyear_summary.json",
+            "data/research/crossyear_features.json",
+            "data/research/crossyear_panel.json",
+            "data/research/crossyear_panel.bin",
+            "data/research/mapping_quality_report.json",
+        ],
+        outputs=["docs/data/research/manifest.json"],
+    ),
+]
+
+
+def resolve_deps(stages: list[Stage]) -> None:
+    producer = {out: s.name for s in stages for out in s.outputs}
+    for s in stages:
+        s.deps = sorted({producer[i] for i in s.inputs if i in producer and producer[i] != s.name})
+
+
+class FileHasher:
+    """sha256 per file, memoized on (size, mtime) so shared inputs are hashed once per run."""
+
+    def __init__(self):
+        self._cache: dict[str, tuple[int, int, str]] = {}
+
+    def sha(self, path: Path) -> str | None:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        hit = self._cache.get(key)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self._cache[key] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+
+def local_imports(script: str, _seen: set[str] | None = None) -> list[str]:
+    """``script`` plus every scripts/*.py module it imports, directly or transitively."""
+    seen = _seen if _seen is not None else set()
+    if script in seen:
+        return []
+    seen.add(script)
+    path = SCRIPTS_DIR / script
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    except (FileNotFoundError, SyntaxError):
+        return [script]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    out = [script]
+    for name in sorted(names):
+        if (SCRIPTS_DIR / f"{name}.py").exists():
+            out += local_imports(f"{name}.py", seen)
+    return out
+
+
+def expand(base: Path, pattern: str) -> list[Path]:
+    if any(ch in pattern for ch in "*?["):
+        return [Path(p) for p in sorted(glob.glob(str(base / pattern), recursive=True)) if Path(p).is_file()]
+    return [base / pattern]
+
+
+def stage_fingerprint(stage: Stage, base: Path, hasher: FileHasher) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps({"script": stage.script, "args": stage.args}, sort_keys=True).encode("utf-8"))
+    # the stage's code is its script and the local modules it pulls in
+    for script in sorted(local_imports(stage.script)):
+        h.update(script.encode("utf-8"))
+        h.update((hasher.sha(SCRIPTS_DIR / script) or "").encode("utf-8"))
+    for pattern in stage.inputs:
+        for p in expand(base, pattern):
+            h.update(p.relative_to(base).as_posix().encode("utf-8"))
+            h.update((hasher.sha(p) or "missing").encode("utf-8"))
+    return h.hexdigest()
+
+
+def run_stage(stage: Stage, base: Path) -> dict:
+    cmd = [sys.executable, str(SCRIPTS_DIR / stage.script), *stage.args]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=base, capture_output=True, text=True)
+    return {
+        "returncode": proc.returncode,
+        "seconds": time.perf_counter() - t0,
+        "stdout": proc.stdout.strip().splitlines()[-5:],
+        "stderr": proc.stderr.strip().splitlines()[-20:],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Run the full pipeline, skipping stages whose inputs are unchanged")
+    ap.add_argument("--input-dir", default=".")
+    ap.add_argument("--state", default="data/pipeline/state.json")
+    ap.add_argument("--report", default="data/pipeline/run_report.json")
+    ap.add_argument("--jobs", type=int, default=4)
+    ap.add_argument("--only", nargs="*", help="Run only these stages (plus nothing else)")
+    ap.add_argument("--force", action="store_true", help="Run every stage even if its fingerprint is unchanged")
+    ap.add_argument("--dry-run", action="store_true", help="Print what would run without running it")
+    args = ap.parse_args()
+
+    base = Path(args.input_dir).resolve()
+    state_path = base / args.state
+    report_path = base / args.report
+    state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else {}
+
+    stages = [s for s in STAGES if not args.only or s.name in args.only]
+    resolve_deps(stages)
+    by_name = {s.name: s for s in stages}
+
+    hasher = FileHasher()
+    results: dict[str, dict] = {}
+    pending = dict(by_name)
+    running = {}
+    t_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                dep_status = [results.get(d, {}).get("status") for d in stage.deps]
+                if any(s is None for s in dep_status):
+                    continue
+                del pending[name]
+                if any(s == "failed" or s == "blocked" for s in dep_status):
+                    results[name] = {"status": "blocked", "seconds": 0.0}
+                    continue
+                # fingerprint after deps finished so we hash their fresh outputs
+                fp = stage_fingerprint(stage, base, hasher)
+                outputs_exist = all(any(p.exists() for p in expand(base, o)) for o in stage.outputs)
+                if not args.force and outputs_exist and "would_run" not in dep_status and state.get(name, {}).get("fingerprint") == fp:
+                    results[name] = {"status": "skipped", "seconds": 0.0, "fingerprint": fp}
+                    continue
+                if args.dry_run or "would_run" in dep_status:
+                    # an upstream stage would rewrite our inputs, so we cannot know we are clean
+                    results[name] = {"status": "would_run", "seconds": 0.0, "fingerprint": fp}
+                    continue
+                print(f"[run] {name}", flush=True)
+                running[pool.submit(run_stage, stage, base)] = (name, fp)
+
+            if not running:
+                if pending and all(any(d in pending for d in by_name[n].deps) for n in pending):
+                    raise RuntimeError(f"dependency cycle among stages: {sorted(pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, fp = running.pop(fut)
+                res = fut.result()
+                ok = res["returncode"] == 0
+                results[name] = {"status": "ran" if ok else "failed", "fingerprint": fp, **res}
+                if ok:
+                    state[name] = {"fingerprint": fp, "finishedAt": dt.datetime.now(dt.timezone.utc).isoformat()}
+                else:
+                    state.pop(name, None)
+                print(f"[{results[name]['status']}] {name} {res['seconds']:.2f}s", flush=True)
+                if not ok:
+                    for line in res["stderr"]:
+                        print(f"    {line}", file=sys.stderr)
+
+    for name in by_name:
+        if results[name]["status"] in ("skipped", "would_run", "blocked"):
+            print(f"[{results[name]['status']}] {name}")
+
+    report = {
+        "generatedAt": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "totalSeconds": time.perf_counter() - t_start,
+        "jobs": args.jobs,
+        "stages": [
+            {"name": s.name, "deps": s.deps, **{k: v for k, v in results[s.name].items() if k != "stdout"}}
+            for s in stages
+        ],
+    }
+    if not args.dry_run:
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        state_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"wrote {report_path} total={report['totalSeconds']:.2f}s")
+    return 1 if any(r["status"] in ("failed", "blocked") for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""Local read-only HTTP API over the pipeline outputs (stdlib only).
+
+Loads dashboard-data.json and the cross-year features once, keeps per-query indexes in
+memory, and answers small parameterized endpoints so clients fetch only what they show:
+
+    GET /api/health
+    GET /api/areas?province=PROVINCE-10            area summaries (one province or all)
+    GET /api/areas/AREA-1001                       one area in full
+    GET /api/party-totals?ballot=partylist&province=PROVINCE-10
+    GET /api/alignment?min=1&max=9&base=7,9,22&province=...&matched=1&base_only=1
+    GET /api/crossyear?party=PARTY-0037&province=<province_name_norm>
+    GET /api/candidates/CANDIDATE-MP-100105        one candidate's 66 -> 69 history
+    GET /api/candidates?area=AREA-1001             every candidate's history in an area
+
+Responses are cached in an LRU keyed by the normalized query and carry a strong ETag;
+``If-None-Match`` gets a 304. Source files are re-stat'ed at most every few seconds and a
+change reloads the indexes and clears the cache. HEAD is answered like GET without a body.
+Everything else is served from docs/.
+
+``/api/alignment`` defaults ``min``/``max``/``base`` to ``small_party_range`` and
+``base_party_numbers`` of config/analysis-config.json. Like the alignment rows of
+dashboard-data.json it returns every proxy row in the range and marks those whose candidate
+belongs to a base party with ``isBasePartyMatch``; ``summaryByBaseParty`` counts only those.
+``base_only=1`` drops the other rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from row_stream import iter_rows
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def one(params: dict, name: str, default: str | None = None) -> str | None:
+    values = params.get(name)
+    return values[-1].strip() if values else default
+
+
+def int_param(params: dict, name: str, default: int | None = None) -> int | None:
+    raw = one(params, name)
+    if raw in (None, ""):
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+
+
+def int_list(params: dict, name: str) -> tuple[int, ...] | None:
+    """?base=7,9&base=22 -> (7, 9, 22); order and duplicates do not change the cache key."""
+    values = params.get(name)
+    if not values:
+        return None
+    try:
+        return tuple(sorted({int(x) for v in values for x in v.split(",") if x.strip()}))
+    except ValueError:
+        raise BadRequest(f"{name} must be a comma-separated list of integers") from None
+
+
+def flag(params: dict, name: str) -> bool:
+    return (one(params, name) or "").lower() in ("1", "true", "yes")
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResultsSnapshot:
+    """Every index built from one stat of the source files; never mutated after construction."""
+
+    def __init__(self, dashboard_path: Path, crossyear_path: Path, history_path: Path | None, stamp: tuple):
+        self.stamp = stamp
+        self.version = hashlib.sha256(repr(stamp).encode("utf-8")).hexdigest()[:16]
+        dash = load_json(dashboard_path)
+        self.overview = dash.get("overview", {})
+        self.areas = dash.get("areas", [])
+        self.area_by_code = {a["areaCode"]: a for a in self.areas}
+        self.areas_by_province: dict[str, list[dict]] = defaultdict(list)
+        for a in self.areas:
+            self.areas_by_province[a.get("provinceCode")].append(a)
+
+        # (area, party number) -> candidate, and party number -> vote results: any party-number
+        # range is answered from these without rescanning every area
+        self.results_by_party_no: dict[int, list[tuple[dict, dict]]] = defaultdict(list)
+        self.candidate_by_area_no: dict[tuple[str, int], dict] = {}
+        for a in self.areas:
+            for c in a.get("candidates", []):
+                self.candidate_by_area_no[(a["areaCode"], c.get("candidateNo"))] = c
+            for r in a.get("partyResults", []):
+                if isinstance(r.get("partyNo"), int):
+                    self.results_by_party_no[r["partyNo"]].append((a, r))
+        self.party_numbers = sorted(self.results_by_party_no)
+
+        self.crossyear_rows: list[dict] = []
+        self.crossyear_by_party: dict[str, list[int]] = defaultdict(list)
+        self.crossyear_by_province: dict[str, list[int]] = defaultdict(list)
+        if crossyear_path.exists():
+            for i, r in enumerate(iter_rows(crossyear_path, "comparative_rows")):
+                self.crossyear_rows.append(r)
+                self.crossyear_by_party[r.get("party_key_69")].append(i)
+                self.crossyear_by_province[r.get("province_name_norm")].append(i)
+
+        # written keyed by candidate code with an area index, so both lookups are one dict hit
+        self.candidate_history: dict[str, dict] = {}
+        self.candidates_by_area: dict[str, list[str]] = {}
+        if history_path and history_path.exists():
+            history = load_json(history_path)
+            self.candidate_history = history.get("candidates", {})
+            self.candidates_by_area = history.get("index", {}).get("by_area", {})
+
+    # endpoint handlers: (normalized params) -> JSON-able payload
+
+    def health(self) -> dict:
+        return {"version": self.version, "areas": len(self.areas), "crossyearRows": len(self.crossyear_rows)}
+
+    def area_list(self, province: str | None) -> dict:
+        areas = self.areas_by_province.get(province, []) if province else self.areas
+        rows = []
+        for a in areas:
+            winner = next((r for r in a.get("constituencyPartyResults", []) if r.get("rank") == 1), None)
+            rows.append(
+                {
+                    "areaCode": a["areaCode"],
+                    "areaName": a.get("areaName"),
+                    "provinceCode": a.get("provinceCode"),
+                    "provinceName": a.get("provinceName"),
+                    "totals": a.get("totals"),
+                    "constituencyTotals": a.get("constituencyTotals"),
+                    "winnerPartyCode": winner.get("partyCode") if winner else None,
+                    "winnerPartyName": winner.get("partyName") if winner else None,
+                    "derivedMetrics": a.get("derivedMetrics"),
+                }
+            )
+        return {"province": province, "rows": rows}
+
+    def area_detail(self, code: str) -> dict | None:
+        return self.area_by_code.get(code)
+
+    def party_totals(self, ballot: str, province: str | None) -> dict:
+        if ballot not in ("partylist", "constituency"):
+            raise BadRequest("ballot must be partylist or constituency")
+        if not province:
+            key = "party_totals" if ballot == "partylist" else "constituency_party_totals"
+            return {"ballot": ballot, "province": None, "rows": self.overview.get(key, [])}
+        field = "partyResults" if ballot == "partylist" else "constituencyPartyResults"
+        totals: dict[str, dict] = {}
+        for a in self.areas_by_province.get(province, []):
+            for r in a.get(field, []):
+                t = totals.setdefault(r["partyCode"], {k: r.get(k) for k in ("partyCode", "partyNo", "partyName", "partyColor")} | {"voteTotal": 0, "seats": 0})
+                t["voteTotal"] += r.get("voteTotal") or 0
+                t["seats"] += int(r.get("rank") == 1)
+        rows = sorted(totals.values(), key=lambda x: x["voteTotal"], reverse=True)
+        grand = sum(r["voteTotal"] for r in rows)
+        for i, r in enumerate(rows, start=1):
+            r["rank"] = i
+            r["share"] = r["voteTotal"] / grand if grand else 0.0
+        return {"ballot": ballot, "province": province, "rows": rows}
+
+    def alignment(
+        self, lo: int, hi: int, base: tuple[int, ...] | None, province: str | None, matched_only: bool, base_only: bool = False
+    ) -> dict:
+        base_set = set(base or ())
+        rows = []
+        by_base: dict[str, dict] = {}
+        for party_no in (n for n in self.party_numbers if lo <= n <= hi):
+            for a, r in self.results_by_party_no[party_no]:
+                if province and a.get("provinceCode") != province:
+                    continue
+                c = self.candidate_by_area_no.get((a["areaCode"], party_no))
+                if matched_only and c is None:
+                    continue
+                is_base = c is not None and c.get("candidatePartyNo") in base_set
+                if base_only and not is_base:
+                    continue
+                rows.append(
+                    {
+                        "areaCode": a["areaCode"],
+                        "areaName": a.get("areaName"),
+                        "provinceCode": a.get("provinceCode"),
+                        "provinceName": a.get("provinceName"),
+                        "smallPartyCode": r.get("partyCode"),
+                        "smallPartyNo": party_no,
+                        "smallPartyName": r.get("partyName"),
+                        "smallPartyVotes": r.get("voteTotal", 0),
+                        "smallPartyVotePercent": r.get("votePercent", 0),
+                        "matched": c is not None,
+                        "candidatePartyCode": c.get("candidatePartyCode") if c else None,
+                        "candidatePartyNo": c.get("candidatePartyNo") if c else None,
+                        "candidatePartyName": c.get("candidatePartyName") if c else None,
+                        "candidateName": c.get("candidateName") if c else None,
+                        "isBasePartyMatch": is_base,
+                    }
+                )
+                if is_base:
+                    b = by_base.setdefault(
+                        c["candidatePartyCode"],
+                        {"candidatePartyCode": c["candidatePartyCode"], "candidatePartyNo": c.get("candidatePartyNo"), "candidatePartyName": c.get("candidatePartyName"), "rows": 0, "totalProxyVotes": 0, "areas": set()},
+                    )
+                    b["rows"] += 1
+                    b["totalProxyVotes"] += r.get("voteTotal", 0)
+                    b["areas"].add(a["areaCode"])
+        summary = [{**{k: v for k, v in b.items() if k != "areas"}, "areaCount": len(b["areas"])} for b in by_base.values()]
+        summary.sort(key=lambda x: x["totalProxyVotes"], reverse=True)
+        return {"range": [lo, hi], "base": list(base or ()), "province": province, "rows": rows, "summaryByBaseParty": summary}
+
+    def crossyear(self, party: str | None, province: str | None) -> dict:
+        if party and province:
+            in_province = set(self.crossyear_by_province.get(province, []))
+            idx = [i for i in self.crossyear_by_party.get(party, []) if i in in_province]
+        elif party:
+            idx = self.crossyear_by_party.get(party, [])
+        elif province:
+            idx = self.crossyear_by_province.get(province, [])
+        else:
+            idx = range(len(self.crossyear_rows))
+        return {"party": party, "province": province, "rows": [self.crossyear_rows[i] for i in idx]}
+
+    def candidate(self, code: str) -> dict | None:
+        return self.candidate_history.get(code)
+
+    def area_candidates(self, area: str | None) -> dict:
+        if not area:
+            raise BadRequest("area is required")
+        return {"area": area, "candidates": [self.candidate_history[c] for c in self.candidates_by_area.get(area, [])]}
+
+
+class ResultsStore:
+    """Holds the current ``ResultsSnapshot`` and swaps in a new one when a source file changes.
+
+    Readers take ``store.current`` once per request, so a reload never mixes indexes or
+    versions from two different loads.
+    """
+
+    def __init__(self, dashboard_path: Path, crossyear_path: Path, history_path: Path | None = None, check_interval: float = 2.0):
+        self.dashboard_path = dashboard_path
+        self.crossyear_path = crossyear_path
+        self.history_path = history_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.current = self._load()
+
+    def _stat(self):
+        paths = (self.dashboard_path, self.crossyear_path, self.history_path)
+        return tuple((p.stat().st_mtime_ns, p.stat().st_size) if p and p.exists() else None for p in paths)
+
+    def _load(self) -> ResultsSnapshot:
+        # stat before reading: a file changing mid-load leaves a stale stamp and triggers another reload
+        return ResultsSnapshot(self.dashboard_path, self.crossyear_path, self.history_path, self._stat())
+
+    def maybe_reload(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        if self._stat() == self.current.stamp:
+            return False
+        with self._lock:
+            if self._stat() == self.current.stamp:
+                return False
+            self.reload()
+            return True
+
+    def reload(self) -> None:
+        self.current = self._load()
+
+
+def route(store: ResultsSnapshot, path: str, params: dict, config: dict | None = None) -> tuple[tuple, Callable[[], Any]]:
+    """Map a request to (normalized cache key, thunk producing the payload).
+
+    ``config`` is analysis-config.json; it supplies the /api/alignment defaults.
+    """
+    config = config or {}
+    if path == "/api/health":
+        return ("health",), store.health
+    if path == "/api/areas":
+        province = one(params, "province") or None
+        return ("areas", province), partial(store.area_list, province)
+    if path.startswith("/api/areas/"):
+        code = path.rsplit("/", 1)[-1]
+        return ("area", code), partial(store.area_detail, code)
+    if path == "/api/party-totals":
+        ballot = (one(params, "ballot") or "partylist").lower()
+        province = one(params, "province") or None
+        return ("party-totals", ballot, province), partial(store.party_totals, ballot, province)
+    if path == "/api/alignment":
+        default_lo, default_hi = config.get("small_party_range", (1, 9))
+        lo = int_param(params, "min", default_lo)
+        hi = int_param(params, "max", default_hi)
+        base = int_list(params, "base")
+        if base is None:
+            base = tuple(config.get("base_party_numbers", ())) or None
+        province = one(params, "province") or None
+        matched = flag(params, "matched")
+        base_only = flag(params, "base_only")
+        return ("alignment", lo, hi, base, province, matched, base_only), partial(store.alignment, lo, hi, base, province, matched, base_only)
+    if path == "/api/crossyear":
+        party = one(params, "party") or None
+        province = one(params, "province") or None
+        return ("crossyear", party, province), partial(store.crossyear, party, province)
+    if path.startswith("/api/candidates/"):
+        code = path.rsplit("/", 1)[-1]
+        return ("candidate", code), partial(store.candidate, code)
+    if path == "/api/candidates":
+        area = one(params, "area") or None
+        return ("candidates", area), partial(store.area_candidates, area)
+    raise LookupError(path)
+
+
+class Handler(SimpleHTTPRequestHandler):
+    store: ResultsStore
+    cache: LRUCache
+    config: dict
+
+    def do_GET(self) -> None:
+        self._handle(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._handle(send_body=False)
+
+    def _handle(self, send_body: bool) -> None:
+        url = urlsplit(self.path)
+        if not url.path.startswith("/api/"):
+            return super().do_GET() if send_body else super().do_HEAD()
+        if self.store.maybe_reload():
+            self.cache.clear()
+        snapshot = self.store.current
+        try:
+            key, thunk = route(snapshot, url.path.rstrip("/"), parse_qs(url.query), self.config)
+            key = (snapshot.version, *key)
+            hit = self.cache.get(key)
+            if hit is None:
+                payload = thunk()
+                if payload is None:
+                    return self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"}, send_body)
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                hit = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+                self.cache.put(key, hit)
+        except BadRequest as e:
+            return self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)}, send_body)
+        except LookupError:
+            return self._send_json(HTTPStatus.NOT_FOUND, {"error": "unknown endpoint"}, send_body)
+
+        body, etag = hit
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload: dict, send_body: bool = True) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Serve pipeline outputs through a local read-only query API")
+    ap.add_argument("--config", default="config/analysis-config.json", help="Supplies the /api/alignment defaults")
+    ap.add_argument("--dashboard", default="docs/data/dashboard-data.json")
+    ap.add_argument("--crossyear-features", default="data/research/crossyear_features.json")
+    ap.add_argument("--candidate-history", default="data/research/candidate_history.json")
+    ap.add_argument("--static-dir", default="docs", help="Served for non-/api paths")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8069)
+    ap.add_argument("--cache-size", type=int, default=256, help="LRU entries (one per normalized query)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    config_path = Path(args.config)
+    config = load_json(config_path) if config_path.exists() else {}
+    store = ResultsStore(Path(args.dashboard), Path(args.crossyear_features), Path(args.candidate_history))
+    handler = type("ResultsHandler", (Handler,), {"store": store, "cache": LRUCache(args.cache_size), "config": config})
+    server = ThreadingHTTPServer((args.host, args.port), partial(handler, directory=args.static_dir))
+    print(f"loaded {len(store.current.areas)} areas, {len(store.current.crossyear_rows)} cross-year rows in {time.perf_counter() - t0:.2f}s")
+    print(f"serving http://{args.host}:{args.port}/api/health (static: {args.static_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Monte Carlo seat projection from partially counted areas.
+
+Each area's uncounted votes are taken as ``counted * (1 - f) / f``, where ``f`` is
+``voteProgressPercent``. Their expected split blends the counted shares with a prior,
+weighted by progress. The prior is the province's counted shares, or the area's year-66
+shares mapped to year-69 parties, read from the memory-mapped cross-year panel. An area with no counted
+votes and no prior falls back to the national counted shares, else a uniform split.
+
+A scenario draws a national swing per party plus independent area-level noise, then:
+
+- constituency seats go to the plurality winner of each area (counted + simulated
+  remaining votes);
+- party-list seats are split by largest remainder (Hare quota) over the national
+  party-list totals.
+
+Only what can change is drawn. An area is settled when the leader is strictly ahead and no
+trailing party could overtake it with a draw within ``MAX_SIGMA`` standard deviations of
+the noise model.
+Parties that cannot come near a party-list seat keep their expected votes, so their
+quotients and remainders are computed once.
+Scenarios run in fixed-size batches. Each batch has its own seed, so results do not
+depend on ``--jobs``; with more than one job the batches go to a process pool.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from crossyear_panel import load_panel
+from instrumentation import Instrumentation, add_instrumentation_args
+
+BALLOTS = {"constituency": "area-constituency", "partylist": "area-candidates"}
+# draws further than this many standard deviations from the mean are treated as impossible
+MAX_SIGMA = 4.0
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_areas(const_dir: str, plist_dir: str) -> dict[str, dict]:
+    """{area_code: {ballot: {"progress", "votes": {party: votes}, "eligible"}}}."""
+    areas: dict[str, dict] = defaultdict(dict)
+    for ballot, pattern in zip(BALLOTS, (const_dir, plist_dir)):
+        for fp in sorted(glob.glob(f"{pattern}/AREA-*.json")):
+            d = load_json(Path(fp))
+            areas[d["areaCode"]][ballot] = {
+                "progress": min(max(float(d.get("voteProgressPercent") or 0) / 100, 0.0), 1.0),
+                "votes": {e["partyCode"]: e.get("voteTotal") or 0 for e in d.get("entries", []) if e.get("partyCode")},
+                "eligible": d.get("totalEligibleVoters") or 0,
+            }
+    return areas
+
+
+def shares(votes: dict[str, float]) -> dict[str, float]:
+    total = sum(votes.values())
+    return {p: v / total for p, v in votes.items()} if total else {}
+
+
+def province_priors(areas: dict[str, dict], province_of: dict[str, str]) -> dict[tuple[str, str], dict[str, float]]:
+    """Counted shares per (province, ballot)."""
+    sums: dict[tuple[str, str], Counter] = defaultdict(Counter)
+    for area_code, ballots in areas.items():
+        for ballot, a in ballots.items():
+            sums[(province_of.get(area_code), ballot)].update(a["votes"])
+    return {k: shares(v) for k, v in sums.items()}
+
+
+def priors_66(panel_path: Path) -> dict[tuple[str, str], dict[str, float]]:
+    """Year-66 shares per (area_code, ballot), re-keyed to year-69 party codes."""
+    panel = load_panel(panel_path, columns=["constituency_share_66", "partylist_share_66", "row66"])
+    out: dict[tuple[str, str], dict[str, float]] = defaultdict(dict)
+    for ballot, col in (("constituency", "constituency_share_66"), ("partylist", "partylist_share_66")):
+        for _, c, v in panel.column66(col):
+            district, party = divmod(c, panel.n_parties)
+            area_code = panel.districts[district]["area_code"]
+            # 66-only parties have no year-69 code to carry the prior
+            if not area_code or not panel.parties[party]["year69"] or not v or math.isnan(v):
+                continue
+            prior = out[(area_code, ballot)]
+            key = panel.parties[party]["key"]
+            prior[key] = prior.get(key, 0.0) + v
+    return {k: shares(v) for k, v in out.items()}
+
+
+def remaining_mean(a: dict, prior: dict[str, float] | None, turnout: float, fallback: dict[str, float] | None = None) -> tuple[float, dict[str, float]]:
+    """(expected uncounted votes, expected split) for one area and ballot.
+
+    ``fallback`` stands in for the prior when the area has no counted votes and no prior;
+    without either the split is uniform over the area's parties.
+    """
+    f = a["progress"]
+    counted = sum(a["votes"].values())
+    if f >= 1:
+        return 0.0, {}
+    remaining = counted * (1 - f) / f if f > 0 else a["eligible"] * turnout
+    current = shares(a["votes"])
+    if not current and not prior:
+        prior = fallback or {p: 1.0 / len(a["votes"]) for p in a["votes"]}
+    if not prior:
+        return remaining, current
+    blend = {p: f * current.get(p, 0.0) + (1 - f) * prior.get(p, 0.0) for p in set(current) | set(prior)}
+    return remaining, shares(blend)
+
+
+def build_model(areas: dict[str, dict], priors: dict | None, prior_kind: str, province_of: dict[str, str], partylist_seats: int, params: dict) -> dict:
+    """Flatten everything the scenario loop needs into index-based lists."""
+    reach = math.exp(MAX_SIGMA * math.hypot(params["swing_sd"], params["area_sd"]))
+    counted_good = sum(sum(a["votes"].values()) for b in areas.values() for a in b.values() if a["progress"] > 0)
+    eligible = sum(a["eligible"] for b in areas.values() for a in b.values() if a["progress"] > 0)
+    turnout = counted_good / eligible if eligible else 0.0
+
+    def prior_for(area_code: str, ballot: str):
+        if priors is None:
+            return None
+        key = (province_of.get(area_code), ballot) if prior_kind == "province" else (area_code, ballot)
+        return priors.get(key)
+
+    parties: list[str] = sorted({p for b in areas.values() for a in b.values() for p in a["votes"]})
+    pid = {p: i for i, p in enumerate(parties)}
+    national: dict[str, Counter] = defaultdict(Counter)
+    for b in areas.values():
+        for ballot, a in b.items():
+            national[ballot].update(a["votes"])
+    national_prior = {ballot: shares(v) for ballot, v in national.items()}
+
+    decided = Counter()
+    contested = []
+    for area_code in sorted(areas):
+        a = areas[area_code].get("constituency")
+        if not a or not a["votes"]:
+            continue
+        remaining, mean_split = remaining_mean(a, prior_for(area_code, "constituency"), turnout, national_prior.get("constituency"))
+        leader = max(a["votes"], key=lambda p: (a["votes"][p], p))
+        floor = a["votes"][leader] + remaining * mean_split.get(leader, 0.0) / reach
+        # in the race: parties that could pass the leader with a draw within MAX_SIGMA of the mean,
+        # and, while votes remain, anyone level with the leader (a tie is not a lead)
+        race = [
+            p
+            for p in a["votes"]
+            if p == leader
+            or a["votes"][p] + remaining * min(1.0, mean_split.get(p, 0.0) * reach) > floor
+            or (remaining > 0 and a["votes"][p] == a["votes"][leader])
+        ]
+        if len(race) == 1:
+            decided[pid[leader]] += 1
+            continue
+        race_mass = sum(mean_split.get(p, 0.0) for p in race)
+        contested.append(
+            {
+                "area_code": area_code,
+                "parties": [pid[p] for p in race],
+                "counted": [float(a["votes"][p]) for p in race],
+                "mean": [mean_split.get(p, 0.0) for p in race],
+                "other": max(1.0 - race_mass, 0.0),
+                "remaining": remaining,
+            }
+        )
+
+    counted_pl = [0.0] * len(parties)
+    expected_pl = [0.0] * len(parties)
+    var_pl = [0.0] * len(parties)
+    for area_code, ballots in areas.items():
+        a = ballots.get("partylist")
+        if not a:
+            continue
+        remaining, mean_split = remaining_mean(a, prior_for(area_code, "partylist"), turnout, national_prior.get("partylist"))
+        for p, v in a["votes"].items():
+            counted_pl[pid[p]] += v
+        for p, s in mean_split.items():
+            if p in pid:
+                expected_pl[pid[p]] += remaining * s
+                var_pl[pid[p]] += (remaining * s) ** 2
+    total_pl = sum(counted_pl) + sum(expected_pl)
+    quota = total_pl / partylist_seats if partylist_seats else 0.0
+    # parties far below a quota even at MAX_SIGMA only compete through their (fixed) remainder
+    live_pl = [i for i in range(len(parties)) if quota and counted_pl[i] + reach * expected_pl[i] >= 0.25 * quota]
+    live_set = set(live_pl)
+    fixed_seats, fixed_remainders = [0] * len(parties), []
+    for i in range(len(parties)):
+        if i not in live_set and quota:
+            q = (counted_pl[i] + expected_pl[i]) / quota
+            fixed_seats[i] = int(q)
+            fixed_remainders.append((q - int(q), counted_pl[i] + expected_pl[i], i))
+    fixed_remainders.sort(reverse=True)
+
+    return {
+        "parties": parties,
+        "decided": dict(decided),
+        "contested": contested,
+        "partylist_seats": partylist_seats,
+        "quota": quota,
+        "live_pl": live_pl,
+        "counted_pl": counted_pl,
+        "expected_pl": expected_pl,
+        "sd_pl": [math.sqrt(v) for v in var_pl],
+        "fixed_seats": fixed_seats,
+        "fixed_remainders": fixed_remainders,
+        "swing_parties": sorted(live_set | {i for c in contested for i in c["parties"]}),
+    }
+
+
+def allocate_partylist(model: dict, totals: dict[int, float]) -> dict[int, int]:
+    """Largest remainder (Hare quota); live parties' votes vary, the rest were precomputed."""
+    quota = model["quota"]
+    seats = {}
+    remainders = []
+    for i, v in totals.items():
+        q = v / quota
+        seats[i] = int(q)
+        remainders.append((q - int(q), v, i))
+    left = model["partylist_seats"] - sum(seats.values()) - sum(model["fixed_seats"])
+    if left > 0:
+        remainders.sort(reverse=True)
+        # merge the two sorted remainder lists, only as far as the seats left over
+        fixed = model["fixed_remainders"]
+        a = b = 0
+        for _ in range(left):
+            if b >= len(fixed) or (a < len(remainders) and remainders[a] >= fixed[b]):
+                i = remainders[a][2]
+                a += 1
+            else:
+                i = fixed[b][2]
+                b += 1
+            seats[i] = seats.get(i, 0) + 1
+    return seats
+
+
+def run_batch(model: dict, params: dict, seed: int, size: int) -> dict:
+    """Simulate ``size`` scenarios; returns per-party seat histograms."""
+    rng = random.Random(seed)
+    gauss = rng.gauss
+    exp = math.exp
+    swing_sd, area_sd = params["swing_sd"], params["area_sd"]
+    swing_parties = model["swing_parties"]
+    contested = [(c["parties"], c["counted"], c["mean"], c["other"], c["remaining"]) for c in model["contested"]]
+    live_pl = model["live_pl"]
+    counted_pl, expected_pl = model["counted_pl"], model["expected_pl"]
+    noise_pl = [area_sd * sd for sd in model["sd_pl"]]
+    live_expected = sum(expected_pl[i] for i in live_pl)
+    decided = model["decided"]
+    fixed = [(i, s) for i, s in enumerate(model["fixed_seats"]) if s]
+    n = len(model["parties"])
+
+    # only parties holding a seat in a scenario are recorded; the zero bins are filled in at the end
+    const_hist = [Counter() for _ in range(n)]
+    pl_hist = [Counter() for _ in range(n)]
+    total_hist = [Counter() for _ in range(n)]
+    largest = Counter()
+    swing = [1.0] * n
+    for _ in range(size):
+        for i in swing_parties:
+            swing[i] = exp(gauss(0.0, swing_sd))
+
+        seats = dict(decided)
+        for parties, counted, mean, other, remaining in contested:
+            weights = [m * swing[i] * exp(gauss(0.0, area_sd)) for i, m in zip(parties, mean)]
+            scale = remaining / (sum(weights) + other)
+            best, best_votes = -1, -1.0
+            for i, v, w in zip(parties, counted, weights):
+                v += w * scale
+                if v > best_votes:
+                    best, best_votes = i, v
+            seats[best] = seats.get(best, 0) + 1
+
+        # national party-list remainder: swing plus aggregated area noise, rescaled to the expected total
+        drawn = {i: max(expected_pl[i] * swing[i] + gauss(0.0, noise_pl[i]), 0.0) for i in live_pl}
+        k = live_expected / (sum(drawn.values()) or 1.0)
+        pl = allocate_partylist(model, {i: counted_pl[i] + v * k for i, v in drawn.items()})
+        for i, s in fixed:
+            pl[i] = pl.get(i, 0) + s
+
+        top, leaders = -1, []
+        for i in seats.keys() | pl.keys():
+            cs = seats.get(i, 0)
+            ps = pl.get(i, 0)
+            t = cs + ps
+            const_hist[i][cs] += 1
+            pl_hist[i][ps] += 1
+            total_hist[i][t] += 1
+            if t > top:
+                top, leaders = t, [i]
+            elif t == top:
+                leaders.append(i)
+        largest.update(leaders)
+
+    for hists in (const_hist, pl_hist, total_hist):
+        for h in hists:
+            missing = size - sum(h.values())
+            if missing:
+                h[0] += missing
+    return {"constituency": const_hist, "partylist": pl_hist, "total": total_hist, "largest": largest}
+
+
+_WORKER_MODEL: dict = {}
+
+
+def _init_worker(model: dict, params: dict) -> None:
+    _WORKER_MODEL["model"] = model
+    _WORKER_MODEL["params"] = params
+
+
+def _pool_batch(task: tuple[int, int]) -> dict:
+    seed, size = task
+    return run_batch(_WORKER_MODEL["model"], _WORKER_MODEL["params"], seed, size)
+
+
+def merge(into: dict | None, part: dict) -> dict:
+    if into is None:
+        return part
+    for key in ("constituency", "partylist", "total"):
+        for acc, h in zip(into[key], part[key]):
+            acc.update(h)
+    into["largest"].update(part["largest"])
+    return into
+
+
+def histogram_stats(h: Counter, n: int) -> dict:
+    values = sorted(h)
+    mean = sum(v * c for v, c in h.items()) / n
+
+    def pct(q: float) -> int:
+        target = q * n
+        seen = 0
+        for v in values:
+            seen += h[v]
+            if seen >= target:
+                return v
+        return values[-1]
+
+    return {"mean": mean, "p05": pct(0.05), "p50": pct(0.5), "p95": pct(0.95)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Monte Carlo seat projection from partially counted areas")
+    ap.add_argument("--common", default="common-data.json")
+    ap.add_argument("--parties", default="party-data.json")
+    ap.add_argument("--summary", default="summary.json")
+    ap.add_argument("--const-dir", default="area-constituency")
+    ap.add_argument("--plist-dir", default="area-candidates")
+    ap.add_argument("--prior", choices=["province", "66", "none"], default="province")
+    ap.add_argument("--crossyear", default="data/research/crossyear_panel.json", help="Cross-year panel header, source of the year-66 prior")
+    ap.add_argument("--scenarios", type=int, default=100_000)
+    ap.add_argument("--batch-size", type=int, default=5_000)
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=69)
+    ap.add_argument("--swing-sd", type=float, default=0.10, help="sd of the national log-swing per party")
+    ap.add_argument("--area-sd", type=float, default=0.25, help="sd of the area-level log-noise per party")
+    ap.add_argument("--partylist-seats", type=int, default=None, help="Default: sum of partylistSeats in summary.json, else 100")
+    ap.add_argument("--out", default="data/research/seat_projection.json")
+    add_instrumentation_args(ap)
+    args = ap.parse_args()
+    inst = Instrumentation.from_args(args).start()
+
+    inst.phase("loading")
+    common = load_json(Path(args.common))
+    province_of = {a["code"]: a.get("provinceCode") for a in common["areas"]}
+    party_meta = {p["code"]: p for p in load_json(Path(args.parties))["parties"]}
+    summary_path = Path(args.summary)
+    summary = load_json(summary_path) if summary_path.exists() else {}
+    partylist_seats = args.partylist_seats or sum(r.get("partylistSeats") or 0 for r in summary.get("data", [])) or 100
+    areas = load_areas(args.const_dir, args.plist_dir)
+    if args.prior == "province":
+        priors = province_priors(areas, province_of)
+    elif args.prior == "66":
+        priors = priors_66(Path(args.crossyear))
+    else:
+        priors = None
+
+    inst.phase("model")
+    params = {"swing_sd": args.swing_sd, "area_sd": args.area_sd}
+    model = build_model(areas, priors, args.prior, province_of, partylist_seats, params)
+
+    inst.phase("simulate")
+    sizes = [args.batch_size] * (args.scenarios // args.batch_size)
+    if args.scenarios % args.batch_size:
+        sizes.append(args.scenarios % args.batch_size)
+    tasks = [(args.seed * 1_000_003 + b, size) for b, size in enumerate(sizes)]
+    jobs = max(1, min(args.jobs, len(tasks)))
+    started = time.perf_counter()
+    result = None
+    if jobs > 1:
+        with mp.get_context("fork").Pool(jobs, initializer=_init_worker, initargs=(model, params)) as pool:
+            for part in pool.imap_unordered(_pool_batch, tasks):
+                result = merge(result, part)
+    else:
+        for seed, size in tasks:
+            result = merge(result, run_batch(model, params, seed, size))
+    elapsed = time.perf_counter() - started
+    rate = args.scenarios / elapsed if elapsed else 0.0
+
+    inst.phase("serialization")
+    n = args.scenarios
+    rows = []
+    for i, code in enumerate(model["parties"]):
+        total = result["total"][i]
+        if set(total) == {0}:
+            continue
+        meta = party_meta.get(code, {})
+        rows.append(
+            {
+                "partyCode": code,
+                "partyNo": meta.get("number"),
+                "partyName": meta.get("name"),
+                "constituencySeats": histogram_stats(result["constituency"][i], n),
+                "partylistSeats": histogram_stats(result["partylist"][i], n),
+                "totalSeats": histogram_stats(total, n),
+                "pLargestParty": result["largest"][i] / n,
+                "totalSeatsDistribution": {str(k): v / n for k, v in sorted(total.items())},
+            }
+        )
+    rows.sort(key=lambda r: r["totalSeats"]["mean"], reverse=True)
+    inst.stop()
+    out = {
+        "meta": {
+            "scenarios": n,
+            "batch_size": args.batch_size,
+            "jobs": jobs,
+            "seed": args.seed,
+            "prior": args.prior,
+            "swing_sd": args.swing_sd,
+            "area_sd": args.area_sd,
+            "partylist_seats": partylist_seats,
+            "constituency_areas": sum(model["decided"].values()) + len(model["contested"]),
+            "contested_areas": len(model["contested"]),
+            "partylist_live_parties": len(model["live_pl"]),
+        },
+        "parties": rows,
+        "contested_areas": [c["area_code"] for c in model["contested"]],
+    }
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(out, ensure_ascii=False), encoding="utf-8")
+    inst.write_sidecar(out_path, {"scenariosPerSecond": rate})
+
+    print(f"wrote {out_path}")
+    print(f"scenarios={n} jobs={jobs} contested_areas={len(model['contested'])} scenarios_per_second={rate:,.0f}")
+    for r in rows[:5]:
+        t = r["totalSeats"]
+        print(f"  {r['partyCode']} {r['partyName']}: total mean={t['mean']:.1f} [{t['p05']}, {t['p95']}] P(largest)={r['pLargestParty']:.3f}")
+    inst.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""Append-only snapshot store for vote-count progress: area x party x snapshot, delta encoded.
+
+Every ingest of the live ``area-constituency`` / ``area-candidates`` directories appends one
+snapshot. Only the area files whose (path, size, mtime) changed since the last ingest are
+parsed. Each one is diffed against that area's last state (``head/<AREA>.json``), and only
+non-zero vote changes are written. The work per ingest is therefore proportional to the
+number of changed areas. An area file that disappears is listed in the snapshot's
+``removed_files`` and keeps its last counts.
+
+On disk (``data/snapshots/`` by default):
+
+- ``votes.<column>.bin``: snapshot, area, party, ballot, delta. One row per changed
+  (area, party, ballot); ``delta`` is the change in ``voteTotal``.
+- ``areas.<column>.bin``: snapshot, area, ballot, progress, total_delta. One row per
+  changed (area, ballot); ``progress`` is the absolute ``voteProgressPercent`` at that
+  snapshot.
+- ``index.json``: the area/party dictionaries, and committed row counts per table. It also
+  lists the snapshots in time order with each one's row range, which is the index used by
+  ``snapshot_at``. Columns are raw native arrays, mmap-able like ``crossyear_panel``.
+  Rows past the committed count (from an interrupted ingest) are truncated on the next
+  append.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import glob
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+
+from instrumentation import Instrumentation, add_instrumentation_args
+
+BALLOTS = {"constituency": "area-constituency", "partylist": "area-candidates"}
+BALLOT_ID = {name: i for i, name in enumerate(BALLOTS)}
+TABLES = {
+    "votes": {"snapshot": "i", "area": "i", "party": "i", "ballot": "b", "delta": "q"},
+    "areas": {"snapshot": "i", "area": "i", "ballot": "b", "progress": "d", "total_delta": "q"},
+}
+
+
+def load_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def utc_time(value: str) -> str:
+    """ISO timestamp in UTC with millisecond precision, so snapshot times sort as strings."""
+    t = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    t = t.replace(tzinfo=timezone.utc) if t.tzinfo is None else t.astimezone(timezone.utc)
+    return t.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def empty_index() -> dict:
+    return {
+        "version": 1,
+        "byteorder": sys.byteorder,
+        "areas": [],
+        "parties": [],
+        "tables": {name: {"columns": cols, "rows": 0} for name, cols in TABLES.items()},
+        "snapshots": [],
+        "files": {ballot: {} for ballot in BALLOTS},
+    }
+
+
+def area_state(payload: dict) -> dict:
+    return {
+        "progress": float(payload.get("voteProgressPercent") or 0),
+        "totalVotes": payload.get("totalVotes") or 0,
+        "votes": {e["partyCode"]: e.get("voteTotal") or 0 for e in payload.get("entries", []) if e.get("partyCode")},
+    }
+
+
+class SnapshotStore:
+    """Reader/appender over one store directory."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        index_path = self.root / "index.json"
+        self.index = load_json(index_path) if index_path.exists() else empty_index()
+        if self.index["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.root} was written on a {self.index['byteorder']}-endian host")
+        self.area_id = {code: i for i, code in enumerate(self.index["areas"])}
+        self.party_id = {code: i for i, code in enumerate(self.index["parties"])}
+        self._columns: dict[tuple[str, str], memoryview | array] = {}
+        self._recover_heads()
+
+    # -- layout ----------------------------------------------------------------
+
+    def column_path(self, table: str, name: str) -> Path:
+        return self.root / f"{table}.{name}.bin"
+
+    def rows(self, table: str) -> int:
+        return self.index["tables"][table]["rows"]
+
+    def column(self, table: str, name: str):
+        """Committed rows of one column, as a read-only memoryview over an mmap."""
+        key = (table, name)
+        if key not in self._columns:
+            typecode = TABLES[table][name]
+            n = self.rows(table)
+            if not n:
+                self._columns[key] = array(typecode)
+            else:
+                with self.column_path(table, name).open("rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._columns[key] = memoryview(mm)[: n * array(typecode).itemsize].cast(typecode)
+        return self._columns[key]
+
+    def head_path(self, area_code: str) -> Path:
+        return self.root / "head" / f"{area_code}.json"
+
+    def _recover_heads(self) -> None:
+        committed = len(self.index["snapshots"])
+        for tmp in (self.root / "head").glob("*.json.tmp"):
+            if load_json(tmp).get("snapshot", committed) < committed:
+                os.replace(tmp, tmp.with_suffix(""))
+            else:
+                tmp.unlink()
+
+    def _intern(self, table: dict[str, int], names: list[str], code: str) -> int:
+        if code not in table:
+            table[code] = len(names)
+            names.append(code)
+        return table[code]
+
+    # -- ingest ----------------------------------------------------------------
+
+    def changed_files(self, input_dir: Path) -> tuple[dict[str, dict[str, tuple[Path, list]]], list[str]]:
+        """Files whose stat differs from the last ingest, and files seen then but gone now.
+
+        Returns ({area_code: {ballot: (path, stat key)}}, ["<ballot>/<area_code>", ...]).
+        """
+        changed: dict[str, dict[str, tuple[Path, list]]] = {}
+        removed: list[str] = []
+        for ballot, sub in BALLOTS.items():
+            seen = self.index["files"][ballot]
+            present = set()
+            for fp in glob.glob(str(input_dir / sub / "AREA-*.json")):
+                st = os.stat(fp)
+                key = [str(Path(fp).resolve()), st.st_size, st.st_mtime_ns]
+                area_code = Path(fp).stem
+                present.add(area_code)
+                if seen.get(area_code) != key:
+                    changed.setdefault(area_code, {})[ballot] = (Path(fp), key)
+            removed.extend(f"{ballot}/{area_code}" for area_code in sorted(set(seen) - present))
+        return changed, removed
+
+    def ingest(self, input_dir: Path, taken_at: str, source: str | None = None) -> dict:
+        """Append one snapshot from ``input_dir``; returns its index entry (None if nothing changed)."""
+        taken_at = utc_time(taken_at)
+        snapshots = self.index["snapshots"]
+        if snapshots and taken_at < snapshots[-1]["taken_at"]:
+            raise ValueError(f"snapshot {taken_at} is older than the last one ({snapshots[-1]['taken_at']})")
+
+        snap_id = len(snapshots)
+        out = {table: {name: array(tc) for name, tc in cols.items()} for table, cols in TABLES.items()}
+        heads: dict[str, dict] = {}
+        changed, removed = self.changed_files(input_dir)
+        for area_code in sorted(changed):
+            head_path = self.head_path(area_code)
+            head = load_json(head_path) if head_path.exists() else {}
+            head.pop("snapshot", None)
+            area = self._intern(self.area_id, self.index["areas"], area_code)
+            touched = False
+            for ballot, (fp, _) in changed[area_code].items():
+                new = area_state(load_json(fp))
+                old = head.get(ballot) or {"progress": 0.0, "totalVotes": 0, "votes": {}}
+                b = BALLOT_ID[ballot]
+                for party_code in sorted(set(new["votes"]) | set(old["votes"])):
+                    delta = new["votes"].get(party_code, 0) - old["votes"].get(party_code, 0)
+                    if delta:
+                        votes = out["votes"]
+                        votes["snapshot"].append(snap_id)
+                        votes["area"].append(area)
+                        votes["party"].append(self._intern(self.party_id, self.index["parties"], party_code))
+                        votes["ballot"].append(b)
+                        votes["delta"].append(delta)
+                        touched = True
+                if new["progress"] != old["progress"] or new["totalVotes"] != old["totalVotes"] or ballot not in head:
+                    areas = out["areas"]
+                    areas["snapshot"].append(snap_id)
+                    areas["area"].append(area)
+                    areas["ballot"].append(b)
+                    areas["progress"].append(new["progress"])
+                    areas["total_delta"].append(new["totalVotes"] - old["totalVotes"])
+                    touched = True
+                head[ballot] = new
+            if touched:
+                heads[area_code] = head
+
+        # file stats are recorded even when the content turned out identical, so it is not re-read
+        for area_code, ballots in changed.items():
+            for ballot, (_, key) in ballots.items():
+                self.index["files"][ballot][area_code] = key
+        # a vanished file leaves the area's last counts in place; the removal is recorded on
+        # the snapshot, and the file is re-read and diffed against its head if it returns
+        for name in removed:
+            ballot, _, area_code = name.partition("/")
+            del self.index["files"][ballot][area_code]
+        if not heads and not removed:
+            self._commit_index()
+            return None
+
+        entry = {"id": snap_id, "taken_at": taken_at, "source": source or str(input_dir), "changed_areas": len(heads)}
+        if removed:
+            entry["removed_files"] = removed
+        for table, cols in out.items():
+            start = self.rows(table)
+            self._append(table, cols)
+            entry[f"{table}_rows"] = [start, self.rows(table)]
+        snapshots.append(entry)
+        # heads are staged, the index committed, then the heads moved into place;
+        # _recover_heads finishes or discards a staged set after an interruption
+        for area_code, head in heads.items():
+            path = self.head_path(area_code)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.with_suffix(".json.tmp").write_text(json.dumps({**head, "snapshot": snap_id}, ensure_ascii=False), encoding="utf-8")
+        self._commit_index()
+        self._recover_heads()
+        return entry
+
+    def _append(self, table: str, cols: dict[str, array]) -> None:
+        committed = self.rows(table)
+        for name, values in cols.items():
+            path = self.column_path(table, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("ab") as f:
+                # drop rows an interrupted ingest wrote past the committed count
+                f.truncate(committed * values.itemsize)
+                values.tofile(f)
+        self.index["tables"][table]["rows"] = committed + len(next(iter(cols.values())))
+        self._columns.clear()
+
+    def _commit_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "index.json.tmp"
+        tmp.write_text(json.dumps(self.index, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.root / "index.json")
+
+    # -- queries ---------------------------------------------------------------
+
+    def snapshot_at(self, taken_at: str) -> dict | None:
+        """Latest snapshot taken at or before ``taken_at``."""
+        snapshots = self.index["snapshots"]
+        i = bisect.bisect_right([s["taken_at"] for s in snapshots], utc_time(taken_at))
+        return snapshots[i - 1] if i else None
+
+    def party_curve(self, party_code: str, ballot: str = "constituency") -> list[dict]:
+        """National vote total of one party after each snapshot."""
+        pid = self.party_id.get(party_code)
+        if pid is None:
+            return []
+        party = self.column("votes", "party")
+        bcol = self.column("votes", "ballot")
+        delta = self.column("votes", "delta")
+        b = BALLOT_ID[ballot]
+        total = 0
+        out = []
+        for s in self.index["snapshots"]:
+            start, end = s["votes_rows"]
+            total += sum(delta[i] for i in range(start, end) if party[i] == pid and bcol[i] == b)
+            out.append({"snapshot": s["id"], "taken_at": s["taken_at"], "votes": total})
+        return out
+
+    def state_at(self, snapshot_id: int, ballot: str = "constituency") -> dict[str, dict[str, int]]:
+        """Absolute {area_code: {party_code: votes}} as of a snapshot, summed from the deltas."""
+        end = self.index["snapshots"][snapshot_id]["votes_rows"][1]
+        area, party, bcol, delta = (self.column("votes", c) for c in ("area", "party", "ballot", "delta"))
+        b = BALLOT_ID[ballot]
+        areas, parties = self.index["areas"], self.index["parties"]
+        out: dict[str, dict[str, int]] = {}
+        for i in range(end):
+            if bcol[i] == b:
+                votes = out.setdefault(areas[area[i]], {})
+                code = parties[party[i]]
+                votes[code] = votes.get(code, 0) + delta[i]
+        return out
+
+    def leader_changes(self, min_progress: float = 80.0, ballot: str = "constituency") -> list[dict]:
+        """Lead changes in areas that had already reported at least ``min_progress`` percent.
+
+        The leader is re-evaluated only for the areas touched in each snapshot. A change
+        counts when the area's progress before that snapshot was already at or above the
+        threshold.
+        """
+        b = BALLOT_ID[ballot]
+        areas, parties = self.index["areas"], self.index["parties"]
+        v_area, v_party, v_ballot, v_delta = (self.column("votes", c) for c in ("area", "party", "ballot", "delta"))
+        a_area, a_ballot, a_progress = (self.column("areas", c) for c in ("area", "ballot", "progress"))
+        counts: dict[int, dict[int, int]] = {}
+        progress: dict[int, float] = {}
+        leader: dict[int, int] = {}
+        out = []
+        for s in self.index["snapshots"]:
+            before = dict(progress)
+            touched = set()
+            start, end = s["votes_rows"]
+            for i in range(start, end):
+                if v_ballot[i] == b:
+                    votes = counts.setdefault(v_area[i], {})
+                    votes[v_party[i]] = votes.get(v_party[i], 0) + v_delta[i]
+                    touched.add(v_area[i])
+            start, end = s["areas_rows"]
+            for i in range(start, end):
+                if a_ballot[i] == b:
+                    progress[a_area[i]] = a_progress[i]
+            for a in sorted(touched):
+                votes = counts[a]
+                # ties go to the lower party code so the leader is deterministic
+                new = min(votes, key=lambda p: (-votes[p], parties[p]))
+                old = leader.get(a)
+                leader[a] = new
+                if old is not None and old != new and before.get(a, 0.0) >= min_progress:
+                    out.append(
+                        {
+                            "area_code": areas[a],
+                            "snapshot": s["id"],
+                            "taken_at": s["taken_at"],
+                            "progress_before": before.get(a, 0.0),
+                            "progress": progress.get(a, 0.0),
+                            "from_party": parties[old],
+                            "to_party": parties[new],
+                            "margin": votes[new] - votes.get(old, 0),
+                        }
+                    )
+        return out
+
+
+def snapshot_time(input_dir: Path, override: str | None) -> str:
+    if override:
+        return override
+    summary = input_dir / "summary.json"
+    if summary.exists():
+        taken_at = load_json(summary).get("lastUpdatedAt")
+        if taken_at:
+            return taken_at
+    raise SystemExit(f"no lastUpdatedAt in {summary}; pass --taken-at")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Append-only vote-count snapshot store")
+    ap.add_argument("--store", default="data/snapshots")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="Append a snapshot of the current area files")
+    p.add_argument("--input-dir", default=".")
+    p.add_argument("--taken-at", default=None, help="ISO timestamp; defaults to summary.json lastUpdatedAt")
+    add_instrumentation_args(p)
+    p = sub.add_parser("curve", help="A party's national vote total per snapshot")
+    p.add_argument("party_code")
+    p.add_argument("--ballot", choices=list(BALLOTS), default="constituency")
+    p = sub.add_parser("leader-changes", help="Areas whose leader changed after a progress threshold")
+    p.add_argument("--min-progress", type=float, default=80.0)
+    p.add_argument("--ballot", choices=list(BALLOTS), default="constituency")
+    sub.add_parser("info", help="List snapshots")
+    args = ap.parse_args()
+    store = SnapshotStore(Path(args.store))
+
+    if args.command == "ingest":
+        inst = Instrumentation.from_args(args).start()
+        inst.phase("ingest")
+        input_dir = Path(args.input_dir)
+        entry = store.ingest(input_dir, snapshot_time(input_dir, args.taken_at))
+        inst.stop()
+        if entry is None:
+            print("no changes")
+        else:
+            print(f"snapshot {entry['id']} taken_at={entry['taken_at']} changed_areas={entry['changed_areas']} vote_rows={entry['votes_rows'][1] - entry['votes_rows'][0]}")
+            if entry.get("removed_files"):
+                print(f"warning: {len(entry['removed_files'])} area file(s) disappeared, last counts kept: {', '.join(entry['removed_files'][:10])}", file=sys.stderr)
+        inst.print_summary()
+    elif args.command == "curve":
+        for point in store.party_curve(args.party_code, args.ballot):
+            print(f"{point['taken_at']}\t{point['votes']}")
+    elif args.command == "leader-changes":
+        print(json.dumps(store.leader_changes(args.min_progress, args.ballot), ensure_ascii=False, indent=2))
+    else:
+        for s in store.index["snapshots"]:
+            print(f"{s['id']}\t{s['taken_at']}\tchanged_areas={s['changed_areas']}\t{s['source']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import row_stream  # noqa: E402
+from row_stream import RowWriter, load_document  # noqa: E402
+
+
+def _document():
+    rng = random.Random(35)
+    floats = [rng.uniform(-1e6, 1e6) for _ in range(200)] + [1e-300, 6.02e23, -0.0, 12345678901234567890]
+    rows = [{"area": f"AREA-{i}", "share": rng.random(), "votes": rng.randrange(10**6), "ok": i % 2 == 0, "note": None} for i in range(50)]
+    return {"values": floats, "rows": rows, "flags": [True, False, None, 7], "meta": {"n": len(rows), "scale": 0.125}}
+
+
+def test_round_trip_with_tiny_chunks(tmp_path, monkeypatch):
+    doc = _document()
+    path = tmp_path / "doc.json"
+    with RowWriter(path, head={"meta": doc["meta"]}) as writer:
+        for name in ("values", "rows", "flags"):
+            writer.write_all(name, doc[name])
+    assert json.loads(path.read_text(encoding="utf-8")) == doc
+    for chunk in (1, 2, 3, 5, 7, 64):
+        monkeypatch.setattr(row_stream, "CHUNK", chunk)
+        assert load_document(path) == doc, chunk
+
+
+def test_round_trip_jsonl(tmp_path, monkeypatch):
+    doc = _document()
+    path = tmp_path / "doc.jsonl"
+    with RowWriter(path) as writer:
+        writer.write_all("rows", doc["rows"])
+        writer.close(meta=doc["meta"])
+    monkeypatch.setattr(row_stream, "CHUNK", 3)
+    assert load_document(path) == {"rows": doc["rows"], "meta": doc["meta"]}
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = tmp_path / "doc.json"
+    try:
+        with RowWriter(path) as writer:
+            writer.write({"a": 1})
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert not path.exists()
+    assert not (tmp_path / "doc.json.tmp").exists()